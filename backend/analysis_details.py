@@ -0,0 +1,92 @@
+"""
+SITERANK AI - Analysis Detail Storage
+Keeps headline scores inline on analyses and the bulky per-category
+detail dicts in a separate, lazily loaded collection
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from artifact_store import pack, unpack
+from retention import find_one_archived
+
+logger = logging.getLogger(__name__)
+
+DETAIL_FIELDS = ('seo_details', 'speed_details', 'content_details', 'ux_details')
+# Stored compressed through artifact_store
+PACKED_FIELDS = ('user_site', 'competitors')
+
+
+def split_score_details(scores: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split a WebsiteScore dump into (headline scores, detail dicts)"""
+    headline = {k: v for k, v in scores.items() if k not in DETAIL_FIELDS}
+    details = {k: scores[k] for k in DETAIL_FIELDS if k in scores}
+    return headline, details
+
+
+def build_details_doc(
+    analysis_id: str,
+    user_id: str,
+    user_scores: Dict[str, Any],
+    competitors: List[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Split a finished analysis into inline parts and a details document.
+    Returns (user headline scores, competitors with headline scores, details doc).
+    """
+    user_headline, user_details = split_score_details(user_scores)
+
+    inline_competitors = []
+    competitor_details = []
+    for comp in competitors:
+        headline, details = split_score_details(comp.get('scores', {}))
+        inline_competitors.append({**comp, 'scores': headline})
+        competitor_details.append({'url': comp.get('url'), **details})
+
+    details_doc = {
+        "analysis_id": analysis_id,
+        "user_id": user_id,
+        "user_site": user_details,
+        "competitors": competitor_details,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    return user_headline, inline_competitors, details_doc
+
+
+async def save_analysis_details(db, details_doc: Dict[str, Any]) -> None:
+    stored = {**details_doc, **{f: pack(details_doc[f]) for f in PACKED_FIELDS if f in details_doc}}
+    await db.analysis_details.replace_one(
+        {"analysis_id": details_doc['analysis_id']},
+        stored,
+        upsert=True
+    )
+
+
+async def load_analysis_details(db, analysis_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    details_doc = await find_one_archived(
+        db, "analysis_details",
+        {"analysis_id": analysis_id, "user_id": user_id},
+        {"_id": 0}
+    )
+    if details_doc:
+        for field in PACKED_FIELDS:
+            details_doc[field] = unpack(details_doc.get(field))
+    return details_doc
+
+
+def merge_details(analysis: Dict[str, Any], details_doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Put detail dicts back into an analysis document's score objects"""
+    if not details_doc:
+        return analysis
+
+    analysis['user_site_scores'] = {
+        **analysis.get('user_site_scores', {}),
+        **details_doc.get('user_site', {})
+    }
+
+    by_url = {d.get('url'): d for d in details_doc.get('competitors', [])}
+    for comp in analysis.get('competitors', []):
+        details = {k: v for k, v in by_url.get(comp.get('url'), {}).items() if k != 'url'}
+        comp['scores'] = {**comp.get('scores', {}), **details}
+    return analysis
@@ -2,6 +2,9 @@ from typing import Dict, Any, List
 from models import WebsiteScore, CompetitorData
 import logging
 
+from timing import stage
+from tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
@@ -334,12 +337,15 @@ class WebsiteAnalyzer:
         return comparison
 
 
+@traced("score")
+@stage("score")
 def analyze_scraped_data(scraped_data: Dict[str, Any]) -> WebsiteScore:
     """Convenience function to analyze scraped data"""
     analyzer = WebsiteAnalyzer()
     return analyzer.analyze_website(scraped_data)
 
 
+@traced("compare")
 def compare_all(user_scores: WebsiteScore, competitor_scores: List[WebsiteScore]) -> Dict[str, Any]:
     """Convenience function to compare websites"""
     analyzer = WebsiteAnalyzer()
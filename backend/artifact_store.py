@@ -0,0 +1,80 @@
+"""
+SITERANK AI - Compressed Artifact Storage
+Large text and JSON fields (AI suggestions, blueprints, detail dicts) are
+stored as compressed binary blobs and decoded transparently on read
+"""
+
+import gzip
+import json
+import logging
+import os
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # optional dependency; gzip is always available
+    zstandard = None
+
+ARTIFACT_KEY = "_artifact"
+ARTIFACT_MIN_BYTES = int(os.environ.get('ARTIFACT_MIN_BYTES', '1024'))
+ARTIFACT_CODEC = os.environ.get('ARTIFACT_CODEC', 'zstd' if zstandard else 'gzip')
+
+if ARTIFACT_CODEC == 'zstd' and zstandard is None:
+    logger.warning("ARTIFACT_CODEC=zstd but zstandard is not installed, using gzip")
+    ARTIFACT_CODEC = 'gzip'
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=6).compress(raw)
+    return gzip.compress(raw, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd artifact found but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def is_packed(value: Any) -> bool:
+    return isinstance(value, dict) and ARTIFACT_KEY in value
+
+
+def pack(value: Any, min_bytes: int = ARTIFACT_MIN_BYTES, codec: str = None) -> Any:
+    """
+    Compress a str or JSON-serializable value into a binary artifact.
+    Values smaller than min_bytes are returned unchanged.
+    """
+    if value is None or is_packed(value):
+        return value
+
+    if isinstance(value, str):
+        fmt, raw = 'text', value.encode('utf-8')
+    else:
+        fmt, raw = 'json', json.dumps(value, separators=(',', ':'), default=str).encode('utf-8')
+
+    if len(raw) < min_bytes:
+        return value
+
+    codec = codec or ARTIFACT_CODEC
+    return {
+        ARTIFACT_KEY: codec,
+        "format": fmt,
+        "size": len(raw),
+        "data": _compress(raw, codec)
+    }
+
+
+def unpack(value: Any) -> Any:
+    """Decode an artifact produced by pack(); any other value is returned as-is"""
+    if not is_packed(value):
+        return value
+
+    raw = _decompress(bytes(value['data']), value[ARTIFACT_KEY])
+    if value.get('format') == 'text':
+        return raw.decode('utf-8')
+    return json.loads(raw)
@@ -16,6 +16,9 @@ ACCESS_TOKEN_EXPIRE_HOURS = 168  # 7 days for better UX during long-running anal
 
 security = HTTPBearer()
 
+# Accounts allowed on /api/admin routes
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()}
+
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
@@ -67,6 +70,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     }
 
 
+async def get_admin_user(current_user: dict = Depends(get_current_user)) -> dict:
+    """Current user, if their email is listed in ADMIN_EMAILS"""
+    if (current_user.get("email") or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+
 # Optional security - doesn't raise if no token provided
 optional_security = HTTPBearer(auto_error=False)
 
@@ -3,21 +3,23 @@ SITERANK AI - Auto-Fix Engine
 Transforms detected issues into actionable, copy-paste fixes using AI
 """
 
-import os
+import asyncio
 import json
 import logging
-from typing import List, Optional, Dict, Any
+import os
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel
-from openai import OpenAI
+
+from llm_client import LLM_MODEL, chat_completion, stream_chat_completion
+from llm_cache import make_key, get_cached, set_cached
+from llm_resilience import CircuitOpen
+from json_stream import ArrayStreamParser
+from metrics import record_fallback
 
 logger = logging.getLogger(__name__)
 
-# Initialize NVIDIA DeepSeek client
-def get_ai_client():
-    return OpenAI(
-        base_url=os.environ.get('NVIDIA_BASE_URL', 'https://integrate.api.nvidia.com/v1'),
-        api_key=os.environ.get('NVIDIA_API_KEY')
-    )
+# Per-category limit for the combined /fix/all generation before falling back to rule-based fixes
+FIX_TIMEOUT_SECONDS = float(os.environ.get('FIX_TIMEOUT_SECONDS', '45'))
 
 
 # ==================== Request/Response Models ====================
@@ -60,14 +62,92 @@ class FixResponse(BaseModel):
     fixes: List[Dict[str, Any]]
     summary: str
 
+class AllFixesGenerateRequest(BaseModel):
+    seo: Optional[SEOFixRequest] = None
+    speed: Optional[SpeedFixRequest] = None
+    content: Optional[ContentFixRequest] = None
+
+class AllFixesGenerateResponse(BaseModel):
+    seo: Optional[FixResponse] = None
+    speed: Optional[FixResponse] = None
+    content: Optional[FixResponse] = None
+    fallbacks: List[str] = []
+
+
+# ==================== Streaming Generation ====================
+
+# (temperature, max_tokens) per fix category
+FIX_SAMPLING = {
+    "seo": (0.3, 4000),
+    "speed": (0.3, 4000),
+    "content": (0.5, 6000),
+}
+
+FIX_DEFAULT_SUMMARIES = {
+    "seo": "SEO fixes generated successfully",
+    "speed": "Speed fixes generated successfully",
+    "content": "Content fixes generated successfully",
+}
+
+
+def fix_completion_args(category: str, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+    temperature, max_tokens = FIX_SAMPLING[category]
+    return {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "call_site": f"{category}_fixes",
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+
+
+async def stream_ai_fixes(category: str, parser: ArrayStreamParser, system_prompt: str, user_prompt: str) -> AsyncIterator[Dict[str, Any]]:
+    """Stream a fix completion through parser, yielding each fix as soon as its JSON object closes"""
+    tokens = stream_chat_completion(**fix_completion_args(category, system_prompt, user_prompt))
+    try:
+        async for token in tokens:
+            for fix in parser.feed(token):
+                yield fix
+    finally:
+        await tokens.aclose()
+
+
+def parsed_fixes(category: str, parser: ArrayStreamParser) -> Tuple[Dict[str, Any], bool]:
+    """({"fixes", "summary"}, complete) from a finished stream; complete means the whole response parsed"""
+    document = parser.document()
+    if document is not None and isinstance(document.get("fixes"), list):
+        fixes, complete = document["fixes"], True
+    else:
+        fixes, complete = parser.items, False
+    summary = parser.string_field("summary") or FIX_DEFAULT_SUMMARIES[category]
+    return {"fixes": fixes, "summary": summary}, complete
+
+
+async def collect_ai_fixes(category: str, system_prompt: str, user_prompt: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Generate fixes in one completion, which can be hedged, unlike a stream.
+    Every fix parsed before a malformed or truncated tail is kept.
+    Raises JSONDecodeError if none could be parsed.
+    """
+    completion = await chat_completion(**fix_completion_args(category, system_prompt, user_prompt))
+    parser = ArrayStreamParser("fixes")
+    if completion.choices:
+        parser.feed(completion.choices[0].message.content or "")
+
+    parsed, complete = parsed_fixes(category, parser)
+    if not complete and not parsed["fixes"]:
+        raise json.JSONDecodeError("No fixes could be parsed from the response", parser.buffer, 0)
+    if not complete:
+        logger.warning(f"{category} fix response was malformed, keeping {len(parsed['fixes'])} parsed fixes")
+    return parsed, complete
+
 
 # ==================== SEO Auto-Fix ====================
 
-async def generate_seo_fixes(request: SEOFixRequest) -> FixResponse:
-    """Generate AI-powered SEO fixes for detected issues"""
-    
-    client = get_ai_client()
-    
+def seo_fix_prompts(request: SEOFixRequest) -> Tuple[str, str]:
+    """(system prompt, user prompt) for SEO fix generation"""
     system_prompt = """You are an expert SEO engineer. Given a URL and list of SEO issues, 
 generate exact, production-ready HTML code fixes. Return ONLY valid JSON, no markdown.
 
@@ -103,39 +183,37 @@ Generate fixes for each issue. Return JSON in this exact format:
   ],
   "summary": "brief summary of all fixes"
 }}"""
+    return system_prompt, user_prompt
+
+
+async def generate_seo_fixes(request: SEOFixRequest) -> FixResponse:
+    """Generate AI-powered SEO fixes for detected issues"""
+    system_prompt, user_prompt = seo_fix_prompts(request)
+
+    cache_key = make_key(LLM_MODEL, system_prompt, user_prompt)
+    cached = await get_cached("seo_fixes", cache_key)
+    if cached:
+        return FixResponse(success=True, url=request.url, **cached)
 
     try:
-        response = client.chat.completions.create(
-            model="deepseek-ai/deepseek-v3.2",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.3,
-            max_tokens=4000
-        )
-        
-        result_text = response.choices[0].message.content
-        
-        # Clean up response - remove markdown code blocks if present
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0]
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0]
-        
-        result = json.loads(result_text.strip())
+        parsed, complete = await collect_ai_fixes("seo", system_prompt, user_prompt)
+        # A response that broke off keeps its parsed fixes but isn't cached
+        if complete:
+            await set_cached("seo_fixes", cache_key, parsed)
         
         return FixResponse(
             success=True,
             url=request.url,
-            fixes=result.get("fixes", []),
-            summary=result.get("summary", "SEO fixes generated successfully")
+            **parsed
         )
         
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse AI response: {e}")
         # Return fallback fixes
         return generate_fallback_seo_fixes(request)
+    except CircuitOpen as e:
+        logger.warning(f"Skipping AI SEO fixes: {e}")
+        return generate_fallback_seo_fixes(request)
     except Exception as e:
         logger.error(f"SEO fix generation failed: {e}")
         raise
@@ -143,6 +221,7 @@ Generate fixes for each issue. Return JSON in this exact format:
 
 def generate_fallback_seo_fixes(request: SEOFixRequest) -> FixResponse:
     """Generate rule-based fallback fixes if AI fails"""
+    record_fallback("seo_fixes")
     fixes = []
     
     for issue in request.issues:
@@ -236,11 +315,8 @@ def generate_fallback_seo_fixes(request: SEOFixRequest) -> FixResponse:
 
 # ==================== Speed Auto-Fix ====================
 
-async def generate_speed_fixes(request: SpeedFixRequest) -> FixResponse:
-    """Generate AI-powered speed optimization fixes"""
-    
-    client = get_ai_client()
-    
+def speed_fix_prompts(request: SpeedFixRequest) -> Tuple[str, str]:
+    """(system prompt, user prompt) for speed fix generation"""
     system_prompt = """You are an expert web performance engineer. Given a URL and list of performance issues,
 generate exact, production-ready code fixes. Return ONLY valid JSON, no markdown.
 
@@ -268,32 +344,28 @@ Generate performance fixes. Return JSON in this exact format:
   ],
   "summary": "brief summary"
 }}"""
+    return system_prompt, user_prompt
+
+
+async def generate_speed_fixes(request: SpeedFixRequest) -> FixResponse:
+    """Generate AI-powered speed optimization fixes"""
+    system_prompt, user_prompt = speed_fix_prompts(request)
+
+    cache_key = make_key(LLM_MODEL, system_prompt, user_prompt)
+    cached = await get_cached("speed_fixes", cache_key)
+    if cached:
+        return FixResponse(success=True, url=request.url, **cached)
 
     try:
-        response = client.chat.completions.create(
-            model="deepseek-ai/deepseek-v3.2",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.3,
-            max_tokens=4000
-        )
-        
-        result_text = response.choices[0].message.content
-        
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0]
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0]
-        
-        result = json.loads(result_text.strip())
+        parsed, complete = await collect_ai_fixes("speed", system_prompt, user_prompt)
+        # A response that broke off keeps its parsed fixes but isn't cached
+        if complete:
+            await set_cached("speed_fixes", cache_key, parsed)
         
         return FixResponse(
             success=True,
             url=request.url,
-            fixes=result.get("fixes", []),
-            summary=result.get("summary", "Speed fixes generated successfully")
+            **parsed
         )
         
     except Exception as e:
@@ -303,6 +375,7 @@ Generate performance fixes. Return JSON in this exact format:
 
 def generate_fallback_speed_fixes(request: SpeedFixRequest) -> FixResponse:
     """Generate rule-based fallback speed fixes"""
+    record_fallback("speed_fixes")
     fixes = []
     
     for issue in request.issues:
@@ -416,11 +489,8 @@ gzip_types text/plain text/css text/xml text/javascript application/javascript a
 
 # ==================== Content Auto-Fix ====================
 
-async def generate_content_fixes(request: ContentFixRequest) -> FixResponse:
-    """Generate AI-powered content fixes and rewrites"""
-    
-    client = get_ai_client()
-    
+def content_fix_prompts(request: ContentFixRequest) -> Tuple[str, str]:
+    """(system prompt, user prompt) for content fix generation"""
     system_prompt = """You are an expert SEO content writer. Given page content and issues,
 rewrite and improve content sections. Return ONLY valid JSON, no markdown.
 
@@ -451,32 +521,28 @@ Generate content fixes. Return JSON in this exact format:
   ],
   "summary": "brief summary"
 }}"""
+    return system_prompt, user_prompt
+
+
+async def generate_content_fixes(request: ContentFixRequest) -> FixResponse:
+    """Generate AI-powered content fixes and rewrites"""
+    system_prompt, user_prompt = content_fix_prompts(request)
+
+    cache_key = make_key(LLM_MODEL, system_prompt, user_prompt)
+    cached = await get_cached("content_fixes", cache_key)
+    if cached:
+        return FixResponse(success=True, url=request.url, **cached)
 
     try:
-        response = client.chat.completions.create(
-            model="deepseek-ai/deepseek-v3.2",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.5,
-            max_tokens=6000
-        )
-        
-        result_text = response.choices[0].message.content
-        
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0]
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0]
-        
-        result = json.loads(result_text.strip())
+        parsed, complete = await collect_ai_fixes("content", system_prompt, user_prompt)
+        # A response that broke off keeps its parsed fixes but isn't cached
+        if complete:
+            await set_cached("content_fixes", cache_key, parsed)
         
         return FixResponse(
             success=True,
             url=request.url,
-            fixes=result.get("fixes", []),
-            summary=result.get("summary", "Content fixes generated successfully")
+            **parsed
         )
         
     except Exception as e:
@@ -486,6 +552,7 @@ Generate content fixes. Return JSON in this exact format:
 
 def generate_fallback_content_fixes(request: ContentFixRequest) -> FixResponse:
     """Generate rule-based fallback content fixes"""
+    record_fallback("content_fixes")
     fixes = []
     keyword = request.target_keyword or "your topic"
     
@@ -624,3 +691,81 @@ To begin with {keyword}, follow these essential steps...""",
         fixes=fixes,
         summary=f"Generated {len(fixes)} content improvements"
     )
+
+
+# ==================== Combined Fix Generation ====================
+
+FIX_GENERATORS = {
+    "seo": (generate_seo_fixes, generate_fallback_seo_fixes),
+    "speed": (generate_speed_fixes, generate_fallback_speed_fixes),
+    "content": (generate_content_fixes, generate_fallback_content_fixes),
+}
+
+
+async def run_fix_category(category: str, request: BaseModel, timeout: float = FIX_TIMEOUT_SECONDS) -> Tuple[str, FixResponse, bool]:
+    """Generate one category's fixes; returns (category, fixes, whether the fallback was used)"""
+    generate, fallback = FIX_GENERATORS[category]
+    try:
+        return category, await asyncio.wait_for(generate(request), timeout), False
+    except asyncio.TimeoutError:
+        logger.warning(f"{category} fix generation timed out after {timeout}s, using fallback fixes")
+    except Exception as e:
+        logger.error(f"{category} fix generation failed, using fallback fixes: {e}")
+    return category, fallback(request), True
+
+
+async def generate_all_fixes(request: AllFixesGenerateRequest, timeout: float = FIX_TIMEOUT_SECONDS) -> AsyncIterator[Tuple[str, FixResponse, bool]]:
+    """Run every requested category concurrently, yielding each as it finishes"""
+    tasks = [
+        asyncio.create_task(run_fix_category(category, getattr(request, category), timeout))
+        for category in FIX_GENERATORS
+        if getattr(request, category) is not None
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+FIX_PROMPTS = {
+    "seo": seo_fix_prompts,
+    "speed": speed_fix_prompts,
+    "content": content_fix_prompts,
+}
+
+
+async def stream_fix_events(category: str, request: BaseModel) -> AsyncIterator[Dict[str, Any]]:
+    """
+    One category's fixes as events: {"fix": {...}} as each fix is parsed, then
+    {"done": true, "summary", "complete", "fallback"}. Fixes already sent are kept
+    if the response breaks off; if none arrive, the rule-based fixes are sent instead.
+    """
+    system_prompt, user_prompt = FIX_PROMPTS[category](request)
+    cache_key = make_key(LLM_MODEL, system_prompt, user_prompt)
+    cached = await get_cached(f"{category}_fixes", cache_key)
+    if cached:
+        for fix in cached["fixes"]:
+            yield {"fix": fix}
+        yield {"done": True, "summary": cached["summary"], "complete": True, "fallback": False}
+        return
+
+    parser = ArrayStreamParser("fixes")
+    try:
+        async for fix in stream_ai_fixes(category, parser, system_prompt, user_prompt):
+            yield {"fix": fix}
+    except Exception as e:
+        logger.error(f"{category} fix stream failed after {len(parser.items)} fixes: {e}")
+
+    parsed, complete = parsed_fixes(category, parser)
+    if parser.items or complete:
+        if complete:
+            await set_cached(f"{category}_fixes", cache_key, parsed)
+        yield {"done": True, "summary": parsed["summary"], "complete": complete, "fallback": False}
+        return
+
+    fallback = FIX_GENERATORS[category][1](request)
+    for fix in fallback.fixes:
+        yield {"fix": fix}
+    yield {"done": True, "summary": fallback.summary, "complete": True, "fallback": True}
@@ -0,0 +1,167 @@
+"""
+SITERANK AI - Batch Analysis
+Runs many site analyses at once, scraping shared competitors only once per batch
+"""
+
+import asyncio
+import csv
+import io
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from pydantic import BaseModel, Field
+
+from metrics import record_cache_lookup
+from models import AnalysisCreate
+from scraper import scrape_website
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_SITES = int(os.environ.get('BATCH_MAX_SITES', '500'))
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', '4'))
+MAX_COMPETITORS_PER_SITE = 5
+
+
+# ==================== Request/Response Models ====================
+
+class BatchAnalysisCreate(BaseModel):
+    sites: List[AnalysisCreate]
+
+
+class BatchAnalysisResponse(BaseModel):
+    id: str
+    status: str
+    total: int
+    pending: int = 0
+    processing: int = 0
+    completed: int = 0
+    failed: int = 0
+    unique_competitors: int = 0
+    analysis_ids: List[str] = []
+    created_at: str
+    completed_at: Optional[str] = None
+
+
+class AnalysisBatch(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    analysis_ids: List[str] = []
+    total: int = 0
+    unique_competitors: int = 0
+    status: str = "processing"  # processing, completed
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    completed_at: Optional[datetime] = None
+
+
+# ==================== Input Parsing ====================
+
+def normalize_site_url(url: str) -> str:
+    """
+    Normalize a URL so the same site is recognised across a batch.
+    Only the scheme and host are case-insensitive; the path keeps its case.
+    """
+    url = url.strip()
+    if not url.lower().startswith(('http://', 'https://')):
+        url = 'https://' + url
+    parts = urlsplit(url)
+    userinfo, at, host = parts.netloc.rpartition('@')
+    netloc = userinfo + at + host.lower()
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path, parts.query, parts.fragment)).rstrip('/')
+
+
+def parse_batch_csv(content: str) -> List[AnalysisCreate]:
+    """
+    Parse a CSV upload into analysis requests.
+    The first column is the user site, remaining columns are competitors.
+    A single column may also hold several competitors separated by ';'.
+    """
+    sites = []
+    reader = csv.reader(io.StringIO(content))
+    for row in reader:
+        cells = [cell.strip() for cell in row if cell and cell.strip()]
+        if not cells or cells[0].startswith('#'):
+            continue
+        if cells[0].lower() in ('user_site_url', 'site', 'url'):
+            continue  # header row
+
+        competitors = []
+        for cell in cells[1:]:
+            competitors.extend(part.strip() for part in cell.split(';') if part.strip())
+
+        sites.append(AnalysisCreate(user_site_url=cells[0], competitor_urls=competitors))
+    return sites
+
+
+def validate_batch(sites: List[AnalysisCreate]) -> Optional[str]:
+    """Return an error message if the batch can't be accepted"""
+    if not sites:
+        return "Batch must contain at least one site"
+    if len(sites) > BATCH_MAX_SITES:
+        return f"Maximum {BATCH_MAX_SITES} sites allowed per batch"
+    for site in sites:
+        if not site.user_site_url:
+            return "User site URL is required for every site"
+        if len(site.competitor_urls) > MAX_COMPETITORS_PER_SITE:
+            return f"Maximum {MAX_COMPETITORS_PER_SITE} competitor URLs allowed for {site.user_site_url}"
+    return None
+
+
+def count_unique_competitors(sites: List[AnalysisCreate]) -> int:
+    """Count distinct competitor URLs across the batch"""
+    return len({normalize_site_url(url) for site in sites for url in site.competitor_urls})
+
+
+# ==================== Shared Scraping ====================
+
+class BatchScraper:
+    """Scrapes each URL at most once, with a bound on concurrent fetches"""
+
+    def __init__(self, max_concurrency: int = BATCH_MAX_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._results: Dict[str, asyncio.Future] = {}
+
+    async def scrape(self, url: str) -> Tuple[bool, Dict]:
+        """Scrape a URL, sharing the result with every caller that asks for it"""
+        key = normalize_site_url(url)
+        if key not in self._results:
+            record_cache_lookup("batch_scrapes", "miss")
+            self._results[key] = asyncio.ensure_future(self._fetch(url))
+        else:
+            record_cache_lookup("batch_scrapes", "hit")
+        # Shield so one cancelled caller doesn't cancel the fetch for the others
+        return await asyncio.shield(self._results[key])
+
+    async def _fetch(self, url: str) -> Tuple[bool, Dict]:
+        async with self._semaphore:
+            return await asyncio.to_thread(scrape_website, url)
+
+    @property
+    def fetched_count(self) -> int:
+        return len(self._results)
+
+
+async def run_batch(
+    jobs: List[Tuple[str, str, List[str]]],
+    run_analysis: Callable[..., Awaitable[None]],
+    max_concurrency: int = BATCH_MAX_CONCURRENCY,
+    scraper: Optional[BatchScraper] = None
+) -> BatchScraper:
+    """
+    Run (analysis_id, user_site_url, competitor_urls) jobs with bounded concurrency.
+    All jobs share one BatchScraper (a new one unless given) so common
+    competitors are fetched once.
+    """
+    scraper = scraper or BatchScraper(max_concurrency=max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(analysis_id: str, user_site_url: str, competitor_urls: List[str]):
+        async with semaphore:
+            await run_analysis(analysis_id, user_site_url, competitor_urls, scraper=scraper)
+
+    await asyncio.gather(*(run_one(*job) for job in jobs), return_exceptions=True)
+    logger.info(f"Batch finished: {len(jobs)} analyses, {scraper.fetched_count} unique pages fetched")
+    return scraper
@@ -0,0 +1,125 @@
+"""
+SITERANK AI - Artifact Storage Benchmark
+Compares BSON size and read latency of analysis artifacts stored plain
+versus compressed through artifact_store.
+
+Usage:
+    python benchmarks/bench_artifact_storage.py                 # synthetic documents
+    python benchmarks/bench_artifact_storage.py --mongo -n 200  # sample from MONGO_URL/DB_NAME
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import bson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from artifact_store import pack, unpack, zstandard  # noqa: E402
+from llm_engine import generate_fallback_suggestions  # noqa: E402
+from optimization_engine import generate_optimization_blueprint  # noqa: E402
+
+
+def synthetic_documents(count: int):
+    """Representative analysis/optimization artifacts built from the real generators"""
+    scores = {"seo_score": 48, "speed_score": 62, "content_score": 35, "ux_score": 71, "overall_score": 52}
+    competitors = [{"url": f"competitor{i}.com", "scores": {k: v + i * 7 for k, v in scores.items()}} for i in range(5)]
+    details = {
+        "seo_details": {"title": "Acme Widgets - Industrial Widgets & Parts", "h1_texts": ["Widgets for every job"] * 3,
+                        "og_tags": {f"og:{k}": "x" * 80 for k in ("title", "description", "image", "url")}},
+        "speed_details": {"load_time": 1.84, "page_size_kb": 812.5, "css_files": 7, "js_files": 19},
+        "content_details": {"word_count": 1312, "unique_words": 544, "paragraph_count": 28},
+        "ux_details": {"has_viewport_meta": True, "form_count": 2, "accessibility_score": 64},
+    }
+    blueprint = asyncio.run(generate_optimization_blueprint("https://acme.example", scores, competitors, {}))
+    suggestions, _ = generate_fallback_suggestions(scores, {})
+    # LLM write-ups run several times longer than the fallback template
+    suggestions = "\n\n".join([suggestions] * 6)
+
+    for i in range(count):
+        yield {
+            "ai_suggestions": suggestions + f"\n<!-- {i} -->",
+            "blueprint": blueprint,
+            "details": {"user_site": details, "competitors": [{"url": c["url"], **details} for c in competitors]},
+        }
+
+
+def mongo_documents(count: int):
+    """Sample real artifacts from the configured database"""
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+    db = MongoClient(os.environ['MONGO_URL'])[os.environ['DB_NAME']]
+    analyses = db.analyses.find({"status": "completed"}, {"_id": 0, "ai_suggestions": 1}).limit(count)
+    optimizations = db.optimizations.find({}, {"_id": 0, "blueprint": 1}).limit(count)
+    details = db.analysis_details.find({}, {"_id": 0, "user_site": 1, "competitors": 1}).limit(count)
+    for a, o, d in zip(analyses, optimizations, details):
+        yield {
+            "ai_suggestions": unpack(a.get("ai_suggestions", "")),
+            "blueprint": unpack(o.get("blueprint", {})),
+            "details": {"user_site": unpack(d.get("user_site")), "competitors": unpack(d.get("competitors"))},
+        }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(documents, codec):
+    """BSON size and decode latency for one storage variant (codec None = plain)"""
+    sizes, read_ms = [], []
+    for doc in documents:
+        stored = doc if codec is None else {k: pack(v, codec=codec) for k, v in doc.items()}
+        encoded = bson.encode(stored)
+        sizes.append(len(encoded))
+
+        start = time.perf_counter()
+        decoded = bson.decode(encoded)
+        for key in decoded:
+            decoded[key] = unpack(decoded[key])
+        read_ms.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "codec": codec or "plain",
+        "documents": len(sizes),
+        "total_bytes": sum(sizes),
+        "avg_bytes": round(statistics.mean(sizes)),
+        "read_p50_ms": round(percentile(read_ms, 50), 4),
+        "read_p99_ms": round(percentile(read_ms, 99), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--count", type=int, default=200, help="documents to measure")
+    parser.add_argument("--mongo", action="store_true", help="sample documents from MongoDB instead of synthesizing")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    source = mongo_documents if args.mongo else synthetic_documents
+    documents = list(source(args.count))
+    if not documents:
+        sys.exit("No documents to benchmark")
+
+    codecs = [None, "gzip"] + (["zstd"] if zstandard else [])
+    results = [measure(documents, codec) for codec in codecs]
+    plain = results[0]["total_bytes"]
+    for result in results:
+        result["size_ratio"] = round(result["total_bytes"] / plain, 3)
+
+    output = json.dumps({"source": "mongo" if args.mongo else "synthetic", "results": results}, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
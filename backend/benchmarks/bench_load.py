@@ -0,0 +1,316 @@
+"""
+SITERANK AI - API Load Test
+Concurrent virtual users drive the API over HTTP with a realistic endpoint
+mix, and the run reports RPS, latency percentiles and error rates per endpoint.
+
+By default one uvicorn worker is started in a subprocess, on the in-memory
+database, with site scrapes and LLM calls served from a replay cassette, so
+the numbers are the capacity of a single worker on this machine.
+
+Usage:
+    python benchmarks/bench_load.py --users 20 --duration 30                 # mixed traffic
+    python benchmarks/bench_load.py --mix browse --users 100 --output base.json
+    python benchmarks/bench_load.py --mix audit --latency none               # scraping CPU only
+    python benchmarks/bench_load.py --mongo                                  # worker on MONGO_URL/DB_NAME
+    python benchmarks/bench_load.py --url http://localhost:8001              # an already running server
+    python benchmarks/bench_load.py --baseline base.json --threshold 0.2     # exit 1 on regression
+
+    # The worker side, started by the above
+    python benchmarks/bench_load.py --serve --port 8765 --cassette cassettes/synthetic.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+SITE = "acme-widgets.example"
+COMPETITORS = ["bolt-supply.example", "gearhub.example", "partsworks.example"]
+PASSWORD = "LoadTest123!"
+
+# Relative weights of each action per mix; every virtual user registers first
+MIXES = {
+    "browse": {"list_analyses": 40, "dashboard": 30, "me": 20, "login": 10},
+    "audit": {"seo_audit": 35, "speed_audit": 35, "content_audit": 30},
+    "mixed": {
+        "list_analyses": 30, "dashboard": 25, "me": 10, "login": 5,
+        "seo_audit": 8, "speed_audit": 6, "content_audit": 6, "create_analysis": 10
+    },
+}
+
+
+# ==================== Worker ====================
+
+def serve(args) -> None:
+    """Run the app in this process: in-memory database, outbound calls from the cassette"""
+    from dotenv import load_dotenv
+
+    load_dotenv(BACKEND_DIR / '.env')
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'siterank_load')
+    os.environ.setdefault('EMERGENT_LLM_KEY', 'replay')
+    os.environ.setdefault('NVIDIA_API_KEY', 'replay')
+    # Every request should do its real work, and no loops should compete with it
+    os.environ['LLM_CACHE_ENABLED'] = 'false'
+    os.environ['MONITORING_ENABLED'] = 'false'
+    os.environ['ARCHIVE_AFTER_DAYS'] = '0'
+
+    import uvicorn
+    import server
+    from memory_db import MemoryDatabase
+    from replay import replaying
+
+    if not args.mongo:
+        server.db = MemoryDatabase()
+    with replaying(args.cassette, latency=args.latency):
+        uvicorn.run(server.app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Worker did not become healthy")
+
+
+# ==================== Virtual Users ====================
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, endpoint: str, started: float, status: int, ok: bool) -> None:
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        self.statuses[endpoint][str(status)] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+
+
+class VirtualUser:
+    """One signed-up user repeatedly picking actions from the mix"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        self.headers = {}
+
+    async def call(self, endpoint: str, method: str, path: str, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.add(endpoint, started, 0, False)
+            return None
+        self.recorder.add(endpoint, started, response.status_code, response.status_code in ok)
+        return response
+
+    async def register(self) -> bool:
+        response = await self.call("register", "POST", "/api/auth/register",
+                                   json={"email": self.email, "password": PASSWORD, "name": "Load Test"})
+        if response is None or response.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def login(self):
+        await self.call("login", "POST", "/api/auth/login", json={"email": self.email, "password": PASSWORD})
+
+    async def me(self):
+        await self.call("me", "GET", "/api/auth/me")
+
+    async def list_analyses(self):
+        await self.call("list_analyses", "GET", "/api/analyses", params={"limit": 20})
+
+    async def dashboard(self):
+        await self.call("dashboard", "GET", "/api/dashboard/stats")
+
+    async def seo_audit(self):
+        await self.call("seo_audit", "POST", "/api/seo/analyze", json={"url": SITE})
+
+    async def speed_audit(self):
+        await self.call("speed_audit", "POST", "/api/speed/analyze", json={"url": SITE})
+
+    async def content_audit(self):
+        await self.call("content_audit", "POST", "/api/content/analyze", json={"url": SITE})
+
+    async def create_analysis(self):
+        await self.call("create_analysis", "POST", "/api/analyses",
+                        json={"user_site_url": SITE, "competitor_urls": COMPETITORS})
+
+    async def run(self, mix: dict, deadline: float, think: float) -> None:
+        if not await self.register():
+            return
+        actions, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            await getattr(self, self.rng.choices(actions, weights)[0])()
+            if think:
+                await asyncio.sleep(self.rng.uniform(0, 2 * think))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.latencies.items()):
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50), 1),
+            "p90_ms": round(percentile(samples, 90), 1),
+            "p99_ms": round(percentile(samples, 99), 1),
+            "mean_ms": round(statistics.mean(samples), 1),
+            "error_rate": round(recorder.errors[endpoint] / len(samples), 4),
+            "statuses": dict(recorder.statuses[endpoint])
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    errors = sum(recorder.errors.values())
+    every = [ms for samples in recorder.latencies.values() for ms in samples]
+    return {
+        "total": {
+            "requests": total,
+            "rps": round(total / elapsed, 2),
+            "p50_ms": round(percentile(every, 50), 1) if every else None,
+            "p99_ms": round(percentile(every, 99), 1) if every else None,
+            "error_rate": round(errors / total, 4) if total else None
+        },
+        "endpoints": endpoints
+    }
+
+
+async def generate_load(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        await wait_until_healthy(client)
+        recorder = Recorder()
+        rng = random.Random(args.seed)
+        started = time.monotonic()
+        deadline = started + args.duration
+        users = []
+        for i in range(args.users):
+            user = VirtualUser(client, recorder, random.Random(rng.random()))
+            users.append(asyncio.create_task(user.run(MIXES[args.mix], deadline, args.think)))
+            # Ramp up instead of registering everyone in the same instant
+            if args.ramp:
+                await asyncio.sleep(args.ramp / args.users)
+        await asyncio.gather(*users)
+        return report(recorder, time.monotonic() - started)
+
+
+def compare(results, baseline, threshold):
+    """Lower throughput, slower endpoints or more errors than the baseline"""
+    problems = []
+    before = baseline.get('total', {})
+    if before.get('rps') and results['total']['rps'] < before['rps'] * (1 - threshold):
+        problems.append(f"total: {results['total']['rps']} rps vs baseline {before['rps']}")
+    for endpoint, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(endpoint)
+        if not previous:
+            continue
+        if current['p99_ms'] > previous['p99_ms'] * (1 + threshold):
+            problems.append(f"{endpoint}: p99 {current['p99_ms']}ms vs baseline {previous['p99_ms']}ms")
+        if current['error_rate'] > previous['error_rate'] + 0.01:
+            problems.append(f"{endpoint}: error rate {current['error_rate']} vs baseline {previous['error_rate']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which users start")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean seconds a user waits between actions")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout")
+    parser.add_argument("--url", help="Target a running server instead of starting a worker")
+    parser.add_argument("--cassette", help="Replay cassette for the worker (default: a synthetic one)")
+    parser.add_argument("--latency", default="recorded", help="recorded, none, fixed:<seconds> or scale:<factor>")
+    parser.add_argument("--mongo", action="store_true", help="Worker uses MONGO_URL/DB_NAME instead of memory")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed RPS drop / p99 growth vs the baseline")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    worker = None
+    base_url = args.url
+    if not base_url:
+        if not args.cassette:
+            from corpus import synthesize_cassette
+            args.cassette = str(Path(tempfile.mkdtemp()) / "synthetic.json")
+            synthesize_cassette(args.cassette, SITE, COMPETITORS)
+        port = free_port()
+        command = [sys.executable, __file__, "--serve", "--port", str(port),
+                   "--cassette", args.cassette, "--latency", args.latency]
+        worker = subprocess.Popen(command + (["--mongo"] if args.mongo else []))
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        results = asyncio.run(generate_load(base_url, args))
+    finally:
+        if worker is not None:
+            worker.terminate()
+            worker.wait(timeout=10)
+
+    results = {
+        "target": args.url or "worker",
+        "mix": args.mix,
+        "users": args.users,
+        "duration_s": args.duration,
+        "latency": args.latency,
+        "database": "external" if args.url else "mongo" if args.mongo else "memory",
+        **results
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        problems = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
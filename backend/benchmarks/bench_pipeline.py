@@ -0,0 +1,190 @@
+"""
+SITERANK AI - Pipeline Benchmark
+Runs the full run_analysis and /optimize pipelines against recorded (or
+synthesized) site scrapes and LLM replies, on an in-memory database, and
+compares wall time and outputs against a stored baseline.
+
+Usage:
+    # Capture real traffic once (needs network, EMERGENT_LLM_KEY and NVIDIA_API_KEY)
+    python benchmarks/bench_pipeline.py --record --cassette cassettes/acme.json --site acme.com
+
+    # Replay offline; --latency none|fixed:<s>|scale:<x> overrides the recorded timings
+    python benchmarks/bench_pipeline.py --cassette cassettes/acme.json -n 10 --output run.json
+
+    # No cassette at hand: synthetic pages and canned LLM replies
+    python benchmarks/bench_pipeline.py --synthesize cassettes/synthetic.json --latency none
+
+    # Fail (exit 1) when p50 regresses more than 20% or scores drift from a baseline run
+    python benchmarks/bench_pipeline.py --cassette cassettes/acme.json --baseline run.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Real keys (from .env) are only needed when recording; replay just needs them set.
+# The response cache would turn every iteration after the first into a cache hit.
+load_dotenv(BACKEND_DIR / '.env')
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'siterank_bench')
+os.environ.setdefault('EMERGENT_LLM_KEY', 'replay')
+os.environ.setdefault('NVIDIA_API_KEY', 'replay')
+os.environ['LLM_CACHE_ENABLED'] = 'false'
+
+from corpus import synthesize_cassette  # noqa: E402
+from memory_db import MemoryDatabase  # noqa: E402
+from replay import RECORD, REPLAY, replaying  # noqa: E402
+
+BENCH_USER = {"user_id": "bench-user", "email": "bench@example.com"}
+
+
+# ==================== Flows ====================
+
+async def analysis_flow(server, site: str, competitors: list) -> dict:
+    """One background analysis, end to end; returns the headline scores"""
+    analysis_id = str(uuid.uuid4())
+    await server.db.analyses.insert_one({
+        "id": analysis_id, "user_id": BENCH_USER['user_id'], "user_site_url": site,
+        "status": "pending", "created_at": datetime.now(timezone.utc).isoformat()
+    })
+    await server.run_analysis(analysis_id, site, competitors)
+    doc = await server.db.analyses.find_one({"id": analysis_id}, {"_id": 0})
+    if doc['status'] != "completed":
+        raise RuntimeError(doc.get('ai_suggestions', 'analysis failed'))
+    return {
+        "overall_score": doc['overall_score'],
+        "competitor_scores": [c['scores']['overall_score'] for c in doc['competitors']],
+        "action_items": len(doc['action_plan'])
+    }
+
+
+async def optimize_flow(server, site: str, competitors: list) -> dict:
+    """POST /optimize with competitor auto-detection forced through the LLM"""
+    result = await server.generate_optimization(
+        server.OptimizeRequest(user_site_url=site, auto_detect_competitors=True, force_refresh=True),
+        current_user=BENCH_USER
+    )
+    return {
+        "overall_score": result['user_scores']['overall_score'],
+        "competitor_scores": sorted(c['scores']['overall_score'] for c in result['competitors']),
+        "blueprint_sections": len(result['blueprint'])
+    }
+
+
+FLOWS = {"analysis": analysis_flow, "optimize": optimize_flow}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_flows(server, flows, iterations, site, competitors):
+    results = {}
+    for name in flows:
+        timings, outputs = [], []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            outputs.append(await FLOWS[name](server, site, competitors))
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            "iterations": iterations,
+            "p50_ms": round(percentile(timings, 50), 1),
+            "p99_ms": round(percentile(timings, 99), 1),
+            "mean_ms": round(statistics.mean(timings), 1),
+            "max_ms": round(max(timings), 1),
+            # Replay is deterministic, so every iteration should produce the same output
+            "output": outputs[-1],
+            "stable": all(o == outputs[0] for o in outputs)
+        }
+    return results
+
+
+def compare(results, baseline, threshold, latency):
+    """Regressions against a baseline run: slower p50 beyond threshold, or different outputs"""
+    problems = []
+    # Replayed latency feeds the measured load time, and so the speed scores
+    same_latency = baseline.get('latency') == latency
+    for name, current in results.items():
+        before = baseline.get('flows', {}).get(name)
+        if not before:
+            continue
+        if current['p50_ms'] > before['p50_ms'] * (1 + threshold):
+            problems.append(f"{name}: p50 {current['p50_ms']}ms vs baseline {before['p50_ms']}ms")
+        if same_latency and current['output'] != before['output']:
+            problems.append(f"{name}: output changed {before['output']} -> {current['output']}")
+        if not current['stable']:
+            problems.append(f"{name}: output differed between iterations")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", help="Cassette to replay (or write, with --record)")
+    parser.add_argument("--record", action="store_true", help="Make real calls once and save them to --cassette")
+    parser.add_argument("--synthesize", metavar="PATH", help="Write a synthetic cassette to PATH and replay it")
+    parser.add_argument("--latency", default="recorded", help="recorded, none, fixed:<seconds> or scale:<factor>")
+    parser.add_argument("-n", type=int, default=5, help="Iterations per flow")
+    parser.add_argument("--site", default="acme-widgets.example")
+    parser.add_argument("--competitors", nargs="*",
+                        default=["bolt-supply.example", "gearhub.example", "partsworks.example"])
+    parser.add_argument("--flow", choices=["analysis", "optimize", "both"], default="both")
+    parser.add_argument("--mongo", action="store_true", help="Use MONGO_URL/DB_NAME instead of the in-memory database")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown vs the baseline")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        synthesize_cassette(args.synthesize, args.site, args.competitors)
+        args.cassette = args.synthesize
+    if not args.cassette:
+        parser.error("--cassette or --synthesize is required")
+
+    import server
+    if not args.mongo:
+        server.db = MemoryDatabase()
+
+    flows = ["analysis", "optimize"] if args.flow == "both" else [args.flow]
+    mode = RECORD if args.record else REPLAY
+    iterations = 1 if args.record else args.n
+
+    async def run():
+        with replaying(args.cassette, mode=mode, latency=args.latency):
+            return await run_flows(server, flows, iterations, args.site, args.competitors)
+
+    results = asyncio.run(run())
+    report = {
+        "cassette": args.cassette,
+        "mode": mode,
+        "latency": args.latency,
+        "database": "mongo" if args.mongo else "memory",
+        "flows": results
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.baseline:
+        problems = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold, args.latency)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
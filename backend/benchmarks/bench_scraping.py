@@ -0,0 +1,215 @@
+"""
+SITERANK AI - Scraping & Scoring Benchmark
+Times fetch, parse, each WebsiteScraper.get_*_data extractor, scoring and the
+whole scrape_website -> analyze_scraped_data pipeline over pages from 5KB to
+10MB served by a local HTTP server, and compares the run against a baseline.
+
+Usage:
+    python benchmarks/bench_scraping.py                           # synthetic 5KB-10MB corpus (minutes)
+    python benchmarks/bench_scraping.py --sizes 5kb 50kb 500kb    # quick run
+    python benchmarks/bench_scraping.py --pages ~/saved-pages     # plus real pages saved as *.html
+    python benchmarks/bench_scraping.py --cassette cassettes/acme.json --only-extra
+    python benchmarks/bench_scraping.py --output base.json
+    python benchmarks/bench_scraping.py --baseline base.json --threshold 0.25   # exit 1 on regression
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from analyzer import analyze_scraped_data  # noqa: E402
+from corpus import SYNTHETIC_SIZES, cassette_corpus, directory_corpus, synthetic_corpus  # noqa: E402
+from scraper import WebsiteScraper, scrape_website  # noqa: E402
+
+# In the order scrape_all runs them; get_content_data strips scripts and
+# styles from the soup, so each pass needs a fresh parse
+EXTRACTORS = ("seo", "speed", "content", "ux")
+STAGES = ("fetch", "parse") + EXTRACTORS + ("score", "pipeline")
+
+
+# ==================== Local Server ====================
+
+class CorpusHandler(BaseHTTPRequestHandler):
+    """Serves /<name> from the corpus, with the headers the speed extractor reads"""
+
+    pages = {}
+
+    def do_GET(self):
+        page = self.pages.get(self.path.strip('/'))
+        if page is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Cache-Control", "max-age=300")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(pages):
+    CorpusHandler.pages = {name: html.encode('utf-8') for name, html in pages.items()}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CorpusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ==================== Measurement ====================
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux (bytes on macOS); it only ever grows, so pages
+    # are measured smallest first and each reading covers the pages so far
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def breakdown_pass(url: str) -> dict:
+    """One pass through scrape_all's steps, timing each (ms)"""
+    timings = {}
+    scraper = WebsiteScraper(url)
+
+    started = time.perf_counter()
+    scraper.response = requests.get(url, timeout=60)
+    scraper.load_time = time.perf_counter() - started
+    timings["fetch"] = scraper.load_time * 1000
+
+    started = time.perf_counter()
+    scraper.soup = BeautifulSoup(scraper.response.text, 'html.parser')
+    timings["parse"] = (time.perf_counter() - started) * 1000
+
+    data = {'url': url, 'title': scraper.soup.title.get_text(strip=True) if scraper.soup.title else ''}
+    for name in EXTRACTORS:
+        started = time.perf_counter()
+        data[name] = getattr(scraper, f"get_{name}_data")()
+        timings[name] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    analyze_scraped_data(data)
+    timings["score"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def pipeline_pass(url: str) -> float:
+    started = time.perf_counter()
+    success, data = scrape_website(url)
+    if not success:
+        raise RuntimeError(f"Scrape of {url} failed: {data.get('error')}")
+    analyze_scraped_data(data)
+    return (time.perf_counter() - started) * 1000
+
+
+def summarize(samples, size_bytes):
+    p50 = percentile(samples, 50)
+    return {
+        "iterations": len(samples),
+        "p50_ms": round(p50, 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "pages_per_s": round(1000 / p50, 2) if p50 else None,
+        "mb_per_s": round(size_bytes / (1024 * 1024) / (p50 / 1000), 2) if p50 else None
+    }
+
+
+def bench_page(url: str, size_bytes: int, iterations: int, budget: float) -> dict:
+    """At least 3 and at most `iterations` passes, stopping once `budget` seconds are spent"""
+    samples = {stage: [] for stage in STAGES}
+    deadline = time.monotonic() + budget
+    for i in range(iterations):
+        for stage, ms in breakdown_pass(url).items():
+            samples[stage].append(ms)
+        samples["pipeline"].append(pipeline_pass(url))
+        if i >= 2 and time.monotonic() > deadline:
+            break
+    return {
+        "bytes": size_bytes,
+        "stages": {stage: summarize(values, size_bytes) for stage, values in samples.items()},
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def compare(results, baseline, threshold):
+    """Stages whose p50 slowed down more than threshold relative to the baseline"""
+    problems = []
+    for name, page in results['pages'].items():
+        before = baseline.get('pages', {}).get(name)
+        if not before:
+            continue
+        for stage, current in page['stages'].items():
+            previous = before['stages'].get(stage)
+            # Sub-millisecond stages are mostly timer noise
+            if previous and previous['p50_ms'] >= 1 and current['p50_ms'] > previous['p50_ms'] * (1 + threshold):
+                problems.append(f"{name}/{stage}: p50 {current['p50_ms']}ms vs baseline {previous['p50_ms']}ms")
+        if page['peak_rss_mb'] > before['peak_rss_mb'] * (1 + threshold):
+            problems.append(f"{name}: peak RSS {page['peak_rss_mb']}MB vs baseline {before['peak_rss_mb']}MB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", help="Directory of real pages saved as *.html")
+    parser.add_argument("--cassette", help="Replay cassette whose recorded pages join the corpus")
+    parser.add_argument("--sizes", nargs="*", choices=list(SYNTHETIC_SIZES), default=list(SYNTHETIC_SIZES),
+                        help="Synthetic page sizes to include")
+    parser.add_argument("--only-extra", action="store_true", help="Skip the synthetic corpus")
+    parser.add_argument("-n", type=int, default=20, help="Max iterations per page")
+    parser.add_argument("--budget", type=float, default=15.0, help="Seconds per page before stopping early")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p50 slowdown vs the baseline")
+    args = parser.parse_args()
+
+    pages = {} if args.only_extra else synthetic_corpus(args.sizes)
+    if args.pages:
+        pages.update(directory_corpus(args.pages))
+    if args.cassette:
+        pages.update(cassette_corpus(args.cassette))
+    if not pages:
+        parser.error("The corpus is empty")
+
+    server = serve(pages)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    results = {"python": sys.version.split()[0], "pages": {}}
+    try:
+        for name, html in sorted(pages.items(), key=lambda item: len(item[1])):
+            size = len(html.encode('utf-8'))
+            print(f"{name}: {size / 1024:.0f}KB ...", file=sys.stderr)
+            results['pages'][name] = bench_page(f"{base_url}/{name}", size, args.n, args.budget)
+    finally:
+        server.shutdown()
+        server.server_close()
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        problems = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+SITERANK AI - Benchmark Page Corpus
+Synthetic HTML pages and replay cassettes for the benchmarks, plus loaders
+for real pages saved to a directory or captured in a cassette
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Name -> target size in bytes of the synthetic corpus
+SYNTHETIC_SIZES = {
+    "5kb": 5 * 1024,
+    "50kb": 50 * 1024,
+    "500kb": 500 * 1024,
+    "2mb": 2 * 1024 * 1024,
+    "10mb": 10 * 1024 * 1024,
+}
+
+WORDS = (
+    "widget industrial supply parts delivery pricing quality support warranty install guide team "
+    "customer order catalog shipping steel bracket bearing fastener design engineering service fast "
+    "reliable secure platform analytics dashboard report insight growth search blog article news faq"
+).split()
+
+
+def synthetic_page(domain: str, sections: int = 12) -> str:
+    """A plausible marketing page: head metadata, nav, headed sections, images, forms, scripts"""
+    name = domain.split('.')[0].title()
+    body = []
+    for i in range(sections):
+        # Every third image is missing its alt text
+        alt = f' alt="Feature {i}"' if i % 3 else ''
+        body.append(
+            f"<section><h2>{name} feature {i}</h2>"
+            f"<p>{name} helps teams ship faster with feature {i}. " + "Reliable, secure and fast tooling. " * 12 + "</p>"
+            f"<img src=\"/img/feature{i}.png\"{alt}>"
+            f"<a href=\"/features/{i}\">Learn more</a></section>"
+        )
+    return (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">"
+        f"<title>{name} - Tools for modern teams</title>"
+        f"<meta name=\"description\" content=\"{name} builds tools that help modern teams plan, build and ship.\">"
+        f"<meta property=\"og:title\" content=\"{name}\"><link rel=\"canonical\" href=\"https://{domain}/\">"
+        + "".join(f"<link rel=\"stylesheet\" href=\"/css/{i}.css\">" for i in range(3))
+        + "</head><body><nav><a href=\"/\">Home</a><a href=\"/pricing\">Pricing</a><a href=\"/blog\">Blog</a></nav>"
+        f"<h1>{name}</h1>" + "".join(body)
+        + "<form action=\"/signup\"><label for=\"email\">Email</label><input id=\"email\" type=\"email\"></form>"
+        + "".join(f"<script src=\"/js/{i}.js\" defer></script>" for i in range(4))
+        + "</body></html>"
+    )
+
+
+def _block(rng: random.Random, i: int) -> str:
+    """One chunk of page body, cycling through the markup real pages are made of"""
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 90)))
+    kind = i % 6
+    if kind == 0:
+        return f"<article><h2>Section {i}</h2><p>{text}.</p><p>{text[:200]}.</p></article>"
+    if kind == 1:
+        rows = "".join(f"<tr><td>SKU-{i}-{r}</td><td>{rng.choice(WORDS)}</td><td>${rng.randint(5, 900)}</td></tr>"
+                       for r in range(8))
+        return f"<table><thead><tr><th>SKU</th><th>Item</th><th>Price</th></tr></thead><tbody>{rows}</tbody></table>"
+    if kind == 2:
+        items = "".join(f"<li><a href=\"{'/' if r % 2 else 'https://partner.example/'}p/{i}/{r}\">{rng.choice(WORDS)}</a></li>"
+                        for r in range(10))
+        return f"<ul class=\"links\">{items}</ul>"
+    if kind == 3:
+        alt = f' alt="{rng.choice(WORDS)} photo"' if i % 4 else ''
+        return f"<figure><img src=\"/img/{i}.webp\"{alt} loading=\"lazy\"><figcaption>{text[:80]}</figcaption></figure>"
+    if kind == 4:
+        # Inline JSON state and styles, the code side of the content-to-code ratio
+        state = json.dumps({"id": i, "tags": [rng.choice(WORDS) for _ in range(12)], "price": rng.randint(1, 999)})
+        return f"<script>window.__STATE_{i}__={state};</script><style>.s{i}{{margin:{i % 16}px;color:#{i % 4096:03x}}}</style>"
+    return (f"<div class=\"card\"><h3>{rng.choice(WORDS).title()} {i}</h3><p>{text}</p>"
+            f"<button type=\"button\">Buy</button></div>")
+
+
+def sized_page(target_bytes: int, seed: int = 0) -> str:
+    """A synthetic page grown block by block to roughly target_bytes"""
+    rng = random.Random(seed)
+    head = synthetic_page("bench.example", sections=2)
+    open_body = head.index("<h1>")
+    prefix, suffix = head[:open_body], head[open_body:]
+    blocks, size, i = [], len(head), 0
+    while size < target_bytes:
+        block = _block(rng, i)
+        blocks.append(block)
+        size += len(block)
+        i += 1
+    return prefix + "".join(blocks) + suffix
+
+
+def synthetic_corpus(names: Optional[List[str]] = None) -> Dict[str, str]:
+    return {
+        name: sized_page(size, seed=i)
+        for i, (name, size) in enumerate(SYNTHETIC_SIZES.items())
+        if names is None or name in names
+    }
+
+
+def synthesize_cassette(path: str, site: str, competitors: list) -> None:
+    """
+    A replay cassette with pages for the site and its competitors plus canned
+    replies for every LLM call site of the analysis and optimize flows
+    """
+    from competitor_detector import DETECT_SYSTEM_MESSAGE, DETECTION_MODEL
+    from llm_engine import SUGGESTIONS_MODEL, SUGGESTIONS_SYSTEM_MESSAGE
+    from llm_resilience import EMERGENT
+    from replay import CASSETTE_VERSION, http_key, llm_signature
+
+    entries = []
+    for i, domain in enumerate([site] + competitors):
+        entries.append({
+            "kind": "http", "key": http_key("GET", f"https://{domain}"), "url": f"https://{domain}",
+            "status": 200, "headers": {"Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip",
+                                       "Cache-Control": "max-age=600"},
+            "encoding": "utf-8", "text": synthetic_page(domain, sections=6 + 3 * i),
+            "final_url": f"https://{domain}/", "elapsed": 0.25
+        })
+    detection_model = "/".join(DETECTION_MODEL)
+    suggestions_model = "/".join(SUGGESTIONS_MODEL)
+    entries.append({
+        "kind": "llm", "provider": EMERGENT, "model": detection_model, "key": None,
+        "signature": llm_signature(EMERGENT, detection_model, DETECT_SYSTEM_MESSAGE),
+        "response": json.dumps(competitors), "elapsed": 1.2
+    })
+    entries.append({
+        "kind": "llm", "provider": EMERGENT, "model": suggestions_model, "key": None,
+        "signature": llm_signature(EMERGENT, suggestions_model, SUGGESTIONS_SYSTEM_MESSAGE),
+        "response": json.dumps({
+            "summary": "## Competitive Position\n\nYour site trails competitors on content depth and image accessibility.",
+            "action_items": [
+                "Add alt text to every product image (High Impact)",
+                "Expand feature pages to 800+ words (High Impact)",
+                "Inline critical CSS and defer the rest (Medium Impact)",
+                "Add Open Graph descriptions and images (Medium Impact)",
+                "Publish a comparison page against top competitors (Low Impact)"
+            ]
+        }),
+        "elapsed": 3.0
+    })
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"version": CASSETTE_VERSION, "entries": entries}, f, indent=1)
+
+
+# ==================== Real Pages ====================
+
+def directory_corpus(path: str) -> Dict[str, str]:
+    """Real pages saved as *.html files"""
+    return {
+        p.stem: p.read_text(encoding='utf-8', errors='replace')
+        for p in sorted(Path(path).glob("*.html"))
+    }
+
+
+def cassette_corpus(path: str) -> Dict[str, str]:
+    """Pages captured by a recorded replay cassette"""
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)['entries']
+    return {
+        e['url'].split('://', 1)[-1].replace('/', '_'): e['text']
+        for e in entries
+        if e.get('kind') == 'http' and e.get('status') == 200 and e.get('text')
+    }
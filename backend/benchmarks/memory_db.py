@@ -0,0 +1,474 @@
+"""
+SITERANK AI - In-Memory Database
+A small Motor-compatible stand-in covering the queries and updates the
+backend issues, so pipelines can be benchmarked without a mongod.
+Not a general MongoDB emulator: unsupported operators raise NotImplementedError.
+"""
+
+import copy
+import re
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+# ==================== Matching ====================
+
+def _get(doc: Dict[str, Any], path: str):
+    value = doc
+    for part in path.split('.'):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return {
+            "$lt": value < operand, "$lte": value <= operand,
+            "$gt": value > operand, "$gte": value >= operand
+        }[op]
+    except TypeError:
+        return False
+
+
+def _equals(value, operand) -> bool:
+    if value is _MISSING:
+        return operand is None
+    if isinstance(value, list) and not isinstance(operand, list):
+        return operand in value
+    return value == operand
+
+
+def _condition(value, condition) -> bool:
+    if not (isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition)):
+        return _equals(value, condition)
+    for op, operand in condition.items():
+        if op == "$eq":
+            ok = _equals(value, operand)
+        elif op == "$ne":
+            ok = not _equals(value, operand)
+        elif op in ("$lt", "$lte", "$gt", "$gte"):
+            ok = _compare(value, op, operand)
+        elif op == "$in":
+            ok = any(_equals(value, o) for o in operand)
+        elif op == "$nin":
+            ok = not any(_equals(value, o) for o in operand)
+        elif op == "$exists":
+            ok = (value is not _MISSING) == bool(operand)
+        elif op == "$regex":
+            ok = isinstance(value, str) and re.search(operand, value) is not None
+        else:
+            raise NotImplementedError(f"Query operator {op}")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key.startswith('$'):
+            raise NotImplementedError(f"Query operator {key}")
+        elif not _condition(_get(doc, key), condition):
+            return False
+    return True
+
+
+# ==================== Updates ====================
+
+def _set(doc: Dict[str, Any], path: str, value) -> None:
+    *parents, last = path.split('.')
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc: Dict[str, Any], path: str) -> None:
+    *parents, last = path.split('.')
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> None:
+    if not any(k.startswith('$') for k in update):
+        keep_id = doc.get('_id')
+        doc.clear()
+        doc.update(copy.deepcopy(update))
+        if keep_id is not None:
+            doc['_id'] = keep_id
+        return
+    for op, fields in update.items():
+        for path, value in fields.items():
+            current = _get(doc, path)
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set(doc, path, copy.deepcopy(value))
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                _unset(doc, path)
+            elif op == "$inc":
+                _set(doc, path, (0 if current is _MISSING else current) + value)
+            elif op == "$max":
+                _set(doc, path, value if current is _MISSING else max(current, value))
+            elif op == "$min":
+                _set(doc, path, value if current is _MISSING else min(current, value))
+            elif op == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                _set(doc, path, ([] if current is _MISSING else current) + copy.deepcopy(items))
+            else:
+                raise NotImplementedError(f"Update operator {op}")
+
+
+def _seed(query: Dict[str, Any]) -> Dict[str, Any]:
+    """The equality fields of an upsert's filter"""
+    doc: Dict[str, Any] = {}
+    for key, condition in query.items():
+        if not key.startswith('$') and not (isinstance(condition, dict) and any(k.startswith('$') for k in condition)):
+            _set(doc, key, copy.deepcopy(condition))
+    return doc
+
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    fields = {k: v for k, v in projection.items() if k != '_id'}
+    if any(fields.values()):
+        result = {k: doc[k] for k in fields if k in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            result['_id'] = doc['_id']
+        return result
+    for key in projection:
+        _unset(doc, key)
+    return doc
+
+
+def _sort_key(value):
+    # Missing/None first, then numbers, then strings, as MongoDB orders mixed types
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+def sort_docs(docs: List[Dict[str, Any]], spec) -> List[Dict[str, Any]]:
+    if isinstance(spec, str):
+        spec = [(spec, 1)]
+    for key, direction in reversed(list(spec)):
+        docs = sorted(docs, key=lambda d: _sort_key(_get(d, key)), reverse=direction < 0)
+    return docs
+
+
+# ==================== Collections ====================
+
+# ==================== Aggregation ====================
+
+def _evaluate(doc: Dict[str, Any], expression):
+    """Field paths, literals and the handful of operators the backend's pipelines use"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        value = _get(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        (op, args), = expression.items()
+        if op == "$eq":
+            return _evaluate(doc, args[0]) == _evaluate(doc, args[1])
+        if op == "$cond":
+            return _evaluate(doc, args[1] if _evaluate(doc, args[0]) else args[2])
+        if op == "$ifNull":
+            value = _evaluate(doc, args[0])
+            return _evaluate(doc, args[1]) if value is None else value
+        if op.startswith('$'):
+            raise NotImplementedError(f"Aggregation operator {op}")
+    return expression
+
+
+def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for doc in docs:
+        key = _evaluate(doc, spec["_id"])
+        group = groups.setdefault(repr(key), {"_id": key})
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expression), = accumulator.items()
+            value = _evaluate(doc, expression)
+            if op == "$sum":
+                group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+            elif op == "$max":
+                if value is not None and (group.get(field) is None or value > group[field]):
+                    group[field] = value
+            else:
+                raise NotImplementedError(f"Accumulator {op}")
+    return list(groups.values())
+
+
+class MemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]], projection=None):
+        self._docs = docs
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1) -> "MemoryCursor":
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    def _results(self) -> List[Dict[str, Any]]:
+        docs = sort_docs(self._docs, self._sort) if self._sort else list(self._docs)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [project(d, self._projection) for d in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._results()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+
+
+class MemoryCollection:
+    def __init__(self, name: str, database: Optional["MemoryDatabase"] = None):
+        self.name = name
+        self.database = database
+        self.docs: List[Dict[str, Any]] = []
+        # Unique indexes: (name, fields, sparse)
+        self._unique: List[tuple] = [("_id_", ["_id"], False)]
+
+    def _matching(self, query) -> List[Dict[str, Any]]:
+        return [d for d in self.docs if matches(d, query)]
+
+    def _check_unique(self, doc: Dict[str, Any]) -> None:
+        for name, fields, sparse in self._unique:
+            values = [_get(doc, f) for f in fields]
+            if sparse and all(v is _MISSING for v in values):
+                continue
+            for other in self.docs:
+                if other is not doc and [_get(other, f) for f in fields] == values:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+
+    async def insert_one(self, doc: Dict[str, Any]):
+        # Motor adds _id to the caller's document
+        doc.setdefault('_id', uuid.uuid4().hex)
+        self._check_unique(doc)
+        self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc['_id'], acknowledged=True)
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True):
+        ids = [(await self.insert_one(doc)).inserted_id for doc in docs]
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        docs = self._matching(query)
+        if sort:
+            docs = sort_docs(docs, sort)
+        return project(docs[0], projection) if docs else None
+
+    def find(self, query=None, projection=None) -> MemoryCursor:
+        return MemoryCursor(self._matching(query), projection)
+
+    async def count_documents(self, query=None, **kwargs) -> int:
+        return len(self._matching(query))
+
+    async def distinct(self, key: str, query=None) -> List[Any]:
+        values = []
+        for doc in self._matching(query):
+            value = _get(doc, key)
+            if value is not _MISSING and value not in values:
+                values.append(value)
+        return values
+
+    async def _update(self, query, update, upsert: bool, many: bool):
+        docs = self._matching(query)
+        if not many:
+            docs = docs[:1]
+        modified = 0
+        for doc in docs:
+            before = copy.deepcopy(doc)
+            apply_update(doc, update)
+            try:
+                self._check_unique(doc)
+            except DuplicateKeyError:
+                doc.clear()
+                doc.update(before)
+                raise
+            modified += doc != before
+        upserted_id = None
+        if not docs and upsert:
+            doc = _seed(query)
+            apply_update(doc, update, inserting=True)
+            upserted_id = (await self.insert_one(doc)).inserted_id
+        return SimpleNamespace(matched_count=len(docs), modified_count=modified, upserted_id=upserted_id, acknowledged=True)
+
+    async def update_one(self, query, update, upsert: bool = False):
+        return await self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query, update, upsert: bool = False):
+        return await self._update(query, update, upsert, many=True)
+
+    async def replace_one(self, query, replacement, upsert: bool = False):
+        return await self._update(query, {k: v for k, v in replacement.items() if k != '_id'}, upsert, many=False)
+
+    async def find_one_and_update(
+        self, query, update, projection=None, upsert: bool = False,
+        return_document=ReturnDocument.BEFORE, sort=None
+    ):
+        docs = self._matching(query)
+        if sort:
+            docs = sort_docs(docs, sort)
+        if not docs:
+            if not upsert:
+                return None
+            await self._update(query, update, upsert=True, many=False)
+            return project(self.docs[-1], projection) if return_document == ReturnDocument.AFTER else None
+        doc = docs[0]
+        before = project(doc, projection)
+        apply_update(doc, update)
+        return project(doc, projection) if return_document == ReturnDocument.AFTER else before
+
+    async def find_one_and_delete(self, query, projection=None, sort=None):
+        docs = self._matching(query)
+        if sort:
+            docs = sort_docs(docs, sort)
+        if not docs:
+            return None
+        self.docs.remove(docs[0])
+        return project(docs[0], projection)
+
+    async def delete_one(self, query):
+        docs = self._matching(query)[:1]
+        for doc in docs:
+            self.docs.remove(doc)
+        return SimpleNamespace(deleted_count=len(docs), acknowledged=True)
+
+    async def delete_many(self, query):
+        docs = self._matching(query)
+        doomed = {id(d) for d in docs}
+        self.docs = [d for d in self.docs if id(d) not in doomed]
+        return SimpleNamespace(deleted_count=len(docs), acknowledged=True)
+
+    async def bulk_write(self, operations, ordered: bool = True):
+        counts = dict(inserted_count=0, matched_count=0, modified_count=0, upserted_count=0, deleted_count=0)
+        for op in operations:
+            kind = type(op).__name__
+            if kind == "InsertOne":
+                await self.insert_one(op._doc)
+                counts['inserted_count'] += 1
+                continue
+            if kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                update = op._doc if kind != "ReplaceOne" else {k: v for k, v in op._doc.items() if k != '_id'}
+                result = await self._update(op._filter, update, bool(op._upsert), many=kind == "UpdateMany")
+                counts['matched_count'] += result.matched_count
+                counts['modified_count'] += result.modified_count
+                counts['upserted_count'] += result.upserted_id is not None
+            elif kind in ("DeleteOne", "DeleteMany"):
+                result = await (self.delete_one if kind == "DeleteOne" else self.delete_many)(op._filter)
+                counts['deleted_count'] += result.deleted_count
+            else:
+                raise NotImplementedError(f"Bulk operation {kind}")
+        return SimpleNamespace(acknowledged=True, **counts)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> MemoryCursor:
+        docs = [copy.deepcopy(d) for d in self.docs]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = [d for d in docs if matches(d, spec)]
+            elif name == "$sort":
+                docs = sort_docs(docs, list(spec.items()))
+            elif name == "$skip":
+                docs = docs[spec:]
+            elif name == "$limit":
+                docs = docs[:spec]
+            elif name == "$project":
+                docs = [project(d, spec) for d in docs]
+            elif name == "$count":
+                docs = [{spec: len(docs)}]
+            elif name == "$group":
+                docs = _group(docs, spec)
+            elif name == "$unionWith":
+                other = self.database[spec["coll"]]
+                docs += other.aggregate(spec.get("pipeline", []))._docs
+            else:
+                raise NotImplementedError(f"Aggregation stage {name}")
+        return MemoryCursor(docs)
+
+    async def create_index(self, keys, unique: bool = False, sparse: bool = False, name: Optional[str] = None, **kwargs) -> str:
+        keys = keys if isinstance(keys, list) else [(keys, 1)]
+        name = name or "_".join(f"{k}_{v}" for k, v in keys)
+        if unique and all(existing != name for existing, _, _ in self._unique):
+            self._unique.append((name, [k for k, _ in keys], sparse))
+        return name
+
+    async def create_indexes(self, indexes) -> List[str]:
+        """Only uniqueness is enforced; other index options are accepted and ignored"""
+        names = []
+        for model in indexes:
+            spec = model.document
+            names.append(await self.create_index(
+                list(spec['key'].items()), unique=spec.get('unique', False),
+                sparse=spec.get('sparse', False), name=spec['name']
+            ))
+        return names
+
+    async def drop(self) -> None:
+        self.docs = []
+
+
+class MemoryDatabase:
+    """Collections are created on first access, like Motor's"""
+
+    def __init__(self, name: str = "memory"):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name, self)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, name, *args, **kwargs) -> Dict[str, Any]:
+        return {"ok": 1}
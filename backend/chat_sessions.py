@@ -0,0 +1,180 @@
+"""
+SITERANK AI - Chat Sessions
+Server-side chatbot history, compacted to a token budget by dropping or
+summarizing the oldest turns
+"""
+
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from llm_accounting import MESSAGE_OVERHEAD_TOKENS, count_tokens
+from llm_client import chat_completion
+
+logger = logging.getLogger(__name__)
+
+# Tokens of conversation history (summary included) sent with each turn
+CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', '3000'))
+CHAT_SESSION_TTL_DAYS = int(os.environ.get('CHAT_SESSION_TTL_DAYS', '7'))
+# Summarize trimmed turns into a running summary instead of dropping them outright
+CHAT_SUMMARIZE_TRIMMED = os.environ.get('CHAT_SUMMARIZE_TRIMMED', 'true').lower() == 'true'
+
+SUMMARY_SYSTEM_MESSAGE = "You condense chat transcripts. Keep facts, URLs, scores and open questions; drop pleasantries."
+
+
+# ==================== Request/Response Models ====================
+
+class ChatSessionMessage(BaseModel):
+    content: str
+    stream: bool = False
+
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    messages: List[Dict[str, str]] = []
+    summary: Optional[str] = None
+
+
+# ==================== Token Counting ====================
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return message.get('tokens') or count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+def make_message(role: str, content: str) -> Dict[str, Any]:
+    return {"role": role, "content": content, "tokens": count_tokens(content) + MESSAGE_OVERHEAD_TOKENS}
+
+
+# ==================== Compaction ====================
+
+def trim_history(
+    messages: List[Dict[str, Any]],
+    summary: Optional[str],
+    budget: int = CHAT_HISTORY_TOKEN_BUDGET
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split history into (kept, trimmed) so kept plus the summary fits the budget.
+    Whole turns are trimmed oldest first; the latest message is always kept.
+    """
+    available = budget - (count_tokens(summary) if summary else 0)
+    kept: List[Dict[str, Any]] = []
+    used = 0
+    for message in reversed(messages):
+        cost = message_tokens(message)
+        if kept and used + cost > available:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+
+    trimmed = messages[:len(messages) - len(kept)]
+    # Don't start the kept history with a dangling assistant reply
+    while len(kept) > 1 and kept[0]['role'] == 'assistant':
+        trimmed.append(kept.pop(0))
+    return kept, trimmed
+
+
+async def summarize_turns(trimmed: List[Dict[str, Any]], previous_summary: Optional[str]) -> Optional[str]:
+    """Fold trimmed turns into the running summary; keeps the old summary on failure"""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in trimmed)
+    prompt = (
+        (f"Summary so far:\n{previous_summary}\n\n" if previous_summary else "")
+        + f"New turns:\n{transcript}\n\nWrite an updated summary of the whole conversation in under 150 words."
+    )
+    try:
+        completion = await chat_completion(
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt}
+            ],
+            call_site="chat_summary",
+            temperature=0.2,
+            max_tokens=300
+        )
+        return completion.choices[0].message.content.strip() or previous_summary
+    except Exception as e:
+        logger.warning(f"Chat summary failed, dropping trimmed turns: {str(e)}")
+        return previous_summary
+
+
+async def compact_history(
+    messages: List[Dict[str, Any]],
+    summary: Optional[str],
+    budget: int = CHAT_HISTORY_TOKEN_BUDGET
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Bring history within the token budget; returns (messages, summary)"""
+    kept, trimmed = trim_history(messages, summary, budget)
+    if trimmed and CHAT_SUMMARIZE_TRIMMED:
+        summary = await summarize_turns(trimmed, summary)
+        # A longer summary may push the kept turns back over budget
+        kept, _ = trim_history(kept, summary, budget)
+    return kept, summary
+
+
+def build_prompt_messages(system_message: str, summary: Optional[str], messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    prompt = [{"role": "system", "content": system_message}]
+    if summary:
+        prompt.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    prompt.extend({"role": m['role'], "content": m['content']} for m in messages)
+    return prompt
+
+
+# ==================== Storage ====================
+
+def session_expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(days=CHAT_SESSION_TTL_DAYS)
+
+
+async def create_session(db, user_id: Optional[str] = None) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    session = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "messages": [],
+        "summary": None,
+        "version": 0,
+        "created_at": now.isoformat(),
+        "updated_at": now.isoformat(),
+        "expires_at": session_expiry()
+    }
+    await db.chat_sessions.insert_one(dict(session))
+    return session
+
+
+async def load_session(db, session_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """A session, if it exists and belongs to user_id (anonymous sessions are open by id)"""
+    session = await db.chat_sessions.find_one({"id": session_id}, {"_id": 0})
+    if session and session.get('user_id') and session['user_id'] != user_id:
+        return None
+    return session
+
+
+async def save_session(
+    db,
+    session: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    summary: Optional[str],
+    turn: List[Dict[str, Any]]
+) -> None:
+    """
+    Store the compacted history, unless another turn wrote the session since it
+    was loaded (sessions from before versioning have none, which matches too).
+    Then this turn's messages are appended to what that turn stored instead,
+    and compaction is left to the next turn.
+    """
+    stamps = {"updated_at": datetime.now(timezone.utc).isoformat(), "expires_at": session_expiry()}
+    result = await db.chat_sessions.update_one(
+        {"id": session['id'], "version": session.get('version')},
+        {"$set": {"messages": messages, "summary": summary, **stamps}, "$inc": {"version": 1}}
+    )
+    if result.matched_count:
+        return
+    logger.info(f"Chat session {session['id']} changed during the turn, appending instead")
+    await db.chat_sessions.update_one(
+        {"id": session['id']},
+        {"$push": {"messages": {"$each": turn}}, "$set": stamps, "$inc": {"version": 1}}
+    )
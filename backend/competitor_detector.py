@@ -4,12 +4,22 @@ from typing import List, Dict, Any
 from urllib.parse import urlparse
 import re
 
+from llm_cache import make_key, get_cached, set_cached
+from llm_accounting import call_llm_tracked
+from llm_resilience import EMERGENT
+from metrics import record_fallback
+
 logger = logging.getLogger(__name__)
 
+DETECTION_MODEL = ("openai", "gpt-5.2")
+DETECT_SYSTEM_MESSAGE = "You are an expert business analyst specializing in competitive analysis. Return only valid JSON arrays of competitor domains."
+INSIGHTS_SYSTEM_MESSAGE = "You are a strategic business consultant. Provide concise, actionable insights."
+
 
-async def detect_competitors(user_site_url: str, industry_hint: str = "") -> List[str]:
+async def detect_competitors(user_site_url: str, industry_hint: str = "", use_cache: bool = True) -> List[str]:
     """
-    Use AI to detect top 5 relevant competitors for a given website
+    Use AI to detect top 5 relevant competitors for a given website.
+    use_cache=False skips the response cache lookup (the result is still stored).
     """
     from emergentintegrations.llm.chat import LlmChat, UserMessage
     
@@ -43,22 +53,36 @@ Example format: ["competitor1.com", "competitor2.com", "competitor3.com", "compe
 
 Important: Return valid domain names only, no explanations."""
 
+    cache_key = make_key("/".join(DETECTION_MODEL), DETECT_SYSTEM_MESSAGE, prompt)
+    cached = await get_cached("competitors", cache_key) if use_cache else None
+    if cached:
+        return cached
+
     try:
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"competitor_detect_{domain}",
-            system_message="You are an expert business analyst specializing in competitive analysis. Return only valid JSON arrays of competitor domains."
-        ).with_model("openai", "gpt-5.2")
+        def new_chat():
+            return LlmChat(
+                api_key=api_key,
+                session_id=f"competitor_detect_{domain}",
+                system_message=DETECT_SYSTEM_MESSAGE
+            ).with_model(*DETECTION_MODEL)
         
         user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
+        turns = [{"role": "system", "content": DETECT_SYSTEM_MESSAGE}, {"role": "user", "content": prompt}]
+        response = await call_llm_tracked(
+            EMERGENT, "competitors", "/".join(DETECTION_MODEL), turns,
+            lambda: new_chat().send_message(user_message),
+            lambda call, text: call.add_output(text)
+        )
         
         # Parse the response to extract competitor URLs
-        competitors = parse_competitor_response(response)
-        return competitors[:5]  # Ensure max 5
+        competitors = parse_competitor_response(response)[:5]  # Ensure max 5
+        if competitors:
+            await set_cached("competitors", cache_key, competitors)
+        return competitors
         
     except Exception as e:
         logger.error(f"Error detecting competitors: {str(e)}")
+        record_fallback("competitor_detection")
         return []
 
 
@@ -132,21 +156,34 @@ Provide:
 
 Return as JSON with keys: industry, market_position, differentiators, opportunities, threats"""
 
+    cache_key = make_key("/".join(DETECTION_MODEL), INSIGHTS_SYSTEM_MESSAGE, prompt)
+    cached = await get_cached("industry_insights", cache_key)
+    if cached:
+        return cached
+
     try:
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"industry_insights_{domain}",
-            system_message="You are a strategic business consultant. Provide concise, actionable insights."
-        ).with_model("openai", "gpt-5.2")
+        def new_chat():
+            return LlmChat(
+                api_key=api_key,
+                session_id=f"industry_insights_{domain}",
+                system_message=INSIGHTS_SYSTEM_MESSAGE
+            ).with_model(*DETECTION_MODEL)
         
-        response = await chat.send_message(UserMessage(text=prompt))
+        turns = [{"role": "system", "content": INSIGHTS_SYSTEM_MESSAGE}, {"role": "user", "content": prompt}]
+        response = await call_llm_tracked(
+            EMERGENT, "industry_insights", "/".join(DETECTION_MODEL), turns,
+            lambda: new_chat().send_message(UserMessage(text=prompt)),
+            lambda call, text: call.add_output(text)
+        )
         
         # Try to parse as JSON
         import json
         try:
             match = re.search(r'\{.*\}', response, re.DOTALL)
             if match:
-                return json.loads(match.group())
+                insights = json.loads(match.group())
+                await set_cached("industry_insights", cache_key, insights)
+                return insights
         except:
             pass
         
@@ -0,0 +1,106 @@
+"""
+SITERANK AI - Competitor Set Store
+Persistent domain -> detected competitors, served stale-while-revalidate
+so the LLM detection call stays off the request path
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
+from urllib.parse import urlparse
+
+from competitor_detector import detect_competitors
+from metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Sets younger than this are served as-is
+COMPETITOR_SET_FRESH_DAYS = int(os.environ.get('COMPETITOR_SET_FRESH_DAYS', '7'))
+# Older sets are still served while a refresh runs, up to this age
+COMPETITOR_SET_MAX_STALE_DAYS = int(os.environ.get('COMPETITOR_SET_MAX_STALE_DAYS', '30'))
+# How long one worker's refresh claim blocks others from starting another
+REFRESH_CLAIM_SECONDS = 300
+
+# Keep references so background refreshes aren't garbage collected mid-flight
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+def site_domain(url: str) -> str:
+    """Bare lowercase domain of a site URL, without www."""
+    url = url.strip().lower()
+    parsed = urlparse(url if url.startswith(('http://', 'https://')) else f'https://{url}')
+    domain = parsed.netloc or parsed.path
+    return domain[4:] if domain.startswith('www.') else domain
+
+
+def set_key(url: str, industry_hint: str = "") -> dict:
+    return {"domain": site_domain(url), "industry_hint": (industry_hint or "").strip().lower()}
+
+
+async def refresh_competitor_set(db, url: str, industry_hint: str = "") -> List[str]:
+    """Detect competitors with the LLM (bypassing its response cache) and store them"""
+    key = set_key(url, industry_hint)
+    competitors = await detect_competitors(url, industry_hint, use_cache=False)
+    if competitors:
+        await db.competitor_sets.update_one(
+            key,
+            {
+                "$set": {"competitors": competitors, "refreshed_at": datetime.now(timezone.utc).isoformat()},
+                "$unset": {"refreshing_until": ""}
+            },
+            upsert=True
+        )
+    else:
+        # Keep whatever we had; release the claim so a later request can retry
+        await db.competitor_sets.update_one(key, {"$unset": {"refreshing_until": ""}})
+    return competitors
+
+
+async def _claim_refresh(db, key: dict) -> bool:
+    """Only one worker refreshes a stale set at a time"""
+    now = datetime.now(timezone.utc)
+    result = await db.competitor_sets.update_one(
+        {**key, "$or": [
+            {"refreshing_until": {"$exists": False}},
+            {"refreshing_until": {"$lt": now.isoformat()}}
+        ]},
+        {"$set": {"refreshing_until": (now + timedelta(seconds=REFRESH_CLAIM_SECONDS)).isoformat()}}
+    )
+    return result.modified_count == 1
+
+
+async def _background_refresh(db, url: str, industry_hint: str) -> None:
+    try:
+        await refresh_competitor_set(db, url, industry_hint)
+    except Exception as e:
+        logger.error(f"Background competitor refresh for {url} failed: {str(e)}")
+
+
+async def get_competitor_set(db, url: str, industry_hint: str = "", force_refresh: bool = False) -> List[str]:
+    """
+    Competitors for a site's domain.
+    Fresh sets are returned directly; stale ones are returned immediately while
+    a background refresh runs; missing, expired or forced ones are detected inline.
+    """
+    if force_refresh:
+        return await refresh_competitor_set(db, url, industry_hint)
+
+    key = set_key(url, industry_hint)
+    stored: Optional[dict] = await db.competitor_sets.find_one(key, {"_id": 0})
+    if stored and stored.get('competitors'):
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(stored['refreshed_at'])
+        if age <= timedelta(days=COMPETITOR_SET_FRESH_DAYS):
+            record_cache_lookup("competitor_sets", "hit")
+            return stored['competitors']
+        if age <= timedelta(days=COMPETITOR_SET_MAX_STALE_DAYS):
+            record_cache_lookup("competitor_sets", "stale")
+            if await _claim_refresh(db, key):
+                task = asyncio.create_task(_background_refresh(db, url, industry_hint))
+                _refresh_tasks.add(task)
+                task.add_done_callback(_refresh_tasks.discard)
+            return stored['competitors']
+
+    record_cache_lookup("competitor_sets", "miss")
+    return await refresh_competitor_set(db, url, industry_hint)
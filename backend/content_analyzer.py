@@ -1,6 +1,7 @@
 import logging
 from typing import Dict, List, Any
 from scraper import WebsiteScraper
+from timing import stage
 
 logger = logging.getLogger(__name__)
 
@@ -16,23 +17,24 @@ async def analyze_content(url: str) -> Dict[str, Any]:
     content_data = scraper.get_content_data()
     seo_data = scraper.get_seo_data()
     
-    # Calculate score
-    score = calculate_content_score(content_data)
-    
-    # Build metrics
-    metrics = build_content_metrics(content_data)
-    
-    # Detect issues
-    issues = detect_content_issues(content_data, seo_data)
-    
-    # Generate content ideas
-    content_ideas = generate_content_ideas(seo_data, url)
-    
-    # Keyword analysis
-    keyword_analysis = analyze_keywords(content_data, seo_data, url)
-    
-    word_count = content_data.get('word_count', 0)
-    reading_time = max(1, word_count // 200)
+    with stage("score"):
+        # Calculate score
+        score = calculate_content_score(content_data)
+        
+        # Build metrics
+        metrics = build_content_metrics(content_data)
+        
+        # Detect issues
+        issues = detect_content_issues(content_data, seo_data)
+        
+        # Generate content ideas
+        content_ideas = generate_content_ideas(seo_data, url)
+        
+        # Keyword analysis
+        keyword_analysis = analyze_keywords(content_data, seo_data, url)
+        
+        word_count = content_data.get('word_count', 0)
+        reading_time = max(1, word_count // 200)
     
     return {
         "url": scraper.url,
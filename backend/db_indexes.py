@@ -0,0 +1,141 @@
+"""
+SITERANK AI - MongoDB Indexes
+Index definitions for every collection, ensured at application startup
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "analyses": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_id"),
+        IndexModel([("batch_id", ASCENDING), ("status", ASCENDING)], name="batch_status", sparse=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created"),
+        # Failed and abandoned runs are removed by MongoDB once expires_at passes
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "analysis_details": [
+        IndexModel([("analysis_id", ASCENDING)], name="analysis_id_unique", unique=True),
+    ],
+    "optimizations": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ],
+    "analysis_batches": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "monitoring_schedules": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("analysis_id", ASCENDING), ("user_id", ASCENDING)], name="analysis_user_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("next_run_at", ASCENDING)], name="user_next_run"),
+        IndexModel([("active", ASCENDING), ("next_run_at", ASCENDING)], name="active_next_run"),
+    ],
+    "user_stats": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "competitor_snapshots": [
+        IndexModel([("url", ASCENDING)], name="url_unique", unique=True),
+    ],
+    "competitor_sets": [
+        IndexModel([("domain", ASCENDING), ("industry_hint", ASCENDING)], name="domain_hint_unique", unique=True),
+    ],
+    "chat_sessions": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "llm_usage": [
+        IndexModel([("analysis_id", ASCENDING)], name="analysis_id", sparse=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "llm_user_usage": [
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_day_unique", unique=True),
+    ],
+    "analyses_archive": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_id"),
+    ],
+    "analysis_details_archive": [
+        IndexModel([("analysis_id", ASCENDING)], name="analysis_id_unique", unique=True),
+    ],
+    "profile_samples": [
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "optimizations_archive": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+    ],
+}
+
+
+# Hot queries issued by server.py: (collection, filter, sort).
+# tests/test_db_indexes.py checks none of these plans falls back to COLLSCAN.
+HOT_QUERIES: List[Tuple[str, dict, list]] = [
+    ("users", {"email": "user@example.com"}, []),
+    ("users", {"id": "user-id"}, []),
+    ("analyses", {"id": "analysis-id", "user_id": "user-id"}, []),
+    ("analyses", {"user_id": "user-id"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("analyses", {"user_id": "user-id", "$or": [
+        {"created_at": {"$lt": "2026-01-01T00:00:00+00:00"}},
+        {"created_at": "2026-01-01T00:00:00+00:00", "id": {"$lt": "analysis-id"}},
+    ]}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("analyses", {"batch_id": "batch-id", "user_id": "user-id"}, []),
+    ("analysis_details", {"analysis_id": "analysis-id", "user_id": "user-id"}, []),
+    ("optimizations", {"user_id": "user-id"}, [("created_at", DESCENDING)]),
+    ("user_stats", {"user_id": "user-id"}, []),
+    ("analysis_batches", {"id": "batch-id", "user_id": "user-id"}, []),
+    ("monitoring_schedules", {"analysis_id": "analysis-id", "user_id": "user-id"}, []),
+    ("monitoring_schedules", {"active": True, "next_run_at": {"$lte": "2026-01-01T00:00:00+00:00"}}, []),
+    ("competitor_sets", {"domain": "example.com", "industry_hint": ""}, []),
+    ("chat_sessions", {"id": "session-id"}, []),
+    ("llm_usage", {"analysis_id": "analysis-id"}, []),
+    ("llm_user_usage", {"user_id": "user-id", "day": {"$gte": "2026-01-01"}}, [("day", ASCENDING)]),
+    ("analyses", {"status": "completed", "created_at": {"$lt": "2026-01-01T00:00:00+00:00"}}, [("created_at", ASCENDING)]),
+    ("optimizations", {"created_at": {"$lt": "2026-01-01T00:00:00+00:00"}}, [("created_at", ASCENDING)]),
+    ("analyses_archive", {"id": "analysis-id", "user_id": "user-id"}, []),
+    ("analyses_archive", {"user_id": "user-id"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("analysis_details_archive", {"analysis_id": "analysis-id", "user_id": "user-id"}, []),
+    ("optimizations_archive", {"user_id": "user-id"}, [("created_at", DESCENDING)]),
+    ("competitor_snapshots", {"url": "https://example.com", "scraped_at": {"$gte": "2026-01-01T00:00:00+00:00"}}, []),
+    ("profile_samples", {}, [("created_at", DESCENDING)]),
+    ("profile_samples", {"id": "profile-id"}, []),
+]
+
+
+async def ensure_indexes(db) -> None:
+    """Create any missing indexes; failures are logged so startup can continue"""
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate emails in legacy data block the unique index
+            logger.error(f"Failed to create indexes on {collection}: {str(e)}")
+    logger.info("MongoDB indexes ensured")
+
+
+def plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of an explain() winning plan"""
+    stages = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if 'stage' in node:
+            stages.append(node['stage'])
+        if 'inputStage' in node:
+            stack.append(node['inputStage'])
+        stack.extend(node.get('inputStages', []))
+        if 'queryPlan' in node:
+            stack.append(node['queryPlan'])
+    return stages
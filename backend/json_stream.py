@@ -0,0 +1,121 @@
+"""
+SITERANK AI - Incremental JSON Parsing
+Pulls completed elements out of an array inside a streamed LLM JSON
+response, so they can be used before (or without) the rest of the document
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ArrayStreamParser:
+    """
+    Incremental parser for LLM output shaped like {"<array_key>": [{...}, ...], ...}.
+    feed() returns each object in the array as soon as its closing brace arrives.
+    Text around the top-level object (markdown fences, prose) is ignored, and an
+    element that doesn't parse is skipped without losing the ones around it.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self.buffer = ""
+        self.items: List[Dict[str, Any]] = []
+        self._pos = 0
+        self._stack: List[str] = []
+        self._closed = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add a chunk of output; returns the array elements it completed"""
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = buffer[self._string_start:i + 1]
+                continue
+            if self._closed or (not self._stack and ch != '{'):
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ':' and len(self._stack) == 1:
+                self._key = _decode_string(self._last_string)
+            elif ch == '{' or ch == '[':
+                if ch == '[' and len(self._stack) == 1 and self._key == self.array_key:
+                    self._in_array = True
+                elif ch == '{' and self._in_array and len(self._stack) == 2:
+                    self._item_start = i
+                self._stack.append(ch)
+            elif ch == '}' or ch == ']':
+                self._stack.pop()
+                if self._in_array and len(self._stack) == 2 and self._item_start is not None:
+                    item = self._parse_item(buffer[self._item_start:i + 1])
+                    if item is not None:
+                        completed.append(item)
+                    self._item_start = None
+                elif self._in_array and len(self._stack) == 1:
+                    self._in_array = False
+                if not self._stack:
+                    self._closed = True
+
+        self._pos = len(buffer)
+        self.items.extend(completed)
+        return completed
+
+    def _parse_item(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed {self.array_key} element: {e}")
+            return None
+        return item if isinstance(item, dict) else None
+
+    def document(self) -> Optional[Dict[str, Any]]:
+        """The whole response as parsed JSON, or None if it is incomplete or malformed"""
+        start, end = self.buffer.find('{'), self.buffer.rfind('}')
+        if start == -1 or end < start:
+            return None
+        try:
+            document = json.loads(self.buffer[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        return document if isinstance(document, dict) else None
+
+    def string_field(self, key: str) -> Optional[str]:
+        """A top-level string value, recovered from the raw text when the document doesn't parse"""
+        document = self.document()
+        if document is not None:
+            value = document.get(key)
+            return value if isinstance(value, str) else None
+        match = re.search(r'"%s"\s*:\s*("(?:[^"\\]|\\.)*")' % re.escape(key), self.buffer)
+        return _decode_string(match.group(1)) if match else None
+
+
+def _decode_string(literal: Optional[str]) -> Optional[str]:
+    if literal is None:
+        return None
+    try:
+        return json.loads(literal)
+    except json.JSONDecodeError:
+        return None
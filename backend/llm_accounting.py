@@ -0,0 +1,387 @@
+"""
+SITERANK AI - LLM Accounting
+Model, tokens, latency, cache hit and outcome of every LLM call, tagged
+with the analysis and user it ran for, plus per-user daily totals
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, TypeVar, Union
+
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from prometheus_client import Counter, Histogram
+from pymongo import UpdateOne
+
+from llm_resilience import LLM_CALL_TIMEOUT_SECONDS, CircuitOpen, call_llm
+from timing import record_stage
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+LLM_ACCOUNTING_ENABLED = os.environ.get('LLM_ACCOUNTING_ENABLED', 'true').lower() == 'true'
+LLM_USAGE_FLUSH_SECONDS = float(os.environ.get('LLM_USAGE_FLUSH_SECONDS', '5'))
+LLM_USAGE_RETENTION_DAYS = int(os.environ.get('LLM_USAGE_RETENTION_DAYS', '90'))
+# Records waiting for the next flush; the oldest are dropped beyond this
+LLM_USAGE_BUFFER_SIZE = int(os.environ.get('LLM_USAGE_BUFFER_SIZE', '10000'))
+LLM_TOKENIZER = os.environ.get('LLM_TOKENIZER') or os.environ.get('CHAT_TOKENIZER', 'cl100k_base')
+# How long startup waits for the tokenizer; counts are estimated until it loads
+TOKENIZER_LOAD_TIMEOUT_SECONDS = float(os.environ.get('TOKENIZER_LOAD_TIMEOUT_SECONDS', '10'))
+
+# Per-message framing overhead in the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+LLM_CALLS = Counter('llm_calls_total', 'LLM calls by outcome', ['provider', 'call_site', 'outcome'])
+LLM_TOKENS = Counter('llm_tokens_total', 'LLM tokens spent (estimated where the provider reports none)', ['provider', 'call_site', 'kind'])
+LLM_CALL_SECONDS = Histogram(
+    'llm_call_duration_seconds',
+    'Wall time of LLM calls, including hedges and streaming',
+    ['provider', 'call_site'],
+    buckets=(0.05, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+
+_context: ContextVar[Dict[str, Optional[str]]] = ContextVar('llm_accounting_context', default={})
+_pending: Deque[Dict[str, Any]] = deque(maxlen=LLM_USAGE_BUFFER_SIZE)
+
+
+# ==================== Attribution ====================
+
+@contextmanager
+def llm_context(**tags: Optional[str]) -> Iterator[None]:
+    """
+    Tag LLM calls made inside the block (and tasks started from it) with
+    analysis_id, user_id and/or flow. Nested blocks add to the outer tags.
+    """
+    token = _context.set({**_context.get(), **{k: v for k, v in tags.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_tags() -> Dict[str, Optional[str]]:
+    return dict(_context.get())
+
+
+# ==================== Token Counting ====================
+
+_encoding = None
+
+
+def _load_encoding() -> None:
+    global _encoding
+    try:
+        import tiktoken
+        _encoding = tiktoken.get_encoding(LLM_TOKENIZER)
+        logger.info(f"Loaded {LLM_TOKENIZER} tokenizer")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating token counts: {str(e)}")
+
+
+async def load_tokenizer(timeout: float = TOKENIZER_LOAD_TIMEOUT_SECONDS) -> bool:
+    """
+    Load the tiktoken encoding off the event loop, once at startup. On a cold
+    cache tiktoken downloads its BPE file with no timeout (point
+    TIKTOKEN_CACHE_DIR at a pre-filled directory to avoid that). Waits at most
+    timeout; a slow load carries on in the background. False if not loaded yet.
+    """
+    loop = asyncio.get_running_loop()
+    loaded = asyncio.Event()
+
+    def load():
+        _load_encoding()
+        try:
+            loop.call_soon_threadsafe(loaded.set)
+        except RuntimeError:
+            # The loop closed while the download was stalled
+            pass
+
+    # A daemon thread rather than the default executor, so a stalled download can't hold up shutdown
+    threading.Thread(target=load, name="tokenizer-load", daemon=True).start()
+    try:
+        await asyncio.wait_for(loaded.wait(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Tokenizer not loaded after {timeout:.0f}s, estimating token counts meanwhile")
+    return _encoding is not None
+
+
+def count_tokens(text: str) -> int:
+    """
+    tiktoken count for text once load_tokenizer has finished; until then, or
+    if tiktoken is unavailable, the ~4 characters per token estimate.
+    Never loads the encoding itself, so it is safe on the event loop.
+    """
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def prompt_tokens(prompt: Union[str, List[Dict[str, Any]]]) -> int:
+    if isinstance(prompt, str):
+        return count_tokens(prompt)
+    return sum(count_tokens(m.get('content') or '') + MESSAGE_OVERHEAD_TOKENS for m in prompt)
+
+
+# ==================== Recording ====================
+
+class LlmCall:
+    """One call being tracked; the caller reports usage or output before the block ends"""
+
+    def __init__(self, provider: str, call_site: str, model: Optional[str], prompt: Union[str, List[Dict[str, Any]]]):
+        self.provider = provider
+        self.call_site = call_site
+        self.model = model
+        self.prompt = prompt
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens = 0
+        self.estimated = True
+        self._output: List[str] = []
+
+    def set_usage(self, usage) -> None:
+        """Provider-reported token counts (an OpenAI usage object), when available"""
+        if usage is not None and getattr(usage, 'prompt_tokens', None) is not None:
+            self.prompt_tokens = usage.prompt_tokens
+            self.completion_tokens = usage.completion_tokens or 0
+            self.estimated = False
+
+    def add_output(self, text: Optional[str]) -> None:
+        """Completion text, counted when the provider reports no usage"""
+        if text:
+            self._output.append(text)
+
+    def finalize(self) -> None:
+        if self.estimated:
+            self.prompt_tokens = prompt_tokens(self.prompt)
+            self.completion_tokens = count_tokens("".join(self._output)) if self._output else 0
+
+
+@contextmanager
+def track_llm_call(
+    provider: str,
+    call_site: str,
+    model: Optional[str],
+    prompt: Union[str, List[Dict[str, Any]]]
+) -> Iterator[LlmCall]:
+    """Record the LLM call made inside the block, whatever its outcome"""
+    call = LlmCall(provider, call_site, model, prompt)
+    tags = _context.get()
+    # Not made current: streaming call sites end the block from another context
+    llm_span = tracer.start_span(f"llm.{call_site}", kind=SpanKind.CLIENT, attributes={
+        k: v for k, v in {
+            "gen_ai.system": provider, "gen_ai.request.model": model, "llm.call_site": call_site,
+            "analysis.id": tags.get('analysis_id'), "flow": tags.get('flow')
+        }.items() if v is not None
+    })
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield call
+        outcome = "ok"
+    except CircuitOpen:
+        outcome = "circuit_open"
+        raise
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        # Client went away or a streaming consumer stopped early
+        outcome = "cancelled"
+        raise
+    finally:
+        latency = time.perf_counter() - started
+        record_stage("llm", latency)
+        call.finalize()
+        record_llm_call(
+            provider, call_site, call.model,
+            prompt_tokens=call.prompt_tokens if outcome != "circuit_open" else 0,
+            completion_tokens=call.completion_tokens,
+            latency=latency,
+            outcome=outcome,
+            estimated=call.estimated
+        )
+        llm_span.set_attribute("gen_ai.usage.input_tokens", call.prompt_tokens or 0)
+        llm_span.set_attribute("gen_ai.usage.output_tokens", call.completion_tokens)
+        llm_span.set_attribute("llm.outcome", outcome)
+        if outcome != "ok":
+            llm_span.set_status(Status(StatusCode.ERROR, outcome))
+        llm_span.end()
+
+
+async def call_llm_tracked(
+    provider: str,
+    call_site: str,
+    model: Optional[str],
+    prompt: Union[str, List[Dict[str, Any]]],
+    make_call: Callable[[], Awaitable[T]],
+    on_result: Callable[[LlmCall, T], None],
+    hedge: bool = True,
+    timeout: float = LLM_CALL_TIMEOUT_SECONDS,
+    slots: Optional[asyncio.Semaphore] = None
+) -> T:
+    """
+    call_llm with every attempt recorded on its own, so a hedge attempt's
+    tokens are counted whether or not it wins. on_result reports a result's
+    usage or output to the attempt's LlmCall.
+    """
+    async def attempt():
+        with track_llm_call(provider, call_site, model, prompt) as call:
+            # Times out here rather than being cancelled, so the outcome says so
+            result = await asyncio.wait_for(make_call(), timeout)
+            on_result(call, result)
+            return result
+
+    try:
+        return await call_llm(provider, attempt, hedge=hedge, timeout=timeout, call_site=call_site, slots=slots)
+    except CircuitOpen:
+        record_llm_call(provider, call_site, model, prompt_tokens=0, completion_tokens=0, latency=0.0, outcome="circuit_open")
+        raise
+
+
+def record_cache_hit(call_site: str) -> None:
+    """A response served from the LLM cache: no tokens spent"""
+    record_llm_call("cache", call_site, None, prompt_tokens=0, completion_tokens=0, latency=0.0, outcome="ok", cache_hit=True)
+
+
+def record_llm_call(
+    provider: str,
+    call_site: str,
+    model: Optional[str],
+    prompt_tokens: int,
+    completion_tokens: int,
+    latency: float,
+    outcome: str,
+    cache_hit: bool = False,
+    estimated: bool = False
+) -> None:
+    """Update metrics now and queue the usage record for the next flush"""
+    LLM_CALLS.labels(provider=provider, call_site=call_site, outcome=outcome).inc()
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider=provider, call_site=call_site, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider=provider, call_site=call_site, kind="completion").inc(completion_tokens)
+    if not cache_hit:
+        LLM_CALL_SECONDS.labels(provider=provider, call_site=call_site).observe(latency)
+
+    if not LLM_ACCOUNTING_ENABLED:
+        return
+    tags = _context.get()
+    _pending.append({
+        "id": str(uuid.uuid4()),
+        "provider": provider,
+        "call_site": call_site,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "latency_ms": round(latency * 1000, 1),
+        "cache_hit": cache_hit,
+        "outcome": outcome,
+        "estimated": estimated,
+        "analysis_id": tags.get('analysis_id'),
+        "user_id": tags.get('user_id'),
+        "flow": tags.get('flow'),
+        "created_at": datetime.now(timezone.utc)
+    })
+
+
+# ==================== Storage ====================
+
+def usage_expiry(created_at: datetime) -> datetime:
+    return created_at + timedelta(days=LLM_USAGE_RETENTION_DAYS)
+
+
+async def flush_llm_usage(db) -> int:
+    """Write queued records to llm_usage and fold them into llm_user_usage daily totals"""
+    records = []
+    while _pending:
+        records.append(_pending.popleft())
+    if not records:
+        return 0
+
+    totals: Dict[tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for record in records:
+        record["expires_at"] = usage_expiry(record["created_at"])
+        if not record["user_id"]:
+            continue
+        day = record["created_at"].date().isoformat()
+        bucket = totals[(record["user_id"], day)]
+        bucket["calls"] += 1
+        bucket["prompt_tokens"] += record["prompt_tokens"]
+        bucket["completion_tokens"] += record["completion_tokens"]
+        bucket["total_tokens"] += record["total_tokens"]
+        bucket["latency_ms"] += record["latency_ms"]
+        bucket["cache_hits"] += int(record["cache_hit"])
+        bucket["errors"] += int(record["outcome"] not in ("ok", "cancelled"))
+
+    try:
+        await db.llm_usage.insert_many(records, ordered=False)
+        if totals:
+            await db.llm_user_usage.bulk_write([
+                UpdateOne(
+                    {"user_id": user_id, "day": day},
+                    {"$inc": dict(bucket), "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+                    upsert=True
+                )
+                for (user_id, day), bucket in totals.items()
+            ], ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to write {len(records)} LLM usage records: {str(e)}")
+        return 0
+    return len(records)
+
+
+async def llm_usage_loop(db) -> None:
+    """Flush usage records every LLM_USAGE_FLUSH_SECONDS"""
+    while True:
+        await asyncio.sleep(LLM_USAGE_FLUSH_SECONDS)
+        try:
+            await flush_llm_usage(db)
+        except Exception as e:
+            logger.error(f"LLM usage flush failed: {str(e)}")
+
+
+# ==================== Reporting ====================
+
+USAGE_FIELDS = ("calls", "prompt_tokens", "completion_tokens", "total_tokens", "latency_ms", "cache_hits", "errors")
+
+
+async def get_user_usage(db, user_id: str, days: int = 30) -> Dict[str, Any]:
+    """A user's totals over the last days, with the per-day breakdown"""
+    since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date().isoformat()
+    daily = await db.llm_user_usage.find(
+        {"user_id": user_id, "day": {"$gte": since}},
+        {"_id": 0, "user_id": 0, "updated_at": 0}
+    ).sort("day", 1).to_list(days)
+    totals = {field: sum(day.get(field, 0) for day in daily) for field in USAGE_FIELDS}
+    return {"user_id": user_id, "days": days, "totals": totals, "daily": daily}
+
+
+async def get_analysis_usage(db, analysis_id: str) -> Dict[str, Any]:
+    """Calls and tokens spent on one analysis, per call site"""
+    by_site = await db.llm_usage.aggregate([
+        {"$match": {"analysis_id": analysis_id}},
+        {"$group": {
+            "_id": "$call_site",
+            "calls": {"$sum": 1},
+            "prompt_tokens": {"$sum": "$prompt_tokens"},
+            "completion_tokens": {"$sum": "$completion_tokens"},
+            "total_tokens": {"$sum": "$total_tokens"},
+            "latency_ms": {"$sum": "$latency_ms"},
+            "cache_hits": {"$sum": {"$cond": ["$cache_hit", 1, 0]}}
+        }}
+    ]).to_list(None)
+    call_sites = {row.pop("_id"): row for row in by_site}
+    return {
+        "analysis_id": analysis_id,
+        "total_tokens": sum(row["total_tokens"] for row in call_sites.values()),
+        "call_sites": call_sites
+    }
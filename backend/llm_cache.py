@@ -0,0 +1,171 @@
+"""
+SITERANK AI - LLM Response Cache
+Content-addressed cache for parsed LLM responses, keyed by a hash of the
+model, system prompt and normalized user prompt, with per-call-site TTLs
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter
+
+from llm_accounting import record_cache_hit
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+# When set, entries live in Redis (configure maxmemory + allkeys-lru there for eviction)
+LLM_CACHE_REDIS_URL = os.environ.get('LLM_CACHE_REDIS_URL', '')
+LLM_CACHE_DIR = os.environ.get('LLM_CACHE_DIR', str(Path(__file__).parent / '.llm_cache'))
+LLM_CACHE_SIZE_LIMIT_MB = int(os.environ.get('LLM_CACHE_SIZE_LIMIT_MB', '256'))
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Seconds each call site's responses stay valid; override with LLM_CACHE_TTL_<SITE>
+CALL_SITE_TTLS = {
+    "suggestions": DAY,
+    "competitors": 7 * DAY,
+    "industry_insights": 7 * DAY,
+    "seo_fixes": DAY,
+    "speed_fixes": DAY,
+    "content_fixes": DAY,
+}
+
+CACHE_REQUESTS = Counter(
+    'llm_cache_requests_total',
+    'LLM response cache lookups',
+    ['call_site', 'result']
+)
+
+_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def call_site_ttl(call_site: str) -> int:
+    override = os.environ.get(f'LLM_CACHE_TTL_{call_site.upper()}')
+    return int(override) if override else CALL_SITE_TTLS.get(call_site, DAY)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share an entry"""
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+
+def make_key(model: str, system_prompt: str, *user_prompts: str) -> str:
+    """sha256 over the model, system prompt and normalized user prompt(s)"""
+    material = json.dumps(
+        [model, normalize_prompt(system_prompt), [normalize_prompt(p) for p in user_prompts]],
+        separators=(',', ':')
+    )
+    return "llm:" + hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+# ==================== Backends ====================
+
+class RedisCacheBackend:
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class DiskCacheBackend:
+    """SQLite-backed cache with least-recently-used eviction past size_limit"""
+
+    def __init__(self, directory: str, size_limit_mb: int):
+        import diskcache
+        self.cache = diskcache.Cache(
+            directory,
+            size_limit=size_limit_mb * 1024 * 1024,
+            eviction_policy='least-recently-used'
+        )
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await asyncio.to_thread(self.cache.set, key, value, expire=ttl)
+
+    async def close(self) -> None:
+        self.cache.close()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if LLM_CACHE_REDIS_URL:
+            _backend = RedisCacheBackend(LLM_CACHE_REDIS_URL)
+        else:
+            _backend = DiskCacheBackend(LLM_CACHE_DIR, LLM_CACHE_SIZE_LIMIT_MB)
+    return _backend
+
+
+async def close_llm_cache() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+    _backend = None
+
+
+# ==================== Lookups ====================
+
+async def get_cached(call_site: str, key: str) -> Optional[Any]:
+    """Cached parsed response for key, or None; backend errors count as a miss"""
+    if not LLM_CACHE_ENABLED:
+        return None
+    value = None
+    try:
+        raw = await get_backend().get(key)
+        if raw is not None:
+            value = json.loads(raw)
+    except Exception as e:
+        logger.warning(f"LLM cache read failed: {str(e)}")
+
+    result = "hit" if value is not None else "miss"
+    if value is not None:
+        record_cache_hit(call_site)
+    CACHE_REQUESTS.labels(call_site=call_site, result=result).inc()
+    _counts[call_site]["hits" if value is not None else "misses"] += 1
+    return value
+
+
+async def set_cached(call_site: str, key: str, value: Any) -> None:
+    """Store a successfully parsed response; never store fallbacks or raw failures"""
+    if not LLM_CACHE_ENABLED or value is None:
+        return
+    try:
+        await get_backend().set(key, json.dumps(value, default=str), call_site_ttl(call_site))
+    except Exception as e:
+        logger.warning(f"LLM cache write failed: {str(e)}")
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counts per call site since process start"""
+    sites = {}
+    for call_site, counts in _counts.items():
+        total = counts["hits"] + counts["misses"]
+        sites[call_site] = {**counts, "hit_rate": round(counts["hits"] / total, 3) if total else 0.0}
+    return {
+        "enabled": LLM_CACHE_ENABLED,
+        "backend": "redis" if LLM_CACHE_REDIS_URL else "disk",
+        "call_sites": sites,
+    }
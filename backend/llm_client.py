@@ -0,0 +1,138 @@
+"""
+SITERANK AI - Shared LLM Client
+One process-wide async client for the NVIDIA DeepSeek API, with pooled
+connections, timeouts and a cap on concurrent requests
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+from prometheus_client import Histogram
+
+from llm_accounting import call_llm_tracked, track_llm_call
+from llm_resilience import LLM_CALL_TIMEOUT_SECONDS, NVIDIA, guarded_exchange
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = os.environ.get('LLM_MODEL', 'deepseek-ai/deepseek-v3.2')
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '60'))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('LLM_CONNECT_TIMEOUT_SECONDS', '10'))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '2'))
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', '20'))
+
+TIME_TO_FIRST_TOKEN = Histogram(
+    'llm_time_to_first_token_seconds',
+    'Seconds from sending a streaming completion request to its first content token',
+    ['call_site'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30)
+)
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def llm_configured() -> bool:
+    return bool(os.environ.get('NVIDIA_API_KEY'))
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """The shared AsyncOpenAI client, created on first use"""
+    global _client
+    if _client is None:
+        # Read at first use so values loaded from .env by server.py are seen
+        _client = AsyncOpenAI(
+            base_url=os.environ.get('NVIDIA_BASE_URL', 'https://integrate.api.nvidia.com/v1'),
+            api_key=os.environ.get('NVIDIA_API_KEY') or 'not-configured',
+            max_retries=LLM_MAX_RETRIES,
+            timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+            )
+        )
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def chat_completion(messages: List[Dict[str, Any]], model: str = None, call_site: str = "chat", **kwargs):
+    """
+    Create a chat completion through the shared client, waiting for a free slot.
+    Goes through the nvidia circuit breaker; raises CircuitOpen while it is open.
+    Tokens and latency of each attempt are recorded under call_site.
+    """
+    model = model or LLM_MODEL
+
+    def on_result(call, completion):
+        call.set_usage(getattr(completion, 'usage', None))
+        if completion.choices:
+            call.add_output(completion.choices[0].message.content)
+
+    return await call_llm_tracked(
+        NVIDIA, call_site, model, messages,
+        lambda: get_llm_client().chat.completions.create(model=model, messages=messages, **kwargs),
+        on_result,
+        slots=_get_semaphore()
+    )
+
+
+async def stream_chat_completion(
+    messages: List[Dict[str, Any]],
+    call_site: str,
+    model: str = None,
+    **kwargs
+) -> AsyncIterator[str]:
+    """
+    Yield content deltas of a streaming completion.
+    The concurrency slot is held for the whole stream, and the upstream
+    response is closed as soon as the consumer stops iterating. The whole
+    stream, to its last chunk, is judged by the breaker; it is never hedged.
+    """
+    model = model or LLM_MODEL
+    async with _get_semaphore():
+        with track_llm_call(NVIDIA, call_site, model, messages) as call:
+            async with guarded_exchange(NVIDIA, call_site):
+                started = time.perf_counter()
+                stream = await asyncio.wait_for(get_llm_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    **kwargs
+                ), LLM_CALL_TIMEOUT_SECONDS)
+                first = True
+                try:
+                    async for chunk in stream:
+                        # Only sent by providers that report usage on the final chunk
+                        call.set_usage(getattr(chunk, 'usage', None))
+                        if not chunk.choices or not chunk.choices[0].delta.content:
+                            continue
+                        if first:
+                            TIME_TO_FIRST_TOKEN.labels(call_site=call_site).observe(time.perf_counter() - started)
+                            first = False
+                        call.add_output(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                finally:
+                    await stream.close()
+
+
+async def close_llm_client() -> None:
+    """Close pooled connections (application shutdown, or between test event loops)"""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _semaphore = None
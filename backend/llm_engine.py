@@ -1,10 +1,31 @@
 import os
+import json
 import logging
-from typing import Dict, Any, List
+import re
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
+from llm_cache import make_key, get_cached, set_cached
+from llm_accounting import call_llm_tracked, track_llm_call
+from llm_resilience import EMERGENT, CircuitOpen, call_llm
+from metrics import record_fallback
+
 load_dotenv()
 
+SUGGESTIONS_MODEL = ("openai", "gpt-5.2")
+SUGGESTIONS_SYSTEM_MESSAGE = "You are an expert SEO and digital marketing consultant specializing in competitive analysis. Provide specific, actionable recommendations."
+# "single" asks for the analysis and action plan in one JSON response and only
+# falls back to the two-message conversation when that fails; "two-call" always uses it
+LLM_SUGGESTIONS_MODE = os.environ.get('LLM_SUGGESTIONS_MODE', 'single')
+
+STRUCTURED_SUGGESTIONS_FORMAT = """
+
+Return ONLY a JSON object, no markdown fences, matching this schema:
+{
+  "summary": "the full analysis above as a markdown string",
+  "action_items": ["5-7 specific action items, each ending with (High Impact), (Medium Impact) or (Low Impact) and achievable within 1-4 weeks"]
+}"""
+
 logger = logging.getLogger(__name__)
 
 
@@ -82,18 +103,7 @@ Please provide:
 
 Format your response in a clear, professional manner with specific, actionable advice."""
 
-    try:
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"analysis_{user_url[:20]}",
-            system_message="You are an expert SEO and digital marketing consultant specializing in competitive analysis. Provide specific, actionable recommendations."
-        ).with_model("openai", "gpt-5.2")
-        
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
-        
-        # Generate action plan
-        action_prompt = f"""Based on the analysis, create a prioritized action plan with 5-7 specific action items.
+    action_prompt = f"""Based on the analysis, create a prioritized action plan with 5-7 specific action items.
 Each item should be:
 - Specific and actionable
 - Include expected impact (High/Medium/Low)
@@ -103,13 +113,77 @@ Current scores: SEO {user_scores.get('seo_score', 0)}, Speed {user_scores.get('s
 Main weaknesses: {weaknesses_text}
 
 Format: Return ONLY a JSON array of action items like: ["Action 1 (High Impact)", "Action 2 (Medium Impact)", ...]"""
+
+    # Emergent returns text only, so token counts for these calls are estimated
+    model_name = "/".join(SUGGESTIONS_MODEL)
+    system_turn = {"role": "system", "content": SUGGESTIONS_SYSTEM_MESSAGE}
+
+    if LLM_SUGGESTIONS_MODE == "single":
+        structured_prompt = prompt + STRUCTURED_SUGGESTIONS_FORMAT
+        cache_key = make_key(model_name, SUGGESTIONS_SYSTEM_MESSAGE, structured_prompt)
+        cached = await get_cached("suggestions", cache_key)
+        if cached:
+            return cached["suggestions"], cached["action_plan"]
+
+        def new_chat():
+            return LlmChat(
+                api_key=api_key,
+                session_id=f"analysis_{user_url[:20]}",
+                system_message=SUGGESTIONS_SYSTEM_MESSAGE
+            ).with_model(*SUGGESTIONS_MODEL)
+
+        try:
+            # One-shot, so a hedge attempt can use its own chat
+            response = await call_llm_tracked(
+                EMERGENT, "suggestions", model_name, [system_turn, {"role": "user", "content": structured_prompt}],
+                lambda: new_chat().send_message(UserMessage(text=structured_prompt)),
+                lambda call, text: call.add_output(text)
+            )
+            
+            parsed = parse_structured_suggestions(response)
+            if parsed:
+                response, action_plan = parsed
+                await set_cached("suggestions", cache_key, {"suggestions": response, "action_plan": action_plan})
+                return response, action_plan
+            logger.warning("Structured suggestions response was invalid, falling back to two calls")
+            record_fallback("suggestions_two_call")
+        except CircuitOpen as e:
+            logger.warning(f"Skipping AI suggestions: {str(e)}")
+            return generate_fallback_suggestions(user_scores, comparison)
+        except Exception as e:
+            logger.warning(f"Structured suggestions call failed, falling back to two calls: {str(e)}")
+            record_fallback("suggestions_two_call")
+
+    cache_key = make_key(model_name, SUGGESTIONS_SYSTEM_MESSAGE, prompt, action_prompt)
+    cached = await get_cached("suggestions", cache_key)
+    if cached:
+        return cached["suggestions"], cached["action_plan"]
+
+    try:
+        chat = LlmChat(
+            api_key=api_key,
+            session_id=f"analysis_{user_url[:20]}",
+            system_message=SUGGESTIONS_SYSTEM_MESSAGE
+        ).with_model(*SUGGESTIONS_MODEL)
         
+        # The second message continues the conversation, so neither call is hedged
+        turns = [system_turn, {"role": "user", "content": prompt}]
+        user_message = UserMessage(text=prompt)
+        with track_llm_call(EMERGENT, "suggestions", model_name, turns) as call:
+            response = await call_llm(EMERGENT, lambda: chat.send_message(user_message), hedge=False, call_site="suggestions")
+            call.add_output(response)
+        
+        # Generate action plan
+        turns += [{"role": "assistant", "content": response}, {"role": "user", "content": action_prompt}]
         action_message = UserMessage(text=action_prompt)
-        action_response = await chat.send_message(action_message)
+        with track_llm_call(EMERGENT, "suggestions", model_name, turns) as call:
+            action_response = await call_llm(EMERGENT, lambda: chat.send_message(action_message), hedge=False, call_site="suggestions")
+            call.add_output(action_response)
         
         # Parse action items
         action_plan = parse_action_items(action_response)
         
+        await set_cached("suggestions", cache_key, {"suggestions": response, "action_plan": action_plan})
         return response, action_plan
         
     except Exception as e:
@@ -117,11 +191,55 @@ Format: Return ONLY a JSON array of action items like: ["Action 1 (High Impact)"
         return generate_fallback_suggestions(user_scores, comparison)
 
 
+def repair_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the JSON object in an LLM response, repairing common defects:
+    markdown fences, surrounding prose, trailing commas and raw newlines in strings
+    """
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    text = text[start:end + 1]
+
+    for candidate in (text, re.sub(r',\s*([}\]])', r'\1', text)):
+        try:
+            # strict=False accepts literal newlines/tabs inside strings
+            value = json.loads(candidate, strict=False)
+            return value if isinstance(value, dict) else None
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def parse_structured_suggestions(response: str) -> Optional[tuple[str, List[str]]]:
+    """Validate a {summary, action_items} response; None when it can't be used"""
+    data = repair_json_object(response)
+    if not data:
+        return None
+
+    summary = data.get('summary')
+    if not isinstance(summary, str) or not summary.strip():
+        return None
+
+    items = data.get('action_items')
+    if isinstance(items, str):
+        items = parse_action_items(items)
+    if not isinstance(items, list):
+        return None
+    # Some models return objects; keep their text
+    items = [
+        item if isinstance(item, str) else str(item.get('action') or item.get('title') or '')
+        for item in items if isinstance(item, (str, dict))
+    ]
+    items = [item.strip() for item in items if item and item.strip()]
+    if not items:
+        return None
+    return summary.strip(), items[:7]
+
+
 def parse_action_items(response: str) -> List[str]:
     """Parse action items from AI response"""
-    import json
-    import re
-    
     try:
         # Try to find JSON array in response
         json_match = re.search(r'\[.*?\]', response, re.DOTALL)
@@ -154,6 +272,7 @@ def parse_action_items(response: str) -> List[str]:
 
 def generate_fallback_suggestions(user_scores: Dict[str, Any], comparison: Dict[str, Any]) -> tuple[str, List[str]]:
     """Generate fallback suggestions when AI is unavailable"""
+    record_fallback("suggestions")
     seo = user_scores.get('seo_score', 50)
     speed = user_scores.get('speed_score', 50)
     content = user_scores.get('content_score', 50)
@@ -0,0 +1,235 @@
+"""
+SITERANK AI - LLM Resilience
+Per-provider circuit breaker and p95-based request hedging around every
+LLM call, so a degraded provider sends callers to their fallbacks fast.
+Hedge delays come from each call site's own latencies: a long-output call
+isn't hedged against a p95 set by short ones.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Provider names, one breaker each
+NVIDIA = 'nvidia'
+EMERGENT = 'emergent'
+
+# Breaker trips when the error rate over the last WINDOW calls reaches ERROR_RATE
+LLM_BREAKER_WINDOW = int(os.environ.get('LLM_BREAKER_WINDOW', '20'))
+LLM_BREAKER_MIN_CALLS = int(os.environ.get('LLM_BREAKER_MIN_CALLS', '5'))
+LLM_BREAKER_ERROR_RATE = float(os.environ.get('LLM_BREAKER_ERROR_RATE', '0.5'))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS', '30'))
+# Upper bound on any single LLM call; slower calls count as failures
+LLM_CALL_TIMEOUT_SECONDS = float(os.environ.get('LLM_CALL_TIMEOUT_SECONDS', '60'))
+# A second attempt starts once the first has run longer than the call site's p95
+LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'true').lower() == 'true'
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', '20'))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.environ.get('LLM_HEDGE_MIN_DELAY_SECONDS', '1'))
+
+BREAKER_REJECTIONS = Counter('llm_breaker_rejections_total', 'LLM calls short-circuited by an open breaker', ['provider'])
+BREAKER_OPEN = Gauge('llm_breaker_open', '1 while the provider breaker is open', ['provider'])
+HEDGED_REQUESTS = Counter('llm_hedged_requests_total', 'LLM calls that started a hedge attempt', ['provider', 'call_site'])
+
+# Latency window of calls that don't name a call site
+DEFAULT_CALL_SITE = 'default'
+
+
+class CircuitOpen(Exception):
+    """The provider's breaker is open; use the fallback path"""
+
+    def __init__(self, provider: str):
+        super().__init__(f"LLM provider {provider} is unavailable (circuit open)")
+        self.provider = provider
+
+
+class ProviderHealth:
+    """
+    Rolling outcomes of one provider, with closed/open/half-open breaker state,
+    and rolling latencies per call site for the hedge delay
+    """
+
+    def __init__(self, name: str, window: int = LLM_BREAKER_WINDOW):
+        self.name = name
+        self.window = window
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider; half-open lets a single probe through"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= LLM_BREAKER_COOLDOWN_SECONDS:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def p95(self, call_site: str = DEFAULT_CALL_SITE) -> Optional[float]:
+        latencies = self.latencies.get(call_site, ())
+        if len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def hedge_delay(self, call_site: str = DEFAULT_CALL_SITE) -> Optional[float]:
+        p95 = self.p95(call_site)
+        return max(p95, LLM_HEDGE_MIN_DELAY_SECONDS) if p95 is not None else None
+
+    def record(self, ok: bool, latency: float, call_site: str = DEFAULT_CALL_SITE) -> None:
+        self.outcomes.append(ok)
+        if ok:
+            if call_site not in self.latencies:
+                self.latencies[call_site] = deque(maxlen=max(self.window, LLM_HEDGE_MIN_SAMPLES) * 5)
+            self.latencies[call_site].append(latency)
+
+        if self.state == "half_open":
+            self.probe_in_flight = False
+            if ok:
+                self._close()
+            else:
+                self._open()
+        elif (
+            self.state == "closed"
+            and len(self.outcomes) >= LLM_BREAKER_MIN_CALLS
+            and self.error_rate() >= LLM_BREAKER_ERROR_RATE
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        if self.state != "open":
+            logger.warning(f"LLM provider {self.name} circuit opened (error rate {self.error_rate():.0%})")
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        BREAKER_OPEN.labels(provider=self.name).set(1)
+
+    def _close(self) -> None:
+        logger.info(f"LLM provider {self.name} circuit closed")
+        self.state = "closed"
+        self.outcomes.clear()
+        BREAKER_OPEN.labels(provider=self.name).set(0)
+
+
+_providers: Dict[str, ProviderHealth] = {}
+
+
+def get_provider(name: str) -> ProviderHealth:
+    if name not in _providers:
+        _providers[name] = ProviderHealth(name)
+    return _providers[name]
+
+
+def reset_providers() -> None:
+    _providers.clear()
+
+
+@asynccontextmanager
+async def guarded_exchange(provider: str, call_site: str = DEFAULT_CALL_SITE) -> AsyncIterator[None]:
+    """
+    Judge everything inside the block as one unhedged call, e.g. a stream from
+    opening it to its last chunk, so failures mid-stream count against the
+    breaker. A consumer that stops early leaves the provider unjudged.
+    Raises CircuitOpen immediately while the provider is unhealthy.
+    """
+    health = get_provider(provider)
+    if not health.allow():
+        BREAKER_REJECTIONS.labels(provider=provider).inc()
+        raise CircuitOpen(provider)
+
+    started = time.monotonic()
+    try:
+        yield
+    except (asyncio.CancelledError, GeneratorExit):
+        health.probe_in_flight = False
+        raise
+    except Exception:
+        health.record(False, time.monotonic() - started, call_site)
+        raise
+    health.record(True, time.monotonic() - started, call_site)
+
+
+async def _first_success(tasks: Tuple[asyncio.Task, ...]):
+    """Result of whichever task succeeds first; raises only if all fail"""
+    pending = set(tasks)
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return task.result()
+            error = task.exception()
+    raise error
+
+
+async def call_llm(
+    provider: str,
+    make_call: Callable[[], Awaitable[T]],
+    hedge: bool = True,
+    timeout: float = LLM_CALL_TIMEOUT_SECONDS,
+    call_site: str = DEFAULT_CALL_SITE,
+    slots: Optional[asyncio.Semaphore] = None
+) -> T:
+    """
+    Run an LLM call through the provider's breaker.
+    make_call must start a fresh, independent request each time it is called;
+    pass hedge=False for calls that aren't safe to duplicate (e.g. stateful chats).
+    Each attempt first takes one of slots, if given; the clock and the timeout
+    start once the first attempt holds its slot, so local queueing is neither
+    latency nor a provider failure.
+    Raises CircuitOpen immediately while the provider is unhealthy.
+    """
+    health = get_provider(provider)
+    if not health.allow():
+        BREAKER_REJECTIONS.labels(provider=provider).inc()
+        raise CircuitOpen(provider)
+
+    acquired = asyncio.Event()
+
+    async def attempt():
+        async with slots if slots is not None else nullcontext():
+            acquired.set()
+            return await make_call()
+
+    first = asyncio.ensure_future(attempt())
+    tasks: Tuple[asyncio.Task, ...] = (first,)
+    try:
+        await acquired.wait()
+        started = time.monotonic()
+        delay = health.hedge_delay(call_site) if hedge and LLM_HEDGE_ENABLED else None
+        if delay is not None and delay < timeout:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if not done:
+                HEDGED_REQUESTS.labels(provider=provider, call_site=call_site).inc()
+                tasks = (first, asyncio.ensure_future(attempt()))
+        result = await asyncio.wait_for(_first_success(tasks), timeout - (time.monotonic() - started))
+    except asyncio.CancelledError:
+        # The caller went away; free a half-open probe slot without judging the provider
+        for task in tasks:
+            task.cancel()
+        health.probe_in_flight = False
+        raise
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        health.record(False, time.monotonic() - started, call_site)
+        raise
+    health.record(True, time.monotonic() - started, call_site)
+    return result
@@ -0,0 +1,172 @@
+"""
+SITERANK AI - Metrics
+Prometheus metrics shared across the app: request latency per route,
+analyses in flight and queued, Mongo command latency, cache lookups and
+fallback-path activations. LLM and scrape metrics live next to the code they
+measure; everything registered is exposed together by /api/metrics.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'Time to the last byte of the response, by route template',
+    ['method', 'route', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+REQUESTS_IN_PROGRESS = Gauge('http_requests_in_progress', 'Requests being handled', ['method'])
+
+ANALYSES_IN_PROGRESS = Gauge('analyses_in_progress', 'Analyses being run in this worker')
+ANALYSES_QUEUED = Gauge('analyses_queued', 'Analyses created and waiting for a run slot in this worker')
+
+MONGO_COMMAND_SECONDS = Histogram(
+    'mongo_command_duration_seconds',
+    'Round trip of Mongo commands, by command and collection',
+    ['command', 'collection'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+MONGO_COMMAND_FAILURES = Counter('mongo_command_failures_total', 'Mongo commands that failed', ['command', 'collection'])
+
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total',
+    'Lookups in the competitor set, snapshot and batch scrape caches (LLM responses: llm_cache_requests_total)',
+    ['cache', 'result']
+)
+
+FALLBACKS = Counter(
+    'fallback_activations_total',
+    'Times a degraded path served the request instead of the primary one',
+    ['path']
+)
+
+# Label for requests that matched no route, so scanners can't explode the route label
+UNMATCHED_ROUTE = "unmatched"
+
+
+# ==================== HTTP ====================
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request by method, route template and status. The clock
+    stops at the last body chunk, so BackgroundTasks that run after the
+    response is sent don't count towards its latency.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        started = time.perf_counter()
+        status = {"code": 500, "observed": False}
+
+        def observe():
+            if status["observed"]:
+                return
+            status["observed"] = True
+            route = scope.get('route')
+            REQUEST_SECONDS.labels(
+                method, getattr(route, 'path', UNMATCHED_ROUTE), str(status["code"])
+            ).observe(time.perf_counter() - started)
+
+        async def timed_send(message):
+            if message['type'] == 'http.response.start':
+                status["code"] = message['status']
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                observe()
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            observe()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """The default registry in the Prometheus text format, and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# ==================== Analyses ====================
+
+def analyses_queued(count: int = 1) -> None:
+    ANALYSES_QUEUED.inc(count)
+
+
+@contextmanager
+def analysis_running() -> Iterator[None]:
+    """Moves one queued analysis to in progress for the duration of the block"""
+    ANALYSES_QUEUED.dec()
+    ANALYSES_IN_PROGRESS.inc()
+    try:
+        yield
+    finally:
+        ANALYSES_IN_PROGRESS.dec()
+
+
+# ==================== Mongo ====================
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding mongo_command_duration_seconds"""
+
+    def __init__(self):
+        # The collection is only on the started event; pymongo calls
+        # listeners from Motor's executor threads
+        self._collections: Dict[Tuple[int, int], str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> Tuple[int, int]:
+        return event.request_id, event.operation_id
+
+    def started(self, event) -> None:
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            # getMore names the collection separately; admin commands have none
+            target = event.command.get('collection', '')
+        with self._lock:
+            self._collections[self._key(event)] = target if isinstance(target, str) else ''
+
+    def _collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop(self._key(event), '')
+
+    def succeeded(self, event) -> None:
+        MONGO_COMMAND_SECONDS.labels(event.command_name, self._collection(event)).observe(
+            event.duration_micros / 1e6
+        )
+
+    def failed(self, event) -> None:
+        collection = self._collection(event)
+        MONGO_COMMAND_SECONDS.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+
+
+# ==================== Caches & Fallbacks ====================
+
+def record_cache_lookup(cache: str, result: str) -> None:
+    """Count one lookup; result is hit, miss, or stale for entries served while refreshing"""
+    CACHE_LOOKUPS.labels(cache, result).inc()
+
+
+def record_fallback(path: str) -> None:
+    """Count one activation of a degraded path (rule-based fixes, canned replies, stale data)"""
+    FALLBACKS.labels(path).inc()
@@ -0,0 +1,121 @@
+"""
+SITERANK AI - Data Migrations
+Idempotent backfills that bring older documents up to the current schema
+
+Usage: python migrations.py <migration>  (always runs, even if already recorded)
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pymongo import UpdateOne
+
+from artifact_store import ARTIFACT_KEY, ARTIFACT_MIN_BYTES, pack
+from retention import archive_old_runs, backfill_expiry
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_analysis_summaries(db) -> int:
+    """Denormalize overall_score and competitor_count onto analyses that predate them"""
+    result = await db.analyses.update_many(
+        {"competitor_count": {"$exists": False}},
+        [{"$set": {
+            "competitor_count": {"$size": {"$ifNull": ["$competitors", []]}},
+            "overall_score": {"$ifNull": ["$user_site_scores.overall_score", 0]},
+        }}]
+    )
+    if result.modified_count:
+        logger.info(f"Backfilled summary fields on {result.modified_count} analyses")
+    return result.modified_count
+
+
+# Collections and fields stored through artifact_store, with a filter for
+# documents still holding the plain value
+ARTIFACT_FIELDS = [
+    ("analyses", "ai_suggestions", {
+        "ai_suggestions": {"$type": "string"},
+        "$expr": {"$gte": [{"$strLenBytes": "$ai_suggestions"}, ARTIFACT_MIN_BYTES]}
+    }),
+    ("optimizations", "blueprint", {"blueprint": {"$type": "object"}, f"blueprint.{ARTIFACT_KEY}": {"$exists": False}}),
+    ("analysis_details", "user_site", {"user_site": {"$type": "object"}, f"user_site.{ARTIFACT_KEY}": {"$exists": False}}),
+    ("analysis_details", "competitors", {"competitors": {"$type": "array"}}),
+    ("competitor_snapshots", "data", {"data": {"$type": "object"}, f"data.{ARTIFACT_KEY}": {"$exists": False}}),
+]
+
+
+async def backfill_artifacts(db, batch_size: int = 200) -> int:
+    """Compress large text/JSON fields written before artifact storage existed"""
+    total = 0
+    for collection, field, query in ARTIFACT_FIELDS:
+        updates = []
+        async for doc in db[collection].find(query, {"_id": 1, field: 1}):
+            packed = pack(doc[field])
+            if packed is doc[field]:
+                continue  # below the size threshold
+            updates.append(UpdateOne({"_id": doc['_id']}, {"$set": {field: packed}}))
+            if len(updates) >= batch_size:
+                total += (await db[collection].bulk_write(updates, ordered=False)).modified_count
+                updates = []
+        if updates:
+            total += (await db[collection].bulk_write(updates, ordered=False)).modified_count
+        logger.info(f"Compressed {collection}.{field}")
+    logger.info(f"Backfilled {total} artifact fields")
+    return total
+
+
+MIGRATIONS = {
+    "analysis-summaries": backfill_analysis_summaries,
+    "artifacts": backfill_artifacts,
+    "expiry": backfill_expiry,
+    "archive": archive_old_runs,
+}
+
+
+# Backfills run once at startup. Their filters scan the whole collection, so
+# completion is recorded in the migrations collection and later boots skip them
+STARTUP_MIGRATIONS = ("analysis-summaries", "expiry")
+
+
+async def record_migration(db, name: str, result) -> None:
+    await db.migrations.update_one(
+        {"name": name},
+        {"$set": {"result": result, "completed_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+
+
+async def run_startup_migrations(db) -> None:
+    """Run the startup backfills not yet recorded; failures are logged so startup can continue"""
+    done = set(await db.migrations.distinct("name", {"name": {"$in": list(STARTUP_MIGRATIONS)}}))
+    for name in STARTUP_MIGRATIONS:
+        if name in done:
+            continue
+        try:
+            await record_migration(db, name, await MIGRATIONS[name](db))
+        except Exception as e:
+            logger.error(f"Migration {name} failed: {str(e)}")
+
+
+async def main(name: str) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        db = client[os.environ['DB_NAME']]
+        await record_migration(db, name, await MIGRATIONS[name](db))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run a SITERANK AI data migration")
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    asyncio.run(main(parser.parse_args().migration))
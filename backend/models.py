@@ -75,7 +75,11 @@ class AnalysisResult(BaseModel):
     competitors: List[CompetitorData]
     ai_suggestions: str = ""
     action_plan: List[str] = []
+    # Denormalized for the lean list projection
+    overall_score: int = 0
+    competitor_count: int = 0
     status: str = "pending"  # pending, processing, completed, failed
+    batch_id: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     completed_at: Optional[datetime] = None
 
@@ -91,6 +95,8 @@ class AnalysisResponse(BaseModel):
     status: str
     created_at: str
     completed_at: Optional[str] = None
+    # Milliseconds per stage (connect, fetch, parse, extract, score, llm, db) and total
+    timings: Optional[Dict[str, float]] = None
 
 
 class AnalysisSummary(BaseModel):
@@ -0,0 +1,255 @@
+"""
+SITERANK AI - Recurring Monitoring
+Cron-scheduled re-audits of saved analyses, run in off-peak windows
+"""
+
+import asyncio
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from croniter import croniter
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
+
+from artifact_store import pack, unpack
+from batch_analysis import BatchScraper, normalize_site_url
+from metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+MONITORING_ENABLED = os.environ.get('MONITORING_ENABLED', 'true').lower() == 'true'
+MONITOR_POLL_SECONDS = int(os.environ.get('MONITOR_POLL_SECONDS', '60'))
+MONITOR_JITTER_SECONDS = int(os.environ.get('MONITOR_JITTER_SECONDS', '900'))
+MONITOR_MAX_CONCURRENCY = int(os.environ.get('MONITOR_MAX_CONCURRENCY', '2'))
+# UTC hours "start-end" during which re-audits may run, e.g. "1-6" or "22-5"; empty disables
+MONITOR_OFFPEAK_HOURS = os.environ.get('MONITOR_OFFPEAK_HOURS', '1-6')
+MONITOR_SNAPSHOT_MAX_AGE_HOURS = int(os.environ.get('MONITOR_SNAPSHOT_MAX_AGE_HOURS', '24'))
+
+
+# ==================== Request/Response Models ====================
+
+class MonitoringScheduleCreate(BaseModel):
+    cron: str
+
+
+class MonitoringSchedule(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    analysis_id: str
+    user_site_url: str
+    competitor_urls: list = []
+    cron: str
+    active: bool = True
+    next_run_at: str
+    last_run_at: Optional[str] = None
+    last_analysis_id: Optional[str] = None
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+
+class MonitoringScheduleResponse(BaseModel):
+    id: str
+    analysis_id: str
+    user_site_url: str
+    cron: str
+    active: bool
+    next_run_at: str
+    last_run_at: Optional[str] = None
+    last_analysis_id: Optional[str] = None
+    created_at: str
+
+
+# ==================== Schedule Computation ====================
+
+def is_valid_cron(expression: str) -> bool:
+    """Check a standard 5-field cron expression"""
+    return bool(expression) and len(expression.split()) == 5 and croniter.is_valid(expression)
+
+
+def parse_offpeak_window(value: str) -> Optional[Tuple[int, int]]:
+    """Parse an "start-end" UTC hour window; returns None when disabled"""
+    if not value:
+        return None
+    try:
+        start, end = (int(part) for part in value.split('-', 1))
+    except ValueError:
+        logger.warning(f"Ignoring invalid MONITOR_OFFPEAK_HOURS: {value}")
+        return None
+    if not (0 <= start <= 23 and 0 <= end <= 23) or start == end:
+        return None
+    return start, end
+
+
+def in_offpeak_window(moment: datetime, window: Tuple[int, int]) -> bool:
+    start, end = window
+    if start < end:
+        return start <= moment.hour < end
+    return moment.hour >= start or moment.hour < end  # window wraps past midnight
+
+
+def shift_to_offpeak(moment: datetime, window: Optional[Tuple[int, int]]) -> datetime:
+    """Move a run time forward to the next off-peak window start if it falls outside one"""
+    if window is None or in_offpeak_window(moment, window):
+        return moment
+    start_today = moment.replace(hour=window[0], minute=0, second=0, microsecond=0)
+    if start_today > moment:
+        return start_today
+    return start_today + timedelta(days=1)
+
+
+def offpeak_window_end(moment: datetime, window: Tuple[int, int]) -> datetime:
+    """End of the off-peak window that moment falls in"""
+    start, end = window
+    end_today = moment.replace(hour=end, minute=0, second=0, microsecond=0)
+    if start > end and moment.hour >= start:
+        return end_today + timedelta(days=1)
+    return end_today
+
+
+def compute_next_run(
+    cron: str,
+    after: Optional[datetime] = None,
+    jitter_seconds: int = MONITOR_JITTER_SECONDS,
+    offpeak: Optional[Tuple[int, int]] = None
+) -> datetime:
+    """
+    Next due time for a cron schedule, pushed into the off-peak window and
+    jittered. The jitter is clamped to the time left in that window, so it
+    never pushes a run back out of it.
+    """
+    after = after or datetime.now(timezone.utc)
+    next_run = croniter(cron, after).get_next(datetime)
+    next_run = shift_to_offpeak(next_run, offpeak)
+    if offpeak is not None:
+        window_left = int((offpeak_window_end(next_run, offpeak) - next_run).total_seconds()) - 1
+        jitter_seconds = min(jitter_seconds, window_left)
+    if jitter_seconds > 0:
+        next_run += timedelta(seconds=random.randint(0, jitter_seconds))
+    return next_run
+
+
+def next_run_iso(cron: str, after: Optional[datetime] = None) -> str:
+    """compute_next_run with the configured jitter and off-peak window, as ISO string"""
+    return compute_next_run(cron, after, offpeak=parse_offpeak_window(MONITOR_OFFPEAK_HOURS)).isoformat()
+
+
+# ==================== Snapshot Reuse ====================
+
+async def save_snapshot(db, url: str, data: Dict) -> None:
+    """Store a freshly scraped page for later re-audits; a failed write only costs the reuse"""
+    try:
+        await db.competitor_snapshots.update_one(
+            {"url": normalize_site_url(url)},
+            {"$set": {"data": pack(data), "scraped_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"Failed to save snapshot of {url}: {str(e)}")
+
+
+class SnapshotScraper(BatchScraper):
+    """
+    BatchScraper that saves every page it fetches as a snapshot and, with
+    reuse, serves competitor pages from recent ones. URLs in live_urls (the
+    audited site itself) are always fetched fresh.
+    """
+
+    def __init__(
+        self,
+        db,
+        live_urls: Iterable[str] = (),
+        max_age_hours: int = MONITOR_SNAPSHOT_MAX_AGE_HOURS,
+        reuse: bool = True,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.db = db
+        self.live_urls = {normalize_site_url(url) for url in live_urls}
+        self.max_age = timedelta(hours=max_age_hours)
+        self.reuse = reuse
+        self.snapshot_hits = 0
+
+    async def _fetch(self, url: str) -> Tuple[bool, Dict]:
+        key = normalize_site_url(url)
+        if self.reuse and key not in self.live_urls:
+            cutoff = (datetime.now(timezone.utc) - self.max_age).isoformat()
+            snapshot = await self.db.competitor_snapshots.find_one(
+                {"url": key, "scraped_at": {"$gte": cutoff}},
+                {"_id": 0, "data": 1}
+            )
+            if snapshot:
+                self.snapshot_hits += 1
+                record_cache_lookup("competitor_snapshots", "hit")
+                return True, unpack(snapshot['data'])
+            record_cache_lookup("competitor_snapshots", "miss")
+
+        success, data = await super()._fetch(url)
+        if success:
+            await save_snapshot(self.db, url, data)
+        return success, data
+
+
+# ==================== Scheduler Loop ====================
+
+async def claim_due_schedule(db) -> Optional[dict]:
+    """Atomically claim one due schedule and advance its next run time"""
+    now = datetime.now(timezone.utc)
+    schedule = await db.monitoring_schedules.find_one(
+        {"active": True, "next_run_at": {"$lte": now.isoformat()}},
+        {"_id": 0}
+    )
+    if not schedule:
+        return None
+
+    # Only the worker whose update matches the old next_run_at owns this run
+    return await db.monitoring_schedules.find_one_and_update(
+        {"id": schedule['id'], "next_run_at": schedule['next_run_at']},
+        {"$set": {
+            "next_run_at": next_run_iso(schedule['cron'], now),
+            "last_run_at": now.isoformat()
+        }},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def monitoring_loop(db, rerun: Callable[[dict], Awaitable[None]]):
+    """
+    Poll for due schedules and re-run at most MONITOR_MAX_CONCURRENCY at once.
+    A schedule is only claimed (and its next_run_at advanced) when a slot is
+    free to run it, so nothing claimed waits in memory to be lost on restart.
+    """
+    slots = asyncio.Semaphore(MONITOR_MAX_CONCURRENCY)
+    running: Set[asyncio.Task] = set()
+
+    async def run(schedule: dict):
+        try:
+            await rerun(schedule)
+        except Exception as e:
+            logger.error(f"Scheduled re-audit {schedule.get('id')} failed: {str(e)}")
+        finally:
+            slots.release()
+
+    logger.info("Monitoring scheduler started")
+    try:
+        while True:
+            while True:
+                await slots.acquire()
+                try:
+                    schedule = await claim_due_schedule(db)
+                except Exception as e:
+                    logger.error(f"Monitoring scheduler poll failed: {str(e)}")
+                    schedule = None
+                if not schedule:
+                    slots.release()
+                    break
+                task = asyncio.create_task(run(schedule))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            await asyncio.sleep(MONITOR_POLL_SECONDS)
+    finally:
+        for task in running:
+            task.cancel()
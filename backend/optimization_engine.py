@@ -2,9 +2,12 @@ import os
 import logging
 from typing import Dict, List, Any
 
+from tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
+@traced("optimization.blueprint")
 async def generate_optimization_blueprint(
     user_url: str,
     user_scores: Dict[str, Any],
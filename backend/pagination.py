@@ -0,0 +1,56 @@
+"""
+SITERANK AI - Keyset Pagination
+Opaque cursors over (created_at, id) for newest-first list endpoints
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DESCENDING
+
+# Sort order every keyset-paginated query must use
+KEYSET_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Build an opaque cursor pointing just past the given document"""
+    raw = json.dumps([doc['created_at'], doc['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Return the (created_at, id) position encoded in a cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(doc_id, str):
+        raise InvalidCursor("Invalid cursor")
+    return created_at, doc_id
+
+
+def keyset_filter(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Extend a filter so it only matches documents after the cursor position"""
+    if not cursor:
+        return query
+    created_at, doc_id = decode_cursor(cursor)
+    return {
+        **query,
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": doc_id}},
+        ]
+    }
+
+
+def next_cursor(page: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Cursor for the following page, or None when this page is the last"""
+    if len(page) < limit or not page:
+        return None
+    return encode_cursor(page[-1])
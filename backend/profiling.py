@@ -0,0 +1,304 @@
+"""
+SITERANK AI - Slow Path Profiler
+Opt-in sampling profiler. A sampled fraction of requests and analysis jobs
+has its threads' stacks captured; the ones slower than their threshold are
+stored in profile_samples as collapsed stacks, with the pages they scraped.
+
+Limitation: requests and run_analysis jobs start on the event-loop thread, and
+the sampler sees threads, not tasks. A profile's loop-thread stacks therefore
+include whatever other coroutines ran on the loop while it was open; only
+worker threads joined through profiled_thread() are its own. Read a profile
+as "what the process was doing while this was slow", not as one request's
+cost.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from timing import current_timings
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+# Fraction of requests and jobs profiled; only slow ones are kept
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0.05'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '10'))
+PROFILE_REQUEST_THRESHOLD_MS = float(os.environ.get('PROFILE_REQUEST_THRESHOLD_MS', '2000'))
+PROFILE_JOB_THRESHOLD_MS = float(os.environ.get('PROFILE_JOB_THRESHOLD_MS', '30000'))
+# Bounds the sampler's work however many requests are in flight
+PROFILE_MAX_ACTIVE = int(os.environ.get('PROFILE_MAX_ACTIVE', '4'))
+PROFILE_RETENTION_DAYS = int(os.environ.get('PROFILE_RETENTION_DAYS', '14'))
+PROFILE_FLUSH_SECONDS = float(os.environ.get('PROFILE_FLUSH_SECONDS', '10'))
+
+# Distinct stacks kept per profile, most frequent first
+MAX_STACKS = 300
+MAX_DEPTH = 128
+
+_current: ContextVar[Optional["Profile"]] = ContextVar('profile', default=None)
+_active: List["Profile"] = []
+_active_lock = threading.Lock()
+_wake = threading.Event()
+_sampler: Optional[threading.Thread] = None
+_pending: Deque[Dict[str, Any]] = deque(maxlen=100)
+
+
+# ==================== Sampling ====================
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame) -> str:
+    """Root-first 'module:function;...' line of a thread's stack, as flame graph tools read it"""
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Profile:
+    """Stacks sampled from the threads working on one request or job"""
+
+    def __init__(self, kind: str, name: str, threshold_ms: float, **attributes: Any):
+        self.kind = kind
+        self.name = name
+        self.threshold_ms = threshold_ms
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.pages: List[Dict[str, Any]] = []
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration_ms = 0.0
+        self._threads = {threading.get_ident()}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def add_thread(self, ident: int) -> bool:
+        """False when the thread is already sampled"""
+        with self._lock:
+            if ident in self._threads:
+                return False
+            self._threads.add(ident)
+            return True
+
+    def remove_thread(self, ident: int) -> None:
+        with self._lock:
+            self._threads.discard(ident)
+
+    def sample(self, frames: Dict[int, Any]) -> None:
+        with self._lock:
+            threads = list(self._threads)
+        for ident in threads:
+            frame = frames.get(ident)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+                self.samples += 1
+
+    def stop(self) -> float:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        return self.duration_ms
+
+    def to_doc(self) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        return {
+            "id": str(uuid.uuid4()),
+            "kind": self.kind,
+            "name": self.name,
+            **self.attributes,
+            "pages": self.pages,
+            "page_bytes": max((page['bytes'] for page in self.pages), default=0),
+            "duration_ms": round(self.duration_ms, 1),
+            "threshold_ms": self.threshold_ms,
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "samples": self.samples,
+            "timings": current_timings(),
+            "stacks": [{"stack": stack, "count": count} for stack, count in self.stacks.most_common(MAX_STACKS)],
+            "created_at": now,
+            "expires_at": now + timedelta(days=PROFILE_RETENTION_DAYS)
+        }
+
+
+def _sample_loop() -> None:
+    own = threading.get_ident()
+    while True:
+        _wake.wait()
+        time.sleep(PROFILE_INTERVAL_MS / 1000)
+        with _active_lock:
+            profiles = list(_active)
+            if not profiles:
+                _wake.clear()
+                continue
+        frames = sys._current_frames()
+        frames.pop(own, None)
+        for profile in profiles:
+            profile.sample(frames)
+
+
+def _start(profile: Profile) -> bool:
+    global _sampler
+    with _active_lock:
+        if len(_active) >= PROFILE_MAX_ACTIVE:
+            return False
+        _active.append(profile)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="profile-sampler", daemon=True)
+            _sampler.start()
+    _wake.set()
+    return True
+
+
+def _stop(profile: Profile) -> None:
+    with _active_lock:
+        if profile in _active:
+            _active.remove(profile)
+    if profile.stop() >= profile.threshold_ms:
+        _pending.append(profile.to_doc())
+        logger.info(f"Kept profile of slow {profile.kind} {profile.name}: {profile.duration_ms:.0f}ms, {profile.samples} samples")
+
+
+def begin_profile(kind: str, name: str, threshold_ms: float, **attributes: Any) -> Optional[Profile]:
+    """
+    Start profiling the calling thread for a sampled fraction of calls; None when not sampled.
+    On the event-loop thread that includes every coroutine running meanwhile (see module docstring).
+    """
+    if not PROFILING_ENABLED or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    profile = Profile(kind, name, threshold_ms, **attributes)
+    return profile if _start(profile) else None
+
+
+def end_profile(profile: Optional[Profile]) -> None:
+    """Stop sampling; the profile is queued for storage if it ran past its threshold"""
+    if profile is not None:
+        _stop(profile)
+
+
+@contextmanager
+def profile_session(kind: str, name: str, threshold_ms: float, **attributes: Any) -> Iterator[Optional[Profile]]:
+    profile = begin_profile(kind, name, threshold_ms, **attributes)
+    # Set even when not sampled, so a job started by a profiled request doesn't report into it
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+        end_profile(profile)
+
+
+@contextmanager
+def profiled_thread() -> Iterator[None]:
+    """Also sample this thread for the current profile (work moved to a worker thread)"""
+    profile = _current.get()
+    ident = threading.get_ident()
+    if profile is None or not profile.add_thread(ident):
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.remove_thread(ident)
+
+
+def note_page(url: str, size_bytes: int) -> None:
+    """Record a page fetched for the current profile"""
+    profile = _current.get()
+    if profile is not None:
+        profile.pages.append({"url": url, "bytes": size_bytes})
+
+
+# ==================== HTTP ====================
+
+class ProfilingMiddleware:
+    """Profiles sampled requests; the clock stops at the last body chunk, like the latency metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        profile = begin_profile("request", scope['path'], PROFILE_REQUEST_THRESHOLD_MS, method=scope['method'])
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"ended": False}
+
+        def finish():
+            if state["ended"]:
+                return
+            state["ended"] = True
+            route = getattr(scope.get('route'), 'path', None)
+            if route:
+                profile.name = route
+            profile.attributes['path'] = scope['path']
+            end_profile(profile)
+
+        async def profiled_send(message):
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                finish()
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            _current.reset(token)
+            finish()
+
+
+# ==================== Storage ====================
+
+async def flush_profiles(db) -> int:
+    """Write queued slow profiles to profile_samples"""
+    docs = []
+    while _pending:
+        docs.append(_pending.popleft())
+    if not docs:
+        return 0
+    try:
+        await db.profile_samples.insert_many(docs, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to write {len(docs)} profiles: {str(e)}")
+        return 0
+    return len(docs)
+
+
+async def profile_flush_loop(db) -> None:
+    """Flush kept profiles every PROFILE_FLUSH_SECONDS"""
+    while True:
+        await asyncio.sleep(PROFILE_FLUSH_SECONDS)
+        try:
+            await flush_profiles(db)
+        except Exception as e:
+            logger.error(f"Profile flush failed: {str(e)}")
+
+
+async def recent_profiles(db, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Newest slow profiles without their stacks"""
+    query = {"kind": kind} if kind else {}
+    cursor = db.profile_samples.find(query, {"_id": 0, "stacks": 0, "expires_at": 0}).sort("created_at", -1).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+async def get_profile(db, profile_id: str) -> Optional[Dict[str, Any]]:
+    return await db.profile_samples.find_one({"id": profile_id}, {"_id": 0, "expires_at": 0})
+
+
+def collapsed_text(profile: Dict[str, Any]) -> str:
+    """Stacks in the 'stack count' line format flamegraph.pl and speedscope import"""
+    return "".join(f"{entry['stack']} {entry['count']}\n" for entry in profile.get('stacks', []))
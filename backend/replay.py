@@ -0,0 +1,410 @@
+"""
+SITERANK AI - Record/Replay
+Captures outbound HTTP (site scrapes) and LLM calls into a cassette file once,
+then plays them back offline with recorded or synthetic latency, so the
+analysis and optimization pipelines can be benchmarked and regression-tested
+without network access
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import llm_client
+import scraper
+from llm_cache import normalize_prompt
+from llm_resilience import EMERGENT, NVIDIA
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+
+CASSETTE_VERSION = 1
+EMERGENT_CHAT_MODULE = "emergentintegrations.llm.chat"
+# Library downloads (tiktoken's BPE files) go straight through when recording
+PASSTHROUGH_HOSTS = ("openaipublic.blob.core.windows.net",)
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """No recorded interaction for a request made during replay"""
+
+
+# ==================== Latency ====================
+
+class Latency:
+    """
+    How long replayed interactions take:
+    "recorded" (as captured), "none", "fixed:<seconds>" or "scale:<factor>"
+    """
+
+    def __init__(self, spec: str = "recorded"):
+        self.spec = spec
+        mode, _, value = spec.partition(":")
+        if mode not in ("recorded", "none", "fixed", "scale"):
+            raise ValueError(f"Unknown latency spec: {spec}")
+        if mode in ("fixed", "scale") and not value:
+            raise ValueError(f"Latency spec {mode} needs a value, e.g. {mode}:0.5")
+        self.mode = mode
+        self.value = float(value) if value else 0.0
+
+    def seconds(self, recorded: float) -> float:
+        if self.mode == "none":
+            return 0.0
+        if self.mode == "fixed":
+            return self.value
+        if self.mode == "scale":
+            return recorded * self.value
+        return recorded
+
+
+# ==================== Cassette ====================
+
+def llm_key(provider: str, model: str, messages: List[Dict[str, Any]]) -> str:
+    """Exact-match key for an LLM call: provider, model and the normalized conversation"""
+    material = json.dumps(
+        [provider, model, [[m.get('role'), normalize_prompt(m.get('content') or '')] for m in messages]],
+        separators=(',', ':')
+    )
+    return "llm:" + hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def llm_signature(provider: str, model: str, system: str, stream: bool = False) -> str:
+    """Looser match for LLM calls whose prompt embeds run-dependent values (load times, dates)"""
+    return json.dumps([provider, model, normalize_prompt(system or ''), stream], separators=(',', ':'))
+
+
+def _system_prompt(messages: List[Dict[str, Any]]) -> str:
+    return next((m.get('content') or '' for m in messages if m.get('role') == 'system'), '')
+
+
+class Cassette:
+    """
+    Recorded interactions, stored as JSON.
+    Replay matches by exact key first and then by signature, in recorded
+    order; once a key or signature runs out its entries are reused from the start.
+    """
+
+    def __init__(self, path: Optional[str] = None, entries: Optional[List[Dict[str, Any]]] = None):
+        self.path = Path(path) if path else None
+        self.entries: List[Dict[str, Any]] = entries if entries is not None else []
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {data.get('version')} in {path}")
+        return cls(path, data['entries'])
+
+    def save(self, path: Optional[str] = None) -> None:
+        target = Path(path) if path else self.path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump({"version": CASSETTE_VERSION, "entries": self.entries}, f, indent=1)
+        logger.info(f"Saved {len(self.entries)} interactions to {target}")
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.entries.append(entry)
+
+    def match(self, key: str, signature: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for field, value in (("key", key), ("signature", signature)):
+                if value is None:
+                    continue
+                candidates = [e for e in self.entries if e.get(field) == value]
+                if candidates:
+                    cursor = self._cursors.get(f"{field}:{value}", 0)
+                    self._cursors[f"{field}:{value}"] = cursor + 1
+                    return candidates[cursor % len(candidates)]
+        return None
+
+
+# ==================== HTTP ====================
+
+def http_key(method: str, url: str) -> str:
+    return f"{method} {url}"
+
+
+class HttpRecorder:
+    """Stands in for requests.get"""
+
+    def __init__(self, cassette: Cassette, mode: str, latency: Latency, real_get):
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.real_get = real_get
+
+    def __call__(self, url, params=None, **kwargs):
+        if self.mode == RECORD:
+            if urlparse(url).hostname in PASSTHROUGH_HOSTS:
+                return self.real_get(url, params=params, **kwargs)
+            return self._record(url, params, **kwargs)
+        return self._replay(url)
+
+    def _record(self, url, params, **kwargs):
+        entry = {"kind": "http", "key": http_key("GET", url), "url": url}
+        started = time.perf_counter()
+        try:
+            response = self.real_get(url, params=params, **kwargs)
+        except requests.exceptions.RequestException as e:
+            entry.update(error=type(e).__name__, message=str(e)[:500], elapsed=time.perf_counter() - started)
+            self.cassette.add(entry)
+            raise
+        entry.update(
+            status=response.status_code,
+            headers=dict(response.headers),
+            encoding=response.encoding,
+            text=response.content.decode(response.encoding or 'utf-8', errors='replace'),
+            final_url=response.url,
+            elapsed=time.perf_counter() - started
+        )
+        self.cassette.add(entry)
+        return response
+
+    def _replay(self, url):
+        entry = self.cassette.match(http_key("GET", url))
+        if entry is None:
+            raise CassetteMiss(f"No recorded response for GET {url}")
+        time.sleep(self.latency.seconds(entry.get('elapsed', 0.0)))
+        if 'error' in entry:
+            error = getattr(requests.exceptions, entry['error'], requests.exceptions.ConnectionError)
+            raise error(entry.get('message', ''))
+
+        response = requests.models.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.encoding = entry.get('encoding') or 'utf-8'
+        response._content = entry['text'].encode(response.encoding, errors='replace')
+        response.url = entry.get('final_url', url)
+        response.elapsed = timedelta(seconds=entry.get('elapsed', 0.0))
+        return response
+
+
+class RecordingSession(requests.Session):
+    """Stands in for the scraper's timed session; its GETs go through the recorder"""
+
+    def __init__(self, recorder: HttpRecorder):
+        super().__init__()
+        self.recorder = recorder
+
+    def get(self, url, **kwargs):
+        return self.recorder(url, **kwargs)
+
+
+# ==================== NVIDIA (OpenAI-compatible) ====================
+
+class NvidiaRecorder:
+    """Stands in for the shared AsyncOpenAI client returned by llm_client.get_llm_client"""
+
+    def __init__(self, cassette: Cassette, mode: str, latency: Latency, real_get_client):
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.real_get_client = real_get_client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def lookup(self, model: str, messages: List[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+        entry = self.cassette.match(
+            llm_key(NVIDIA, model, messages),
+            llm_signature(NVIDIA, model, _system_prompt(messages), stream)
+        )
+        if entry is None:
+            raise CassetteMiss(f"No recorded {NVIDIA} completion for model {model}")
+        return entry
+
+    async def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, **kwargs):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        base = {
+            "kind": "llm",
+            "provider": NVIDIA,
+            "model": model,
+            "key": llm_key(NVIDIA, model, messages),
+            "signature": llm_signature(NVIDIA, model, _system_prompt(messages), stream)
+        }
+        if self.mode == RECORD:
+            started = time.perf_counter()
+            result = await self.real_get_client().chat.completions.create(
+                model=model, messages=messages, stream=stream, **kwargs
+            )
+            if stream:
+                return _RecordingStream(result, self.cassette, base, started)
+            self.cassette.add({**base, "response": result.model_dump(mode='json'), "elapsed": time.perf_counter() - started})
+            return result
+
+        entry = self.lookup(model, messages, stream)
+        if not stream:
+            await asyncio.sleep(self.latency.seconds(entry.get('elapsed', 0.0)))
+            return ChatCompletion.model_validate(entry['response'])
+        return _ReplayStream(
+            [ChatCompletionChunk.model_validate(c) for c in entry['chunks']],
+            self.latency.seconds(entry.get('ttft', 0.0)),
+            self.latency.seconds(entry.get('elapsed', 0.0))
+        )
+
+
+class _RecordingStream:
+    """Passes a live stream through, keeping its chunks and timing"""
+
+    def __init__(self, stream, cassette: Cassette, entry: Dict[str, Any], started: float):
+        self.stream = stream
+        self.cassette = cassette
+        self.entry = {**entry, "chunks": []}
+        self.started = started
+        self.ttft: Optional[float] = None
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - self.started
+            self.entry["chunks"].append(chunk.model_dump(mode='json'))
+            yield chunk
+        self.cassette.add({
+            **self.entry,
+            "ttft": self.ttft or 0.0,
+            "elapsed": time.perf_counter() - self.started
+        })
+
+    async def close(self):
+        await self.stream.close()
+
+
+class _ReplayStream:
+    """Recorded chunks: the first after the time to first token, the rest spread over the remainder"""
+
+    def __init__(self, chunks: list, ttft: float, elapsed: float):
+        self.chunks = chunks
+        self.ttft = ttft
+        self.gap = max(0.0, elapsed - ttft) / max(1, len(chunks) - 1)
+
+    async def __aiter__(self):
+        for i, chunk in enumerate(self.chunks):
+            await asyncio.sleep(self.ttft if i == 0 else self.gap)
+            yield chunk
+
+    async def close(self):
+        pass
+
+
+# ==================== Emergent ====================
+
+class ReplayUserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def emergent_chat_module(cassette: Cassette, mode: str, latency: Latency) -> Optional[ModuleType]:
+    """
+    A drop-in emergentintegrations.llm.chat whose LlmChat records or replays.
+    None when recording without the real package, which then fails as it would unpatched.
+    """
+    real = None
+    if mode == RECORD:
+        try:
+            import emergentintegrations.llm.chat as real
+        except ImportError:
+            logger.warning("emergentintegrations not installed; Emergent calls won't be recorded")
+            return None
+
+    class LlmChat:
+        def __init__(self, api_key: str, session_id: str, system_message: str, **kwargs):
+            self.system_message = system_message
+            self.model = ""
+            self.history: List[Dict[str, Any]] = [{"role": "system", "content": system_message}]
+            self._chat = real.LlmChat(api_key=api_key, session_id=session_id, system_message=system_message, **kwargs) if real else None
+
+        def with_model(self, provider: str, model: str) -> "LlmChat":
+            self.model = f"{provider}/{model}"
+            if self._chat is not None:
+                self._chat = self._chat.with_model(provider, model)
+            return self
+
+        async def send_message(self, message) -> str:
+            messages = self.history + [{"role": "user", "content": message.text}]
+            key = llm_key(EMERGENT, self.model, messages)
+            signature = llm_signature(EMERGENT, self.model, self.system_message)
+            if self._chat is not None:
+                started = time.perf_counter()
+                response = await self._chat.send_message(message)
+                cassette.add({
+                    "kind": "llm", "provider": EMERGENT, "model": self.model, "key": key,
+                    "signature": signature, "response": response, "elapsed": time.perf_counter() - started
+                })
+            else:
+                entry = cassette.match(key, signature)
+                if entry is None:
+                    raise CassetteMiss(f"No recorded {EMERGENT} reply for model {self.model}")
+                await asyncio.sleep(latency.seconds(entry.get('elapsed', 0.0)))
+                response = entry['response']
+            self.history = messages + [{"role": "assistant", "content": response}]
+            return response
+
+    module = ModuleType(EMERGENT_CHAT_MODULE)
+    module.LlmChat = LlmChat
+    module.UserMessage = real.UserMessage if real else ReplayUserMessage
+    return module
+
+
+# ==================== Switching ====================
+
+@contextmanager
+def replaying(path: str, mode: str = REPLAY, latency: str = "recorded") -> Iterator[Cassette]:
+    """
+    Route requests.get, the scraper's sessions, the shared NVIDIA client and emergentintegrations
+    through a cassette for the duration of the block.
+    RECORD makes real calls and saves them to path when the block ends;
+    REPLAY serves them from path and raises CassetteMiss for anything unrecorded.
+    """
+    if mode not in (RECORD, REPLAY):
+        raise ValueError(f"Unknown replay mode: {mode}")
+    cassette = Cassette(path) if mode == RECORD else Cassette.load(path)
+    pace = Latency(latency)
+
+    saved_get = requests.get
+    saved_session = scraper.timed_session
+    saved_client = llm_client.get_llm_client
+    saved_modules = {
+        name: sys.modules.get(name)
+        for name in ("emergentintegrations", "emergentintegrations.llm", EMERGENT_CHAT_MODULE)
+    }
+
+    recorder = HttpRecorder(cassette, mode, pace, saved_get)
+    requests.get = recorder
+    scraper.timed_session = lambda: RecordingSession(recorder)
+    nvidia = NvidiaRecorder(cassette, mode, pace, saved_client)
+    llm_client.get_llm_client = lambda: nvidia
+    chat_module = emergent_chat_module(cassette, mode, pace)
+    if chat_module is not None:
+        for name in ("emergentintegrations", "emergentintegrations.llm"):
+            sys.modules.setdefault(name, ModuleType(name))
+        sys.modules[EMERGENT_CHAT_MODULE] = chat_module
+    try:
+        yield cassette
+    finally:
+        requests.get = saved_get
+        scraper.timed_session = saved_session
+        llm_client.get_llm_client = saved_client
+        for name, module in saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        if mode == RECORD:
+            cassette.save()
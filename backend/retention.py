@@ -0,0 +1,155 @@
+"""
+SITERANK AI - Retention & Archive
+TTL expiry for failed and abandoned runs, and a background archiver that
+moves old completed runs out of the hot collections
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from bson import json_util
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+# Failed runs are kept this long so users can still see what went wrong
+FAILED_RETENTION_DAYS = int(os.environ.get('FAILED_RETENTION_DAYS', '7'))
+# Runs still pending/processing this long after creation are treated as abandoned
+ABANDONED_RETENTION_HOURS = int(os.environ.get('ABANDONED_RETENTION_HOURS', '24'))
+# Completed runs older than this move to the archive; 0 disables archiving
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_POLL_SECONDS = int(os.environ.get('ARCHIVE_POLL_SECONDS', '3600'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '200'))
+# Optional directory for gzipped JSONL copies of everything archived
+ARCHIVE_EXPORT_DIR = os.environ.get('ARCHIVE_EXPORT_DIR', '')
+
+# Hot collection -> cold archive collection
+ARCHIVE_COLLECTIONS = {
+    "analyses": "analyses_archive",
+    "analysis_details": "analysis_details_archive",
+    "optimizations": "optimizations_archive",
+}
+
+
+# ==================== Expiry ====================
+
+def pending_expiry(now: Optional[datetime] = None) -> datetime:
+    """expires_at for a new run; cleared on completion, shortened to the failure window on error"""
+    return (now or datetime.now(timezone.utc)) + timedelta(hours=ABANDONED_RETENTION_HOURS)
+
+
+def failed_expiry(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) + timedelta(days=FAILED_RETENTION_DAYS)
+
+
+async def backfill_expiry(db) -> int:
+    """Give failed and unfinished analyses written before retention existed an expiry"""
+    now = datetime.now(timezone.utc)
+    modified = 0
+    for statuses, expires_at in ((["failed"], failed_expiry(now)), (["pending", "processing"], pending_expiry(now))):
+        result = await db.analyses.update_many(
+            {"status": {"$in": statuses}, "expires_at": {"$exists": False}},
+            {"$set": {"expires_at": expires_at}}
+        )
+        modified += result.modified_count
+    if modified:
+        logger.info(f"Set expiry on {modified} failed or unfinished analyses")
+    return modified
+
+
+# ==================== Archive Reads ====================
+
+async def find_one_archived(db, collection: str, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+    """find_one on a hot collection, falling back to its archive"""
+    doc = await db[collection].find_one(query, projection)
+    if doc is None:
+        doc = await db[ARCHIVE_COLLECTIONS[collection]].find_one(query, projection)
+    return doc
+
+
+async def find_archived(db, collection: str, query: dict, projection: dict, sort: list, limit: int) -> List[dict]:
+    """Run a hot-collection list query against its archive, to top up a short page"""
+    cursor = db[ARCHIVE_COLLECTIONS[collection]].find(query, projection).sort(sort).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+def union_archive(collection: str, match: dict) -> dict:
+    """$unionWith stage that adds matching archived documents to an aggregation"""
+    return {"$unionWith": {"coll": ARCHIVE_COLLECTIONS[collection], "pipeline": [{"$match": match}]}}
+
+
+# ==================== Archiver ====================
+
+def _export_jsonl(collection: str, docs: List[Dict[str, Any]]) -> None:
+    """Append archived documents to a per-day gzipped JSONL file"""
+    export_dir = Path(ARCHIVE_EXPORT_DIR)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    path = export_dir / f"{collection}-{datetime.now(timezone.utc):%Y%m%d}.jsonl.gz"
+    # Appending writes a new gzip member; gzip readers treat the file as one stream
+    with gzip.open(path, 'at', encoding='utf-8') as f:
+        for doc in docs:
+            f.write(json_util.dumps(doc) + '\n')
+
+
+async def _move(db, collection: str, docs: List[Dict[str, Any]]) -> int:
+    """Copy documents into the archive, then remove them from the hot collection"""
+    if not docs:
+        return 0
+    if ARCHIVE_EXPORT_DIR:
+        await asyncio.to_thread(_export_jsonl, collection, docs)
+    # Upserts keep a re-run after a crash between the two steps idempotent
+    await db[ARCHIVE_COLLECTIONS[collection]].bulk_write(
+        [ReplaceOne({"_id": doc['_id']}, doc, upsert=True) for doc in docs],
+        ordered=False
+    )
+    result = await db[collection].delete_many({"_id": {"$in": [doc['_id'] for doc in docs]}})
+    return result.deleted_count
+
+
+async def archive_old_runs(db, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE) -> Dict[str, int]:
+    """Move completed analyses (with their details) and optimizations past the cutoff"""
+    moved = {collection: 0 for collection in ARCHIVE_COLLECTIONS}
+    if older_than_days <= 0:
+        return moved
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+    while True:
+        analyses = await db.analyses.find(
+            {"status": "completed", "created_at": {"$lt": cutoff}}
+        ).sort("created_at", 1).limit(batch_size).to_list(length=batch_size)
+        if not analyses:
+            break
+        details = await db.analysis_details.find(
+            {"analysis_id": {"$in": [a['id'] for a in analyses]}}
+        ).to_list(length=None)
+        # Details first, so a half-finished batch never leaves an analysis without them
+        moved["analysis_details"] += await _move(db, "analysis_details", details)
+        moved["analyses"] += await _move(db, "analyses", analyses)
+
+    while True:
+        optimizations = await db.optimizations.find(
+            {"created_at": {"$lt": cutoff}}
+        ).sort("created_at", 1).limit(batch_size).to_list(length=batch_size)
+        if not optimizations:
+            break
+        moved["optimizations"] += await _move(db, "optimizations", optimizations)
+
+    if any(moved.values()):
+        logger.info(f"Archived runs older than {older_than_days} days: {moved}")
+    return moved
+
+
+async def archive_loop(db):
+    """Periodically archive old runs"""
+    logger.info("Archiver started")
+    while True:
+        try:
+            await archive_old_runs(db)
+        except Exception as e:
+            logger.error(f"Archiving failed: {str(e)}")
+        await asyncio.sleep(ARCHIVE_POLL_SECONDS)
@@ -7,8 +7,79 @@ import logging
 import socket
 from typing import Dict, Any, Optional, Tuple
 
+from prometheus_client import Counter, Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from profiling import note_page, profiled_thread
+from timing import collecting, record_stage, stage
+from tracing import span, traced
+
 logger = logging.getLogger(__name__)
 
+SCRAPE_STAGE_SECONDS = Histogram(
+    'scrape_stage_duration_seconds',
+    'Scrape time by stage: fetch (each download attempt), parse and extract',
+    ['stage'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30)
+)
+SCRAPE_HTML_BYTES = Counter('scrape_html_bytes_total', 'Bytes of HTML downloaded by the scraper')
+SCRAPES = Counter('scrapes_total', 'Site scrapes by outcome', ['outcome'])
+
+
+# ==================== Connect Timing ====================
+
+class _ConnectTimedConnection:
+    """
+    Times opening a connection (DNS lookup, TCP connect and TLS handshake) as
+    the connect stage. urllib3 opens the connection as usual; reused
+    keep-alive connections add nothing.
+    """
+
+    def connect(self) -> None:
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            record_stage("connect", time.perf_counter() - started)
+
+
+class ConnectTimedHTTPConnection(_ConnectTimedConnection, HTTPConnection):
+    pass
+
+
+class ConnectTimedHTTPSConnection(_ConnectTimedConnection, HTTPSConnection):
+    pass
+
+
+class ConnectTimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = ConnectTimedHTTPConnection
+
+
+class ConnectTimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = ConnectTimedHTTPSConnection
+
+
+class ConnectTimedAdapter(HTTPAdapter):
+    """Adapter whose direct connections are timed; only the scraper's sessions mount it"""
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": ConnectTimedHTTPConnectionPool,
+            "https": ConnectTimedHTTPSConnectionPool,
+        }
+
+
+def timed_session() -> requests.Session:
+    """A session for one scrape, so its URL variants can share keep-alive connections"""
+    session = requests.Session()
+    adapter = ConnectTimedAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 class WebsiteScraper:
     """Scrapes website data for analysis"""
@@ -19,6 +90,7 @@ class WebsiteScraper:
         self.timeout = timeout
         self.soup = None
         self.response = None
+        self.session: Optional[requests.Session] = None
         self.load_time = 0
         self.error_message = None
         
@@ -65,8 +137,35 @@ class WebsiteScraper:
         
         return variants
     
+    def _get(self, url: str, headers: Dict[str, str], verify: bool) -> requests.Response:
+        with span("scrape.fetch", **{"url.full": url, "tls.verify": verify}) as current:
+            started = time.perf_counter()
+            try:
+                with stage("fetch"):
+                    response = self.session.get(url, headers=headers, timeout=self.timeout, allow_redirects=True, verify=verify)
+            finally:
+                SCRAPE_STAGE_SECONDS.labels('fetch').observe(time.perf_counter() - started)
+            SCRAPE_HTML_BYTES.inc(len(response.content))
+            current.set_attribute("http.response.status_code", response.status_code)
+            current.set_attribute("http.response.body.size", len(response.content))
+        return response
+    
+    def _parse(self) -> None:
+        with span("scrape.parse", **{"http.response.body.size": len(self.response.content)}):
+            started = time.perf_counter()
+            with stage("parse"):
+                self.soup = BeautifulSoup(self.response.text, 'html.parser')
+            SCRAPE_STAGE_SECONDS.labels('parse').observe(time.perf_counter() - started)
+    
     def fetch(self) -> bool:
         """Fetch the webpage and measure load time, trying multiple URL variants"""
+        self.session = timed_session()
+        try:
+            return self._fetch_variants()
+        finally:
+            self.session.close()
+
+    def _fetch_variants(self) -> bool:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -81,17 +180,11 @@ class WebsiteScraper:
             try:
                 logger.info(f"Trying to fetch: {url_variant}")
                 start_time = time.time()
-                self.response = requests.get(
-                    url_variant, 
-                    headers=headers, 
-                    timeout=self.timeout, 
-                    allow_redirects=True,
-                    verify=True
-                )
+                self.response = self._get(url_variant, headers, verify=True)
                 self.load_time = time.time() - start_time
                 
                 if self.response.status_code == 200:
-                    self.soup = BeautifulSoup(self.response.text, 'html.parser')
+                    self._parse()
                     self.url = url_variant  # Update to successful URL
                     logger.info(f"Successfully fetched {url_variant}")
                     return True
@@ -105,9 +198,9 @@ class WebsiteScraper:
                 logger.warning(f"SSL error for {url_variant}: {e}")
                 # Try without SSL verification as last resort
                 try:
-                    self.response = requests.get(url_variant, headers=headers, timeout=self.timeout, allow_redirects=True, verify=False)
+                    self.response = self._get(url_variant, headers, verify=False)
                     if self.response.status_code == 200:
-                        self.soup = BeautifulSoup(self.response.text, 'html.parser')
+                        self._parse()
                         self.url = url_variant
                         return True
                 except:
@@ -135,6 +228,8 @@ class WebsiteScraper:
         logger.error(f"All URL variants failed for {self.original_url}. Last error: {self.error_message}")
         return False
     
+    @traced("scrape.extract.seo")
+    @stage("extract")
     def get_seo_data(self) -> Dict[str, Any]:
         """Extract SEO-related data"""
         if not self.soup:
@@ -220,6 +315,8 @@ class WebsiteScraper:
         
         return data
     
+    @traced("scrape.extract.speed")
+    @stage("extract")
     def get_speed_data(self) -> Dict[str, Any]:
         """Extract speed-related data"""
         data = {
@@ -256,6 +353,8 @@ class WebsiteScraper:
         
         return data
     
+    @traced("scrape.extract.content")
+    @stage("extract")
     def get_content_data(self) -> Dict[str, Any]:
         """Extract content-related data"""
         if not self.soup:
@@ -308,6 +407,8 @@ class WebsiteScraper:
         
         return data
     
+    @traced("scrape.extract.ux")
+    @stage("extract")
     def get_ux_data(self) -> Dict[str, Any]:
         """Extract UX-related data"""
         if not self.soup:
@@ -398,6 +499,7 @@ class WebsiteScraper:
     def scrape_all(self) -> Tuple[bool, Dict[str, Any]]:
         """Scrape all data from the website"""
         if not self.fetch():
+            SCRAPES.labels('failure').inc()
             return False, {
                 'url': self.url,
                 'error': self.error_message or 'Failed to fetch website',
@@ -407,7 +509,8 @@ class WebsiteScraper:
                 'ux': {}
             }
         
-        return True, {
+        started = time.perf_counter()
+        data = {
             'url': self.url,
             'title': self.soup.title.get_text(strip=True) if self.soup.title else '',
             'seo': self.get_seo_data(),
@@ -415,12 +518,20 @@ class WebsiteScraper:
             'content': self.get_content_data(),
             'ux': self.get_ux_data()
         }
+        SCRAPE_STAGE_SECONDS.labels('extract').observe(time.perf_counter() - started)
+        SCRAPES.labels('success').inc()
+        return True, data
 
 
 def scrape_website(url: str) -> Tuple[bool, Dict[str, Any]]:
     """Convenience function to scrape a website"""
-    scraper = WebsiteScraper(url)
-    success, data = scraper.scrape_all()
-    if not success and scraper.error_message:
-        data['error'] = scraper.error_message
+    with span("scrape", **{"url.full": url}) as current, profiled_thread():
+        scraper = WebsiteScraper(url)
+        success, data = scraper.scrape_all()
+        current.set_attribute("scrape.success", success)
+        if success:
+            note_page(scraper.url, len(scraper.response.content))
+        if not success and scraper.error_message:
+            data['error'] = scraper.error_message
+            current.set_attribute("scrape.error", scraper.error_message)
     return success, data
@@ -2,6 +2,7 @@ import os
 import logging
 from typing import Dict, List, Any, Optional
 from scraper import WebsiteScraper
+from timing import stage
 
 logger = logging.getLogger(__name__)
 
@@ -16,22 +17,23 @@ async def analyze_seo(url: str) -> Dict[str, Any]:
     
     seo_data = scraper.get_seo_data()
     
-    # Calculate score
-    score = calculate_seo_score(seo_data)
-    
-    # Detect issues and generate fixes
-    issues = detect_seo_issues(seo_data, url)
-    
-    # Generate meta analysis with suggestions
-    meta_analysis = generate_meta_analysis(seo_data, url)
-    
-    # Generate schema suggestions
-    schema_suggestions = generate_schema_markup(seo_data, url)
-    
-    # Link analysis
-    link_analysis = analyze_links(seo_data)
-    
-    passed_count = len([i for i in get_all_checks(seo_data) if i['passed']])
+    with stage("score"):
+        # Calculate score
+        score = calculate_seo_score(seo_data)
+        
+        # Detect issues and generate fixes
+        issues = detect_seo_issues(seo_data, url)
+        
+        # Generate meta analysis with suggestions
+        meta_analysis = generate_meta_analysis(seo_data, url)
+        
+        # Generate schema suggestions
+        schema_suggestions = generate_schema_markup(seo_data, url)
+        
+        # Link analysis
+        link_analysis = analyze_links(seo_data)
+        
+        passed_count = len([i for i in get_all_checks(seo_data) if i['passed']])
     
     return {
         "url": scraper.url,
@@ -1,8 +1,11 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, BackgroundTasks, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, BackgroundTasks, UploadFile, File, Request, Response, status
 from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import asyncio
 import os
 import logging
 import json
@@ -18,15 +21,53 @@ from models import (
     AnalysisCreate, AnalysisResult, AnalysisResponse, AnalysisSummary,
     WebsiteScore, CompetitorData
 )
-from auth import hash_password, verify_password, create_access_token, get_current_user, get_optional_user
+from auth import hash_password, verify_password, create_access_token, get_current_user, get_optional_user, get_admin_user
 from scraper import scrape_website
 from analyzer import analyze_scraped_data, compare_all
 from llm_engine import generate_ai_suggestions
-from competitor_detector import detect_competitors, get_industry_insights
+from competitor_detector import get_industry_insights
+from competitor_sets import get_competitor_set
 from optimization_engine import generate_optimization_blueprint
 from seo_analyzer import analyze_seo
 from speed_analyzer import analyze_speed
 from content_analyzer import analyze_content
+from db_indexes import ensure_indexes
+from migrations import run_startup_migrations
+from artifact_store import pack, unpack
+from pagination import KEYSET_SORT, InvalidCursor, keyset_filter, next_cursor
+from analysis_details import (
+    DETAIL_FIELDS, build_details_doc, save_analysis_details, load_analysis_details, merge_details
+)
+from llm_client import llm_configured, chat_completion, stream_chat_completion, close_llm_client
+from llm_resilience import CircuitOpen
+from llm_cache import cache_stats, close_llm_cache
+from llm_accounting import (
+    LLM_ACCOUNTING_ENABLED, llm_context, llm_usage_loop, flush_llm_usage, load_tokenizer,
+    get_user_usage, get_analysis_usage
+)
+from user_stats import (
+    init_user_stats, record_analyses_created, record_analysis_completed,
+    record_analysis_deleted, get_user_stats
+)
+from retention import (
+    ARCHIVE_AFTER_DAYS, pending_expiry, failed_expiry,
+    find_one_archived, find_archived, union_archive, archive_loop
+)
+from metrics import (
+    METRICS_ENABLED, MetricsMiddleware, MongoCommandTimer, render_metrics,
+    analyses_queued, analysis_running, record_fallback
+)
+from timing import (
+    SERVER_TIMING_ENABLED, MongoStageTimer, ServerTimingMiddleware, collect_timings, current_timings
+)
+from profiling import (
+    PROFILING_ENABLED, PROFILE_JOB_THRESHOLD_MS, ProfilingMiddleware, profile_session, profile_flush_loop,
+    flush_profiles, recent_profiles, get_profile, collapsed_text
+)
+from tracing import (
+    MongoCommandTracer, TracingMiddleware, configure_tracing, install_log_correlation,
+    job_span, shutdown_tracing
+)
 
 
 # ==================== Competitor Detection ====================
@@ -34,6 +75,7 @@ from content_analyzer import analyze_content
 class CompetitorDetectRequest(BaseModel):
     user_site_url: str
     industry_hint: Optional[str] = ""
+    force_refresh: Optional[bool] = False
 
 
 class CompetitorDetectResponse(BaseModel):
@@ -52,7 +94,13 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+tracing_enabled = configure_tracing()
+mongo_listeners = [MongoStageTimer()]
+if METRICS_ENABLED:
+    mongo_listeners.append(MongoCommandTimer())
+if tracing_enabled:
+    mongo_listeners.append(MongoCommandTracer())
+client = AsyncIOMotorClient(mongo_url, event_listeners=mongo_listeners)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app
@@ -66,6 +114,8 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+if tracing_enabled:
+    install_log_correlation('%(asctime)s - %(name)s - %(levelname)s - [trace %(trace_id)s] - %(message)s')
 logger = logging.getLogger(__name__)
 
 
@@ -74,14 +124,6 @@ logger = logging.getLogger(__name__)
 @api_router.post("/auth/register", response_model=TokenResponse)
 async def register(user_data: UserCreate):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = await db.users.find_one({"email": user_data.email}, {"_id": 0})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
     # Create new user
     user = User(
         email=user_data.email,
@@ -93,7 +135,16 @@ async def register(user_data: UserCreate):
     user_doc['password_hash'] = hash_password(user_data.password)
     user_doc['created_at'] = user_doc['created_at'].isoformat()
     
-    await db.users.insert_one(user_doc)
+    # The unique email index rejects duplicates atomically
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    
+    await init_user_stats(db, user.id)
     
     # Generate token
     token = create_access_token(user.id, user.email)
@@ -158,95 +209,138 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 # ==================== Analysis Routes ====================
 
-async def run_analysis(analysis_id: str, user_site_url: str, competitor_urls: List[str]):
+async def fetch_site(url: str, scraper=None):
+    """
+    Scrape a site in a worker thread, through a shared scraper when one is
+    provided. Pages are saved as snapshots for scheduled re-audits to reuse
+    (shared scrapers used by batches and re-audits save their own).
+    """
+    if scraper is not None:
+        return await scraper.scrape(url)
+    success, data = await asyncio.to_thread(scrape_website, url)
+    if success:
+        await save_snapshot(db, url, data)
+    return success, data
+
+
+async def run_analysis(analysis_id: str, user_site_url: str, competitor_urls: List[str], scraper=None):
     """Background task to run website analysis"""
-    try:
-        logger.info(f"Starting analysis {analysis_id}")
+    with (
+        analysis_running(),
+        job_span("analysis", **{"analysis.id": analysis_id, "url.full": user_site_url}),
+        collect_timings() as timings,
+        profile_session("analysis", "run_analysis", PROFILE_JOB_THRESHOLD_MS, analysis_id=analysis_id, url=user_site_url)
+    ):
+        try:
+            logger.info(f"Starting analysis {analysis_id}")
         
-        # Update status to processing
-        await db.analyses.update_one(
-            {"id": analysis_id},
-            {"$set": {"status": "processing"}}
-        )
+            # Update status to processing
+            analysis_owner = await db.analyses.find_one_and_update(
+                {"id": analysis_id},
+                {"$set": {"status": "processing"}},
+                projection={"_id": 0, "user_id": 1}
+            )
         
-        # Scrape user's website
-        success, user_data = scrape_website(user_site_url)
-        if not success:
-            raise Exception(f"Failed to scrape user website: {user_site_url}")
+            # Scrape user's website
+            success, user_data = await fetch_site(user_site_url, scraper)
+            if not success:
+                raise Exception(f"Failed to scrape user website: {user_site_url}")
         
-        user_scores = analyze_scraped_data(user_data)
+            user_scores = analyze_scraped_data(user_data)
         
-        # Scrape competitor websites
-        competitors = []
-        competitor_score_objects = []
+            # Scrape competitor websites
+            competitors = []
+            competitor_score_objects = []
         
-        for comp_url in competitor_urls:
-            try:
-                success, comp_data = scrape_website(comp_url)
-                if success:
-                    comp_scores = analyze_scraped_data(comp_data)
-                    competitor_score_objects.append(comp_scores)
-                    competitors.append(CompetitorData(
-                        url=comp_url,
-                        scores=comp_scores,
-                        title=comp_data.get('title', ''),
-                        meta_description=comp_data.get('seo', {}).get('meta_description', '')
-                    ))
-                else:
-                    # Add with zero scores if scraping fails
+            for comp_url in competitor_urls:
+                try:
+                    success, comp_data = await fetch_site(comp_url, scraper)
+                    if success:
+                        comp_scores = analyze_scraped_data(comp_data)
+                        competitor_score_objects.append(comp_scores)
+                        competitors.append(CompetitorData(
+                            url=comp_url,
+                            scores=comp_scores,
+                            title=comp_data.get('title', ''),
+                            meta_description=comp_data.get('seo', {}).get('meta_description', '')
+                        ))
+                    else:
+                        # Add with zero scores if scraping fails
+                        competitors.append(CompetitorData(
+                            url=comp_url,
+                            scores=WebsiteScore(),
+                            title="Unable to scrape"
+                        ))
+                except Exception as e:
+                    logger.error(f"Error scraping competitor {comp_url}: {str(e)}")
                     competitors.append(CompetitorData(
                         url=comp_url,
                         scores=WebsiteScore(),
-                        title="Unable to scrape"
+                        title="Error during scraping"
                     ))
-            except Exception as e:
-                logger.error(f"Error scraping competitor {comp_url}: {str(e)}")
-                competitors.append(CompetitorData(
-                    url=comp_url,
-                    scores=WebsiteScore(),
-                    title="Error during scraping"
-                ))
         
-        # Compare websites
-        comparison = compare_all(user_scores, competitor_score_objects)
+            # Compare websites
+            comparison = compare_all(user_scores, competitor_score_objects)
         
-        # Generate AI suggestions
-        user_scores_dict = user_scores.model_dump()
-        competitors_dict = [{"url": c.url, "scores": c.scores.model_dump()} for c in competitors]
+            # Generate AI suggestions
+            user_scores_dict = user_scores.model_dump()
+            competitors_dict = [{"url": c.url, "scores": c.scores.model_dump()} for c in competitors]
         
-        ai_suggestions, action_plan = await generate_ai_suggestions(
-            user_site_url,
-            user_scores_dict,
-            competitors_dict,
-            comparison
-        )
+            with llm_context(
+                analysis_id=analysis_id,
+                user_id=analysis_owner['user_id'] if analysis_owner else None,
+                flow="analysis"
+            ):
+                ai_suggestions, action_plan = await generate_ai_suggestions(
+                    user_site_url,
+                    user_scores_dict,
+                    competitors_dict,
+                    comparison
+                )
         
-        # Update analysis with results
-        completed_at = datetime.now(timezone.utc)
-        await db.analyses.update_one(
-            {"id": analysis_id},
-            {"$set": {
-                "status": "completed",
-                "user_site_scores": user_scores.model_dump(),
-                "competitors": [c.model_dump() for c in competitors],
-                "ai_suggestions": ai_suggestions,
-                "action_plan": action_plan,
-                "completed_at": completed_at.isoformat()
-            }}
-        )
+            # Detail dicts go to their own collection; the analysis keeps headline scores
+            user_headline, inline_competitors, details_doc = build_details_doc(
+                analysis_id,
+                analysis_owner['user_id'] if analysis_owner else None,
+                user_scores_dict,
+                [c.model_dump() for c in competitors]
+            )
+            await save_analysis_details(db, details_doc)
         
-        logger.info(f"Analysis {analysis_id} completed successfully")
+            # Update analysis with results; the status guard makes completion count once
+            completed_at = datetime.now(timezone.utc)
+            completed = await db.analyses.find_one_and_update(
+                {"id": analysis_id, "status": {"$ne": "completed"}},
+                {"$set": {
+                    "status": "completed",
+                    "user_site_scores": user_headline,
+                    "competitors": inline_competitors,
+                    "overall_score": user_scores.overall_score,
+                    "competitor_count": len(competitors),
+                    "ai_suggestions": pack(ai_suggestions),
+                    "action_plan": action_plan,
+                    "completed_at": completed_at.isoformat(),
+                    "timings": timings.as_dict()
+                }, "$unset": {"expires_at": ""}},
+                projection={"_id": 0, "user_id": 1}
+            )
+            if completed:
+                await record_analysis_completed(db, completed['user_id'], user_scores.overall_score)
         
-    except Exception as e:
-        logger.error(f"Analysis {analysis_id} failed: {str(e)}")
-        await db.analyses.update_one(
-            {"id": analysis_id},
-            {"$set": {
-                "status": "failed",
-                "ai_suggestions": f"Analysis failed: {str(e)}",
-                "completed_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+            logger.info(f"Analysis {analysis_id} completed successfully")
+        
+        except Exception as e:
+            logger.error(f"Analysis {analysis_id} failed: {str(e)}")
+            await db.analyses.update_one(
+                {"id": analysis_id},
+                {"$set": {
+                    "status": "failed",
+                    "ai_suggestions": f"Analysis failed: {str(e)}",
+                    "completed_at": datetime.now(timezone.utc).isoformat(),
+                    "expires_at": failed_expiry(),
+                    "timings": timings.as_dict()
+                }}
+            )
 
 
 @api_router.post("/analyses", response_model=AnalysisResponse)
@@ -277,10 +371,13 @@ async def create_analysis(
     analysis_doc['created_at'] = analysis_doc['created_at'].isoformat()
     if analysis_doc.get('completed_at'):
         analysis_doc['completed_at'] = analysis_doc['completed_at'].isoformat()
+    analysis_doc['expires_at'] = pending_expiry()
     
     await db.analyses.insert_one(analysis_doc)
+    await record_analyses_created(db, analysis.user_id)
     
     # Start background analysis
+    analyses_queued()
     background_tasks.add_task(
         run_analysis,
         analysis.id,
@@ -304,32 +401,57 @@ async def create_analysis(
 
 @api_router.get("/analyses", response_model=List[AnalysisSummary])
 async def get_analyses(
+    response: Response,
     current_user: dict = Depends(get_current_user),
     limit: int = 20,
-    skip: int = 0
+    skip: int = 0,
+    cursor: Optional[str] = None
 ):
-    """Get list of user's analyses"""
-    cursor = db.analyses.find(
-        {"user_id": current_user['user_id']},
-        {
-            "_id": 0,
-            "id": 1,
-            "user_site_url": 1,
-            "user_site_scores.overall_score": 1,
-            "competitors": 1,
-            "status": 1,
-            "created_at": 1
-        }
-    ).sort("created_at", -1).skip(skip).limit(limit)
+    """
+    Get list of user's analyses, newest first.
+    Pass the X-Next-Cursor header value back as ?cursor= for the next page;
+    skip is still accepted for older clients.
+    """
+    limit = max(1, min(limit, 100))
+    try:
+        query = keyset_filter({"user_id": current_user['user_id']}, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    analyses = await cursor.to_list(length=limit)
+    # Only the denormalized summary fields, never the competitor payloads
+    projection = {
+        "_id": 0,
+        "id": 1,
+        "user_site_url": 1,
+        "overall_score": 1,
+        "competitor_count": 1,
+        "status": 1,
+        "created_at": 1
+    }
+    db_cursor = db.analyses.find(query, projection).sort(KEYSET_SORT)
+    if skip and not cursor:
+        db_cursor = db_cursor.skip(skip)
+    
+    analyses = await db_cursor.limit(limit).to_list(length=limit)
+    
+    # Archived analyses are older than anything still hot, so they continue the page
+    if len(analyses) < limit and not skip:
+        if analyses:
+            query = keyset_filter({"user_id": current_user['user_id']}, next_cursor(analyses, len(analyses)))
+        seen = {a['id'] for a in analyses}
+        archived = await find_archived(db, "analyses", query, projection, KEYSET_SORT, limit - len(analyses))
+        analyses += [a for a in archived if a['id'] not in seen]
+    
+    following = next_cursor(analyses, limit)
+    if following:
+        response.headers["X-Next-Cursor"] = following
     
     return [
         AnalysisSummary(
             id=a['id'],
             user_site_url=a['user_site_url'],
-            overall_score=a.get('user_site_scores', {}).get('overall_score', 0),
-            competitor_count=len(a.get('competitors', [])),
+            overall_score=a.get('overall_score', 0),
+            competitor_count=a.get('competitor_count', 0),
             status=a['status'],
             created_at=a['created_at']
         )
@@ -340,44 +462,96 @@ async def get_analyses(
 @api_router.get("/analyses/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis(
     analysis_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    include: Optional[str] = None
 ):
-    """Get a specific analysis by ID"""
-    analysis = await db.analyses.find_one(
+    """
+    Get a specific analysis by ID.
+    Only headline scores are returned unless ?include=details is passed.
+    """
+    with_details = include == "details"
+    
+    projection = {"_id": 0}
+    if not with_details:
+        # Older analyses still embed details inline; leave them out of the read
+        for field in DETAIL_FIELDS:
+            projection[f"user_site_scores.{field}"] = 0
+            projection[f"competitors.scores.{field}"] = 0
+    
+    analysis = await find_one_archived(
+        db, "analyses",
         {"id": analysis_id, "user_id": current_user['user_id']},
-        {"_id": 0}
+        projection
     )
     
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
     
+    if with_details:
+        analysis = merge_details(analysis, await load_analysis_details(db, analysis_id, current_user['user_id']))
+    
     return AnalysisResponse(
         id=analysis['id'],
         user_id=analysis['user_id'],
         user_site_url=analysis['user_site_url'],
         user_site_scores=WebsiteScore(**analysis.get('user_site_scores', {})),
         competitors=[CompetitorData(**c) for c in analysis.get('competitors', [])],
-        ai_suggestions=analysis.get('ai_suggestions', ''),
+        ai_suggestions=unpack(analysis.get('ai_suggestions', '')),
         action_plan=analysis.get('action_plan', []),
         status=analysis['status'],
         created_at=analysis['created_at'],
-        completed_at=analysis.get('completed_at')
+        completed_at=analysis.get('completed_at'),
+        timings=analysis.get('timings')
     )
 
 
+@api_router.get("/analyses/{analysis_id}/details")
+async def get_analysis_details(
+    analysis_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the per-category detail metrics for an analysis"""
+    details = await load_analysis_details(db, analysis_id, current_user['user_id'])
+    if details:
+        return details
+    
+    # Older analyses keep their details inline
+    analysis = await find_one_archived(
+        db, "analyses",
+        {"id": analysis_id, "user_id": current_user['user_id']},
+        {"_id": 0, "user_site_scores": 1, "competitors": 1}
+    )
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    _, _, details = build_details_doc(
+        analysis_id,
+        current_user['user_id'],
+        analysis.get('user_site_scores', {}),
+        analysis.get('competitors', [])
+    )
+    return details
+
+
 @api_router.delete("/analyses/{analysis_id}")
 async def delete_analysis(
     analysis_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Delete an analysis"""
-    result = await db.analyses.delete_one(
-        {"id": analysis_id, "user_id": current_user['user_id']}
-    )
+    query = {"id": analysis_id, "user_id": current_user['user_id']}
+    result = await db.analyses.delete_one(query)
+    if result.deleted_count == 0:
+        result = await db.analyses_archive.delete_one(query)
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Analysis not found")
     
+    await db.analysis_details.delete_one({"analysis_id": analysis_id})
+    await db.analysis_details_archive.delete_one({"analysis_id": analysis_id})
+    
+    await record_analysis_deleted(db, current_user['user_id'])
+    
     return {"message": "Analysis deleted successfully"}
 
 
@@ -387,7 +561,8 @@ async def download_report(
     current_user: dict = Depends(get_current_user)
 ):
     """Download analysis report as text file"""
-    analysis = await db.analyses.find_one(
+    analysis = await find_one_archived(
+        db, "analyses",
         {"id": analysis_id, "user_id": current_user['user_id']},
         {"_id": 0}
     )
@@ -438,7 +613,7 @@ Competitor {i}: {comp.get('url', 'Unknown')}
                            AI RECOMMENDATIONS
 --------------------------------------------------------------------------------
 
-{analysis.get('ai_suggestions', 'No suggestions available')}
+{unpack(analysis.get('ai_suggestions', 'No suggestions available'))}
 
 --------------------------------------------------------------------------------
                               ACTION PLAN
@@ -468,6 +643,259 @@ Competitor {i}: {comp.get('url', 'Unknown')}
     )
 
 
+# ==================== Batch Analysis Routes ====================
+
+from batch_analysis import (
+    BatchAnalysisCreate, BatchAnalysisResponse, AnalysisBatch,
+    parse_batch_csv, validate_batch, count_unique_competitors, run_batch
+)
+
+
+async def run_analysis_batch(batch_id: str, jobs: List[tuple]):
+    """Background task to run every analysis in a batch"""
+    with job_span("analysis.batch", **{"batch.id": batch_id, "batch.size": len(jobs)}):
+        await run_batch(jobs, run_analysis, scraper=SnapshotScraper(db, reuse=False))
+    await db.analysis_batches.update_one(
+        {"id": batch_id},
+        {"$set": {
+            "status": "completed",
+            "completed_at": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+
+
+async def start_analysis_batch(
+    sites: List[AnalysisCreate],
+    background_tasks: BackgroundTasks,
+    user_id: str
+) -> BatchAnalysisResponse:
+    """Create analysis records for every site in a batch and schedule the run"""
+    error = validate_batch(sites)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    batch = AnalysisBatch(
+        user_id=user_id,
+        total=len(sites),
+        unique_competitors=count_unique_competitors(sites)
+    )
+
+    jobs = []
+    analysis_docs = []
+    for site in sites:
+        analysis = AnalysisResult(
+            user_id=user_id,
+            user_site_url=site.user_site_url,
+            user_site_scores=WebsiteScore(),
+            competitors=[],
+            status="pending",
+            batch_id=batch.id
+        )
+        analysis_doc = analysis.model_dump()
+        analysis_doc['created_at'] = analysis_doc['created_at'].isoformat()
+        analysis_doc['expires_at'] = pending_expiry()
+        analysis_docs.append(analysis_doc)
+        jobs.append((analysis.id, site.user_site_url, site.competitor_urls))
+
+    batch.analysis_ids = [job[0] for job in jobs]
+    batch_doc = batch.model_dump()
+    batch_doc['created_at'] = batch_doc['created_at'].isoformat()
+
+    await db.analyses.insert_many(analysis_docs)
+    await db.analysis_batches.insert_one(batch_doc)
+    await record_analyses_created(db, user_id, len(analysis_docs))
+
+    analyses_queued(len(jobs))
+    background_tasks.add_task(run_analysis_batch, batch.id, jobs)
+
+    return BatchAnalysisResponse(
+        id=batch.id,
+        status=batch.status,
+        total=batch.total,
+        pending=batch.total,
+        unique_competitors=batch.unique_competitors,
+        analysis_ids=batch.analysis_ids,
+        created_at=batch_doc['created_at']
+    )
+
+
+@api_router.post("/analyses/batch", response_model=BatchAnalysisResponse)
+async def create_analysis_batch(
+    batch_data: BatchAnalysisCreate,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Create analyses for many sites at once"""
+    return await start_analysis_batch(batch_data.sites, background_tasks, current_user['user_id'])
+
+
+@api_router.post("/analyses/batch/csv", response_model=BatchAnalysisResponse)
+async def create_analysis_batch_csv(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Create a batch from a CSV upload (user site, then competitor URLs per row)"""
+    try:
+        content = (await file.read()).decode('utf-8-sig')
+        sites = parse_batch_csv(content)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {str(e)}")
+
+    return await start_analysis_batch(sites, background_tasks, current_user['user_id'])
+
+
+@api_router.get("/analyses/batch/{batch_id}", response_model=BatchAnalysisResponse)
+async def get_analysis_batch(
+    batch_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get aggregate progress for a batch"""
+    batch = await db.analysis_batches.find_one(
+        {"id": batch_id, "user_id": current_user['user_id']},
+        {"_id": 0}
+    )
+
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    counts = {"pending": 0, "processing": 0, "completed": 0, "failed": 0}
+    match = {"batch_id": batch_id, "user_id": current_user['user_id']}
+    async for row in db.analyses.aggregate([
+        {"$match": match},
+        union_archive("analyses", match),
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]):
+        if row['_id'] in counts:
+            counts[row['_id']] = row['count']
+
+    return BatchAnalysisResponse(
+        id=batch['id'],
+        status=batch['status'],
+        total=batch['total'],
+        unique_competitors=batch.get('unique_competitors', 0),
+        analysis_ids=batch.get('analysis_ids', []),
+        created_at=batch['created_at'],
+        completed_at=batch.get('completed_at'),
+        **counts
+    )
+
+
+# ==================== Monitoring Schedules ====================
+
+from monitoring import (
+    MonitoringScheduleCreate, MonitoringSchedule, MonitoringScheduleResponse,
+    SnapshotScraper, is_valid_cron, next_run_iso, monitoring_loop, save_snapshot, MONITORING_ENABLED
+)
+
+
+async def run_scheduled_reaudit(schedule: dict):
+    """Re-run a monitored analysis, reusing fresh competitor snapshots"""
+    analysis = AnalysisResult(
+        user_id=schedule['user_id'],
+        user_site_url=schedule['user_site_url'],
+        user_site_scores=WebsiteScore(),
+        competitors=[],
+        status="pending"
+    )
+    analysis_doc = analysis.model_dump()
+    analysis_doc['created_at'] = analysis_doc['created_at'].isoformat()
+    analysis_doc['schedule_id'] = schedule['id']
+    analysis_doc['expires_at'] = pending_expiry()
+    await db.analyses.insert_one(analysis_doc)
+    await record_analyses_created(db, analysis.user_id)
+
+    await db.monitoring_schedules.update_one(
+        {"id": schedule['id']},
+        {"$set": {"last_analysis_id": analysis.id}}
+    )
+
+    logger.info(f"Scheduled re-audit {analysis.id} for {schedule['user_site_url']}")
+    scraper = SnapshotScraper(db, live_urls=[schedule['user_site_url']])
+    analyses_queued()
+    await run_analysis(analysis.id, schedule['user_site_url'], schedule.get('competitor_urls', []), scraper=scraper)
+
+
+@api_router.put("/analyses/{analysis_id}/schedule", response_model=MonitoringScheduleResponse)
+async def set_analysis_schedule(
+    analysis_id: str,
+    schedule_data: MonitoringScheduleCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Create or update the recurring re-audit schedule for an analysis"""
+    if not is_valid_cron(schedule_data.cron):
+        raise HTTPException(status_code=400, detail="Invalid cron expression")
+
+    analysis = await find_one_archived(
+        db, "analyses",
+        {"id": analysis_id, "user_id": current_user['user_id']},
+        {"_id": 0, "user_site_url": 1, "competitors.url": 1}
+    )
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    schedule = MonitoringSchedule(
+        user_id=current_user['user_id'],
+        analysis_id=analysis_id,
+        user_site_url=analysis['user_site_url'],
+        competitor_urls=[c['url'] for c in analysis.get('competitors', [])],
+        cron=schedule_data.cron,
+        next_run_at=next_run_iso(schedule_data.cron)
+    )
+    schedule_doc = schedule.model_dump()
+    schedule_id = schedule_doc.pop('id')
+    created_at = schedule_doc.pop('created_at')
+
+    saved = await db.monitoring_schedules.find_one_and_update(
+        {"analysis_id": analysis_id, "user_id": current_user['user_id']},
+        {"$set": schedule_doc, "$setOnInsert": {"id": schedule_id, "created_at": created_at}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return MonitoringScheduleResponse(**saved)
+
+
+@api_router.get("/analyses/{analysis_id}/schedule", response_model=MonitoringScheduleResponse)
+async def get_analysis_schedule(
+    analysis_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the recurring re-audit schedule for an analysis"""
+    schedule = await db.monitoring_schedules.find_one(
+        {"analysis_id": analysis_id, "user_id": current_user['user_id']},
+        {"_id": 0}
+    )
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return MonitoringScheduleResponse(**schedule)
+
+
+@api_router.delete("/analyses/{analysis_id}/schedule")
+async def delete_analysis_schedule(
+    analysis_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stop recurring re-audits for an analysis"""
+    result = await db.monitoring_schedules.delete_one(
+        {"analysis_id": analysis_id, "user_id": current_user['user_id']}
+    )
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return {"message": "Schedule deleted successfully"}
+
+
+@api_router.get("/schedules", response_model=List[MonitoringScheduleResponse])
+async def get_schedules(current_user: dict = Depends(get_current_user)):
+    """List the user's monitoring schedules"""
+    cursor = db.monitoring_schedules.find(
+        {"user_id": current_user['user_id']},
+        {"_id": 0}
+    ).sort("next_run_at", 1)
+    schedules = await cursor.to_list(length=100)
+    return [MonitoringScheduleResponse(**s) for s in schedules]
+
+
 # ==================== Dashboard Stats ====================
 
 class DashboardStats(BaseModel):
@@ -480,30 +908,17 @@ class DashboardStats(BaseModel):
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
     """Get dashboard statistics for user"""
-    # Get all user analyses
-    cursor = db.analyses.find(
-        {"user_id": current_user['user_id']},
-        {"_id": 0, "status": 1, "user_site_scores": 1}
-    )
-    analyses = await cursor.to_list(length=1000)
-    
-    total = len(analyses)
-    completed = sum(1 for a in analyses if a.get('status') == 'completed')
+    # Materialized counters maintained by create_analysis and run_analysis
+    stats = await get_user_stats(db, current_user['user_id'])
     
-    scores = [
-        a.get('user_site_scores', {}).get('overall_score', 0)
-        for a in analyses
-        if a.get('status') == 'completed'
-    ]
-    
-    avg_score = int(sum(scores) / len(scores)) if scores else 0
-    best_score = max(scores) if scores else 0
+    completed = stats.get('completed_analyses', 0)
+    avg_score = int(stats.get('score_sum', 0) / completed) if completed else 0
     
     return DashboardStats(
-        total_analyses=total,
+        total_analyses=stats.get('total_analyses', 0),
         completed_analyses=completed,
         avg_score=avg_score,
-        best_score=best_score
+        best_score=stats.get('best_score', 0)
     )
 
 
@@ -519,6 +934,15 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
 
 
+@api_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 # ==================== SEO Analysis ====================
 
 @api_router.post("/seo/analyze")
@@ -594,19 +1018,22 @@ async def detect_competitors_endpoint(
         raise HTTPException(status_code=400, detail="User site URL is required")
     
     try:
-        # Detect competitors using AI
-        competitors = await detect_competitors(
-            request.user_site_url,
-            request.industry_hint
-        )
-        
-        # Optionally get industry insights
-        industry_insights = None
-        if competitors:
-            industry_insights = await get_industry_insights(
+        with llm_context(user_id=current_user['user_id'], flow="competitors"):
+            # Stored per-domain set, detected with AI when missing or stale
+            competitors = await get_competitor_set(
+                db,
                 request.user_site_url,
-                competitors
+                request.industry_hint,
+                force_refresh=request.force_refresh
             )
+            
+            # Optionally get industry insights
+            industry_insights = None
+            if competitors:
+                industry_insights = await get_industry_insights(
+                    request.user_site_url,
+                    competitors
+                )
         
         return CompetitorDetectResponse(
             competitors=competitors,
@@ -623,6 +1050,7 @@ class OptimizeRequest(BaseModel):
     user_site_url: str
     competitor_urls: Optional[List[str]] = []
     auto_detect_competitors: Optional[bool] = True
+    force_refresh: Optional[bool] = False
 
 
 @api_router.post("/optimize")
@@ -638,7 +1066,7 @@ async def generate_optimization(
         logger.info(f"Starting optimization for {request.user_site_url}")
         
         # Step 1: Scrape user's website
-        success, user_data = scrape_website(request.user_site_url)
+        success, user_data = await fetch_site(request.user_site_url)
         if not success:
             error_msg = user_data.get('error', 'Failed to fetch website')
             raise HTTPException(status_code=400, detail=f"{error_msg}")
@@ -648,14 +1076,15 @@ async def generate_optimization(
         # Step 2: Get competitors (auto-detect or use provided)
         competitor_urls = request.competitor_urls or []
         if request.auto_detect_competitors and len(competitor_urls) < 3:
-            detected = await detect_competitors(request.user_site_url)
+            with llm_context(user_id=current_user['user_id'], flow="optimize"):
+                detected = await get_competitor_set(db, request.user_site_url, force_refresh=request.force_refresh)
             competitor_urls = list(set(competitor_urls + detected))[:5]
         
         # Step 3: Analyze competitors
         competitors = []
         for comp_url in competitor_urls:
             try:
-                success, comp_data = scrape_website(comp_url)
+                success, comp_data = await fetch_site(comp_url)
                 if success:
                     comp_scores = analyze_scraped_data(comp_data)
                     competitors.append({
@@ -679,8 +1108,9 @@ async def generate_optimization(
             "user_site_url": request.user_site_url,
             "user_scores": user_scores.model_dump(),
             "competitors": competitors,
-            "blueprint": blueprint,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "blueprint": pack(blueprint),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "timings": current_timings()
         }
         
         await db.optimizations.insert_one(optimization_doc)
@@ -706,15 +1136,89 @@ async def get_optimizations(
     limit: int = 10
 ):
     """Get user's optimization history"""
-    cursor = db.optimizations.find(
-        {"user_id": current_user['user_id']},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(limit)
+    query = {"user_id": current_user['user_id']}
+    cursor = db.optimizations.find(query, {"_id": 0}).sort("created_at", -1).limit(limit)
     
     optimizations = await cursor.to_list(length=limit)
+    if len(optimizations) < limit:
+        if optimizations:
+            query["created_at"] = {"$lt": optimizations[-1]['created_at']}
+        optimizations += await find_archived(
+            db, "optimizations", query, {"_id": 0}, [("created_at", -1)], limit - len(optimizations)
+        )
+    for optimization in optimizations:
+        optimization['blueprint'] = unpack(optimization.get('blueprint'))
     return optimizations
 
 
+# ==================== LLM Cache ====================
+
+@api_router.get("/llm/cache/stats")
+async def get_llm_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hit/miss counts of the LLM response cache per call site"""
+    return cache_stats()
+
+
+# ==================== LLM Usage ====================
+
+@api_router.get("/llm/usage")
+async def get_my_llm_usage(
+    current_user: dict = Depends(get_current_user),
+    days: int = 30
+):
+    """The current user's LLM calls and tokens over the last days, per day"""
+    return await get_user_usage(db, current_user['user_id'], max(1, min(days, 365)))
+
+
+@api_router.get("/analyses/{analysis_id}/llm-usage")
+async def get_analysis_llm_usage(
+    analysis_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """LLM calls and tokens spent on one analysis, per call site"""
+    analysis = await find_one_archived(
+        db, "analyses",
+        {"id": analysis_id, "user_id": current_user['user_id']},
+        {"_id": 0, "id": 1}
+    )
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return await get_analysis_usage(db, analysis_id)
+
+
+# ==================== Admin: Slow Path Profiles ====================
+
+@api_router.get("/admin/profiles")
+async def list_slow_profiles(
+    admin: dict = Depends(get_admin_user),
+    limit: int = 20,
+    kind: Optional[str] = None
+):
+    """
+    Recent profiles of slow requests and analyses (kind=request|analysis), newest first.
+    Event-loop stacks include other coroutines running at the same time, not just the profiled one.
+    """
+    return await recent_profiles(db, max(1, min(limit, 100)), kind)
+
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_slow_profile(
+    profile_id: str,
+    admin: dict = Depends(get_admin_user),
+    format: Optional[str] = None
+):
+    """
+    One profile with its stacks; ?format=collapsed returns flame graph input as text.
+    Event-loop stacks include other coroutines running at the same time, not just the profiled one.
+    """
+    profile = await get_profile(db, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return Response(content=collapsed_text(profile), media_type="text/plain")
+    return profile
+
+
 # ==================== Chatbot API ====================
 
 class ChatMessage(BaseModel):
@@ -728,27 +1232,7 @@ class ChatResponse(BaseModel):
     response: str
     reasoning: Optional[str] = None
 
-@api_router.post("/chatbot", response_model=ChatResponse)
-async def chatbot_endpoint(request: ChatRequest):
-    """AI-powered chatbot using NVIDIA DeepSeek API"""
-    from openai import OpenAI
-    
-    nvidia_api_key = os.environ.get('NVIDIA_API_KEY')
-    nvidia_base_url = os.environ.get('NVIDIA_BASE_URL', 'https://integrate.api.nvidia.com/v1')
-    
-    if not nvidia_api_key:
-        raise HTTPException(status_code=500, detail="NVIDIA API key not configured")
-    
-    try:
-        client_ai = OpenAI(
-            base_url=nvidia_base_url,
-            api_key=nvidia_api_key
-        )
-        
-        # Build system message for SITERANK AI context
-        system_message = {
-            "role": "system",
-            "content": """You are the SITERANK AI Assistant, a helpful chatbot for a website competitor analysis platform. 
+CHATBOT_SYSTEM_MESSAGE = """You are the SITERANK AI Assistant, a helpful chatbot for a website competitor analysis platform. 
 
 Your knowledge includes:
 - **Optimize My Site**: Full AI analysis with optimization blueprint, auto-detects competitors, generates 30-day strategy
@@ -765,17 +1249,30 @@ How to get started:
 5. Copy fixes and implement them!
 
 Be helpful, concise, and guide users to the right features. SITERANK AI is currently free to use."""
-        }
-        
-        # Convert messages to API format
-        api_messages = [system_message]
-        for msg in request.messages:
-            api_messages.append({"role": msg.role, "content": msg.content})
-        
+
+# Returned straight away while the LLM provider's circuit breaker is open
+CHATBOT_UNAVAILABLE_MESSAGE = "The AI assistant is temporarily unavailable. Please try again in a minute."
+
+
+def build_chat_messages(request: ChatRequest) -> List[Dict[str, str]]:
+    """System prompt for SITERANK AI context, then the conversation so far"""
+    api_messages = [{"role": "system", "content": CHATBOT_SYSTEM_MESSAGE}]
+    for msg in request.messages:
+        api_messages.append({"role": msg.role, "content": msg.content})
+    return api_messages
+
+
+@api_router.post("/chatbot", response_model=ChatResponse)
+async def chatbot_endpoint(request: ChatRequest):
+    """AI-powered chatbot using NVIDIA DeepSeek API"""
+    if not llm_configured():
+        raise HTTPException(status_code=500, detail="NVIDIA API key not configured")
+    
+    try:
         # Call NVIDIA DeepSeek API
-        completion = client_ai.chat.completions.create(
-            model="deepseek-ai/deepseek-v3.2",
-            messages=api_messages,
+        completion = await chat_completion(
+            messages=build_chat_messages(request),
+            call_site="chatbot",
             temperature=0.7,
             top_p=0.95,
             max_tokens=1024,
@@ -786,21 +1283,202 @@ Be helpful, concise, and guide users to the right features. SITERANK AI is curre
         
         return ChatResponse(response=response_text)
         
+    except CircuitOpen:
+        record_fallback("chatbot_unavailable")
+        raise HTTPException(status_code=503, detail=CHATBOT_UNAVAILABLE_MESSAGE)
     except Exception as e:
         logger.error(f"Chatbot API error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chatbot error: {str(e)}")
 
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@api_router.post("/chatbot/stream")
+async def chatbot_stream_endpoint(chat_request: ChatRequest, http_request: Request):
+    """
+    Streaming chatbot: tokens are sent as Server-Sent Events
+    (token events with {"content"}, then done, or error on failure).
+    The upstream completion is closed when the client disconnects.
+    """
+    if not llm_configured():
+        raise HTTPException(status_code=500, detail="NVIDIA API key not configured")
+    
+    async def events():
+        tokens = stream_chat_completion(
+            build_chat_messages(chat_request),
+            call_site="chatbot",
+            temperature=0.7,
+            top_p=0.95,
+            max_tokens=1024
+        )
+        try:
+            async for token in tokens:
+                if await http_request.is_disconnected():
+                    logger.info("Chatbot client disconnected, closing upstream stream")
+                    break
+                yield sse_event("token", {"content": token})
+            else:
+                yield sse_event("done", {})
+        except CircuitOpen:
+            record_fallback("chatbot_unavailable")
+            yield sse_event("error", {"detail": CHATBOT_UNAVAILABLE_MESSAGE})
+        except Exception as e:
+            logger.error(f"Chatbot stream error: {str(e)}")
+            yield sse_event("error", {"detail": f"Chatbot error: {str(e)}"})
+        finally:
+            await tokens.aclose()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ==================== Chat Sessions ====================
+
+from chat_sessions import (
+    ChatSessionMessage, ChatSessionResponse,
+    make_message, compact_history, build_prompt_messages,
+    create_session, load_session, save_session
+)
+
+
+@api_router.post("/chatbot/sessions", response_model=ChatSessionResponse)
+async def create_chat_session(current_user: Optional[dict] = Depends(get_optional_user)):
+    """Start a server-side chat session; later turns send only the new message"""
+    session = await create_session(db, current_user['user_id'] if current_user else None)
+    return ChatSessionResponse(session_id=session['id'])
+
+
+@api_router.get("/chatbot/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_chat_session(session_id: str, current_user: Optional[dict] = Depends(get_optional_user)):
+    """Current (compacted) history of a chat session"""
+    session = await load_session(db, session_id, current_user['user_id'] if current_user else None)
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return ChatSessionResponse(
+        session_id=session['id'],
+        messages=[{"role": m['role'], "content": m['content']} for m in session['messages']],
+        summary=session.get('summary')
+    )
+
+
+@api_router.post("/chatbot/sessions/{session_id}/messages")
+async def send_chat_session_message(
+    session_id: str,
+    message: ChatSessionMessage,
+    http_request: Request,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Send one message in a chat session. History is kept within the token budget.
+    Returns a ChatResponse, or Server-Sent Events like /chatbot/stream when stream is true.
+    """
+    if not llm_configured():
+        raise HTTPException(status_code=500, detail="NVIDIA API key not configured")
+    if not message.content.strip():
+        raise HTTPException(status_code=400, detail="Message is required")
+    
+    user_id = current_user['user_id'] if current_user else None
+    session = await load_session(db, session_id, user_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    
+    turn = [make_message("user", message.content)]
+    with llm_context(user_id=user_id, flow="chat"):
+        history, summary = await compact_history(session['messages'] + turn, session.get('summary'))
+    api_messages = build_prompt_messages(CHATBOT_SYSTEM_MESSAGE, summary, history)
+    
+    if not message.stream:
+        try:
+            with llm_context(user_id=user_id, flow="chat"):
+                completion = await chat_completion(
+                    messages=api_messages,
+                    call_site="chatbot",
+                    temperature=0.7,
+                    top_p=0.95,
+                    max_tokens=1024
+                )
+        except CircuitOpen:
+            record_fallback("chatbot_unavailable")
+            raise HTTPException(status_code=503, detail=CHATBOT_UNAVAILABLE_MESSAGE)
+        except Exception as e:
+            logger.error(f"Chatbot API error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Chatbot error: {str(e)}")
+        
+        response_text = completion.choices[0].message.content
+        turn.append(make_message("assistant", response_text))
+        await save_session(db, session, history + turn[1:], summary, turn)
+        return ChatResponse(response=response_text)
+    
+    async def events():
+        # Runs after the endpoint returns, so the usage tags are set here
+        with llm_context(user_id=user_id, flow="chat"):
+            tokens = stream_chat_completion(
+                api_messages,
+                call_site="chatbot",
+                temperature=0.7,
+                top_p=0.95,
+                max_tokens=1024
+            )
+            reply = []
+            try:
+                async for token in tokens:
+                    if await http_request.is_disconnected():
+                        logger.info("Chatbot client disconnected, closing upstream stream")
+                        break
+                    reply.append(token)
+                    yield sse_event("token", {"content": token})
+                else:
+                    yield sse_event("done", {})
+            except CircuitOpen:
+                record_fallback("chatbot_unavailable")
+                yield sse_event("error", {"detail": CHATBOT_UNAVAILABLE_MESSAGE})
+            except Exception as e:
+                logger.error(f"Chatbot stream error: {str(e)}")
+                yield sse_event("error", {"detail": f"Chatbot error: {str(e)}"})
+            finally:
+                await tokens.aclose()
+                # Keep the user's turn even if the reply was cut short
+                if reply:
+                    turn.append(make_message("assistant", "".join(reply)))
+                # Shielded: on disconnect the response task is already being cancelled
+                await asyncio.shield(save_session(db, session, history + turn[1:], summary, turn))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ==================== Auto-Fix APIs ====================
 
 from auto_fix_engine import (
     SEOFixRequest, SpeedFixRequest, ContentFixRequest, FixResponse,
-    generate_seo_fixes, generate_speed_fixes, generate_content_fixes
+    AllFixesGenerateRequest, AllFixesGenerateResponse,
+    generate_seo_fixes, generate_speed_fixes, generate_content_fixes, generate_all_fixes,
+    stream_fix_events
 )
 
+
+def fix_event_stream(category: str, request: BaseModel) -> StreamingResponse:
+    """NDJSON response with one line per fix as it is generated, then a done line"""
+    async def lines():
+        async for event in stream_fix_events(category, request):
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @api_router.post("/fix/seo", response_model=FixResponse)
-async def fix_seo_issues(request: SEOFixRequest):
-    """Generate AI-powered SEO fixes for detected issues"""
+async def fix_seo_issues(request: SEOFixRequest, stream: bool = False):
+    """Generate AI-powered SEO fixes for detected issues (?stream=true sends each fix as an NDJSON line once parsed)"""
+    if stream:
+        return fix_event_stream("seo", request)
     try:
         result = await generate_seo_fixes(request)
         return result
@@ -810,8 +1488,10 @@ async def fix_seo_issues(request: SEOFixRequest):
 
 
 @api_router.post("/fix/speed", response_model=FixResponse)
-async def fix_speed_issues(request: SpeedFixRequest):
-    """Generate AI-powered speed optimization fixes"""
+async def fix_speed_issues(request: SpeedFixRequest, stream: bool = False):
+    """Generate AI-powered speed optimization fixes (?stream=true sends each fix as an NDJSON line once parsed)"""
+    if stream:
+        return fix_event_stream("speed", request)
     try:
         result = await generate_speed_fixes(request)
         return result
@@ -821,8 +1501,10 @@ async def fix_speed_issues(request: SpeedFixRequest):
 
 
 @api_router.post("/fix/content", response_model=FixResponse)
-async def fix_content_issues(request: ContentFixRequest):
-    """Generate AI-powered content fixes and rewrites"""
+async def fix_content_issues(request: ContentFixRequest, stream: bool = False):
+    """Generate AI-powered content fixes and rewrites (?stream=true sends each fix as an NDJSON line once parsed)"""
+    if stream:
+        return fix_event_stream("content", request)
     try:
         result = await generate_content_fixes(request)
         return result
@@ -831,6 +1513,32 @@ async def fix_content_issues(request: ContentFixRequest):
         raise HTTPException(status_code=500, detail=f"Failed to generate content fixes: {str(e)}")
 
 
+@api_router.post("/fix/all", response_model=AllFixesGenerateResponse)
+async def fix_all_issues(request: AllFixesGenerateRequest, stream: bool = False):
+    """
+    Generate SEO, speed and content fixes concurrently. A category that times
+    out or fails gets rule-based fallback fixes and is listed in fallbacks.
+    With ?stream=true, each category is sent as an NDJSON line as soon as it finishes.
+    """
+    if not (request.seo or request.speed or request.content):
+        raise HTTPException(status_code=400, detail="At least one fix category is required")
+    
+    if stream:
+        async def lines():
+            async for category, result, fallback in generate_all_fixes(request):
+                yield json.dumps({"category": category, "fallback": fallback, "result": result.model_dump()}) + "\n"
+            yield json.dumps({"done": True}) + "\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+    response = AllFixesGenerateResponse()
+    async for category, result, fallback in generate_all_fixes(request):
+        setattr(response, category, result)
+        if fallback:
+            response.fallbacks.append(category)
+    return response
+
+
 # ==================== Download All Fixes as ZIP ====================
 
 class AllFixesRequest(BaseModel):
@@ -1319,9 +2027,48 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+if SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+if tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
+
+background_loops: List[asyncio.Task] = []
+
+
+@app.on_event("startup")
+async def create_db_indexes():
+    await ensure_indexes(db)
+    await run_startup_migrations(db)
+
+
+@app.on_event("startup")
+async def start_background_loops():
+    background_loops.append(asyncio.create_task(load_tokenizer()))
+    if MONITORING_ENABLED:
+        background_loops.append(asyncio.create_task(monitoring_loop(db, run_scheduled_reaudit)))
+    if ARCHIVE_AFTER_DAYS > 0:
+        background_loops.append(asyncio.create_task(archive_loop(db)))
+    if LLM_ACCOUNTING_ENABLED:
+        background_loops.append(asyncio.create_task(llm_usage_loop(db)))
+    if PROFILING_ENABLED:
+        background_loops.append(asyncio.create_task(profile_flush_loop(db)))
+
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_loops:
+        task.cancel()
+    await flush_llm_usage(db)
+    await flush_profiles(db)
+    await close_llm_client()
+    await close_llm_cache()
     client.close()
+    shutdown_tracing()
@@ -1,6 +1,7 @@
 import logging
 from typing import Dict, List, Any
 from scraper import WebsiteScraper
+from timing import stage
 
 logger = logging.getLogger(__name__)
 
@@ -15,20 +16,21 @@ async def analyze_speed(url: str) -> Dict[str, Any]:
     
     speed_data = scraper.get_speed_data()
     
-    # Calculate score
-    score = calculate_speed_score(speed_data)
-    
-    # Build metrics
-    metrics = build_metrics(speed_data)
-    
-    # Detect issues
-    issues = detect_speed_issues(speed_data)
-    
-    # Image analysis
-    image_analysis = analyze_images(speed_data)
-    
-    # Resource analysis
-    resource_analysis = analyze_resources(speed_data)
+    with stage("score"):
+        # Calculate score
+        score = calculate_speed_score(speed_data)
+        
+        # Build metrics
+        metrics = build_metrics(speed_data)
+        
+        # Detect issues
+        issues = detect_speed_issues(speed_data)
+        
+        # Image analysis
+        image_analysis = analyze_images(speed_data)
+        
+        # Resource analysis
+        resource_analysis = analyze_resources(speed_data)
     
     return {
         "url": scraper.url,
@@ -0,0 +1,35 @@
+"""
+Offline tests for splitting and merging analysis detail payloads
+"""
+
+from analysis_details import build_details_doc, merge_details
+
+
+class TestDetailSplit:
+    """Headline scores stay inline, details round-trip through the side document"""
+
+    def test_split_and_merge_round_trip(self):
+        user_scores = {
+            "seo_score": 70, "speed_score": 60, "content_score": 50, "ux_score": 40, "overall_score": 57,
+            "seo_details": {"title": "Home"}, "speed_details": {"load_time": 1.2},
+            "content_details": {"word_count": 900}, "ux_details": {"has_search": True},
+        }
+        competitors = [{"url": "comp.com", "title": "Comp", "scores": {**user_scores, "seo_details": {"title": "Comp"}}}]
+
+        headline, inline_competitors, details_doc = build_details_doc("a1", "u1", user_scores, competitors)
+
+        assert "seo_details" not in headline and headline["overall_score"] == 57
+        assert "seo_details" not in inline_competitors[0]["scores"]
+        assert details_doc["competitors"][0] == {
+            "url": "comp.com",
+            "seo_details": {"title": "Comp"}, "speed_details": {"load_time": 1.2},
+            "content_details": {"word_count": 900}, "ux_details": {"has_search": True},
+        }
+
+        merged = merge_details(
+            {"user_site_scores": headline, "competitors": inline_competitors},
+            details_doc
+        )
+        assert merged["user_site_scores"] == user_scores
+        assert merged["competitors"][0]["scores"]["seo_details"] == {"title": "Comp"}
+        assert "url" not in merged["competitors"][0]["scores"]
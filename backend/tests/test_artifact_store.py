@@ -0,0 +1,27 @@
+"""
+Offline tests for compressed artifact storage
+"""
+
+import bson
+
+from artifact_store import is_packed, pack, unpack
+
+
+class TestArtifactStore:
+    """pack/unpack round trips through BSON"""
+
+    def test_large_text_and_json_round_trip(self):
+        text = "## Summary\n" + "Improve your meta descriptions. " * 200
+        blueprint = {"critical_fixes": [{"title": "Fix", "fix": "x" * 500}] * 10, "score": 52}
+
+        stored = bson.decode(bson.encode({"text": pack(text), "blueprint": pack(blueprint)}))
+
+        assert is_packed(stored["text"]) and is_packed(stored["blueprint"])
+        assert len(stored["text"]["data"]) < len(text)
+        assert unpack(stored["text"]) == text
+        assert unpack(stored["blueprint"]) == blueprint
+
+    def test_small_and_legacy_values_pass_through(self):
+        assert pack("short") == "short"
+        assert unpack("legacy plain string") == "legacy plain string"
+        assert unpack(None) is None
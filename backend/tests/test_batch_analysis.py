@@ -0,0 +1,90 @@
+"""
+Offline tests for batch analysis input parsing and shared scraping
+"""
+
+import asyncio
+
+import batch_analysis
+from batch_analysis import BatchScraper, normalize_site_url, parse_batch_csv, run_batch, validate_batch
+from models import AnalysisCreate
+
+
+class TestBatchInput:
+    """CSV parsing and validation"""
+
+    def test_parse_csv_with_header_and_mixed_separators(self):
+        content = (
+            "user_site_url,competitors\n"
+            "site-a.com,comp1.com,comp2.com\n"
+            "site-b.com,comp1.com;comp3.com\n"
+            "\n"
+            "# comment line\n"
+        )
+        sites = parse_batch_csv(content)
+        assert [s.user_site_url for s in sites] == ["site-a.com", "site-b.com"]
+        assert sites[0].competitor_urls == ["comp1.com", "comp2.com"]
+        assert sites[1].competitor_urls == ["comp1.com", "comp3.com"]
+
+    def test_validate_rejects_too_many_competitors(self):
+        site = AnalysisCreate(user_site_url="a.com", competitor_urls=[f"c{i}.com" for i in range(6)])
+        assert "Maximum 5" in validate_batch([site])
+        assert validate_batch([]) is not None
+
+    def test_normalize_keeps_path_case(self):
+        assert normalize_site_url(" HTTPS://Example.COM/ ") == "https://example.com"
+        assert normalize_site_url("Example.com/Products/") == "https://example.com/Products"
+        assert normalize_site_url("example.com/Products") != normalize_site_url("example.com/products")
+
+
+class TestBatchScraper:
+    """Shared competitor fetching"""
+
+    def test_shared_competitors_fetched_once(self, monkeypatch):
+        fetched = []
+
+        def fake_scrape(url):
+            fetched.append(url)
+            return True, {"url": url}
+
+        monkeypatch.setattr(batch_analysis, "scrape_website", fake_scrape)
+
+        async def fake_run_analysis(analysis_id, user_site_url, competitor_urls, scraper=None):
+            await scraper.scrape(user_site_url)
+            for url in competitor_urls:
+                await scraper.scrape(url)
+
+        jobs = [
+            ("1", "site-a.com", ["comp.com", "other.com"]),
+            ("2", "site-b.com", ["https://comp.com/", "other.com"]),
+        ]
+        scraper = asyncio.run(run_batch(jobs, fake_run_analysis, max_concurrency=2))
+
+        assert scraper.fetched_count == 4
+        assert sorted(fetched) == sorted(["site-a.com", "site-b.com", "comp.com", "other.com"])
+
+    def test_concurrency_is_bounded(self, monkeypatch):
+        import threading
+        import time
+
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_scrape(url):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+            return True, {"url": url}
+
+        monkeypatch.setattr(batch_analysis, "scrape_website", slow_scrape)
+
+        async def scrape_all():
+            scraper = BatchScraper(max_concurrency=2)
+            await asyncio.gather(*(scraper.scrape(f"site{i}.com") for i in range(8)))
+
+        asyncio.run(scrape_all())
+        assert peak <= 2
@@ -0,0 +1,122 @@
+"""
+Offline tests for chat session token budgeting, compaction and concurrent saves
+"""
+
+import asyncio
+
+import chat_sessions
+from benchmarks.memory_db import MemoryDatabase
+from chat_sessions import (
+    build_prompt_messages, compact_history, count_tokens, create_session, load_session, make_message,
+    save_session, trim_history
+)
+
+
+def conversation(turns, words=50):
+    messages = []
+    for i in range(turns):
+        messages.append(make_message("user", f"question {i} " + "word " * words))
+        messages.append(make_message("assistant", f"answer {i} " + "word " * words))
+    return messages
+
+
+def total(messages):
+    return sum(m['tokens'] for m in messages)
+
+
+class TestTrimming:
+    """Oldest turns go first, within the budget"""
+
+    def test_counts_are_positive(self):
+        assert count_tokens("hello world") > 0
+        assert make_message("user", "hi")['tokens'] > chat_sessions.MESSAGE_OVERHEAD_TOKENS
+
+    def test_under_budget_untouched(self):
+        messages = conversation(2)
+        kept, trimmed = trim_history(messages, None, budget=10_000)
+        assert kept == messages and trimmed == []
+
+    def test_trims_oldest_to_budget(self):
+        messages = conversation(10) + [make_message("user", "latest question")]
+        budget = total(messages) // 3
+        kept, trimmed = trim_history(messages, None, budget=budget)
+        assert total(kept) <= budget
+        assert kept[-1]['content'] == "latest question"
+        assert kept[0]['role'] == "user"
+        assert len(trimmed) + len(kept) == len(messages)
+
+    def test_summary_counts_against_budget(self):
+        messages = conversation(4)
+        budget = total(messages)
+        kept_plain, _ = trim_history(messages, None, budget=budget)
+        kept_summary, _ = trim_history(messages, "summary " * 100, budget=budget)
+        assert len(kept_summary) < len(kept_plain)
+
+    def test_latest_message_always_kept(self):
+        huge = make_message("user", "word " * 2000)
+        kept, trimmed = trim_history(conversation(1) + [huge], None, budget=10)
+        assert kept == [huge]
+
+
+class TestCompaction:
+    """Trimmed turns are folded into a running summary"""
+
+    def test_summarizes_trimmed_turns(self, monkeypatch):
+        seen = []
+
+        async def fake_summary(trimmed, previous):
+            seen.append(len(trimmed))
+            return "short summary"
+
+        monkeypatch.setattr(chat_sessions, 'CHAT_SUMMARIZE_TRIMMED', True)
+        monkeypatch.setattr(chat_sessions, 'summarize_turns', fake_summary)
+        messages = conversation(10)
+        kept, summary = asyncio.run(compact_history(messages, None, budget=total(messages) // 2))
+        assert summary == "short summary"
+        assert seen and seen[0] > 0
+
+        prompt = build_prompt_messages("system", summary, kept)
+        assert prompt[1] == {"role": "system", "content": "Summary of the earlier conversation:\nshort summary"}
+        assert len(prompt) == len(kept) + 2
+
+    def test_drop_mode_keeps_summary(self, monkeypatch):
+        monkeypatch.setattr(chat_sessions, 'CHAT_SUMMARIZE_TRIMMED', False)
+        messages = conversation(10)
+        kept, summary = asyncio.run(compact_history(messages, None, budget=total(messages) // 2))
+        assert summary is None
+        assert total(kept) <= total(messages) // 2
+
+
+class TestSaving:
+    """Two turns on one session both land, whichever writes first"""
+
+    def test_concurrent_turns_keep_both(self):
+        def turn(n):
+            return [make_message("user", f"question {n}"), make_message("assistant", f"answer {n}")]
+
+        async def run():
+            db = MemoryDatabase()
+            session = await create_session(db)
+            first = await load_session(db, session['id'])
+            second = await load_session(db, session['id'])
+            await save_session(db, first, turn(1), None, turn(1))
+            # Loaded before the first save: its compacted history doesn't know about turn 1
+            await save_session(db, second, turn(2), "summary of turn 2's view", turn(2))
+            return await load_session(db, session['id'])
+
+        stored = asyncio.run(run())
+        assert [m['content'] for m in stored['messages']] == ["question 1", "answer 1", "question 2", "answer 2"]
+        assert stored['summary'] is None
+        assert stored['version'] == 2
+
+    def test_sessions_without_version(self):
+        async def run():
+            db = MemoryDatabase()
+            await db.chat_sessions.insert_one({"id": "old", "messages": [], "summary": None})
+            session = await load_session(db, "old")
+            await save_session(db, session, [make_message("user", "hi")], "s", [make_message("user", "hi")])
+            return await load_session(db, "old")
+
+        stored = asyncio.run(run())
+        assert stored['summary'] == "s"
+        assert stored['version'] == 1
@@ -0,0 +1,79 @@
+"""
+Offline tests for the stale-while-revalidate competitor set store
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import competitor_sets
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for competitor_sets"""
+
+    def __init__(self, stored=None):
+        self.stored = stored
+        self.updates = []
+
+    async def find_one(self, query, projection=None):
+        return self.stored
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+        return SimpleNamespace(modified_count=1)
+
+
+def stored_set(age_days):
+    refreshed = datetime.now(timezone.utc) - timedelta(days=age_days)
+    return {"domain": "example.com", "industry_hint": "", "competitors": ["old.com"], "refreshed_at": refreshed.isoformat()}
+
+
+def run(db, **kwargs):
+    async def go():
+        result = await competitor_sets.get_competitor_set(db, "https://www.Example.com/", **kwargs)
+        await asyncio.gather(*competitor_sets._refresh_tasks)
+        return result
+    return asyncio.run(go())
+
+
+class TestCompetitorSets:
+    """Freshness policy"""
+
+    def setup_method(self):
+        self.detect_calls = []
+
+    def fake_detect(self, monkeypatch):
+        async def detect(url, industry_hint="", use_cache=True):
+            self.detect_calls.append(use_cache)
+            return ["new.com"]
+        monkeypatch.setattr(competitor_sets, 'detect_competitors', detect)
+
+    def test_domain_key(self):
+        assert competitor_sets.site_domain("https://www.Example.com/pricing") == "example.com"
+        assert competitor_sets.site_domain("example.com") == "example.com"
+        assert competitor_sets.set_key("example.com", " SaaS ") == {"domain": "example.com", "industry_hint": "saas"}
+
+    def test_fresh_set_served_without_llm(self, monkeypatch):
+        self.fake_detect(monkeypatch)
+        db = SimpleNamespace(competitor_sets=FakeCollection(stored_set(1)))
+        assert run(db) == ["old.com"]
+        assert self.detect_calls == []
+
+    def test_stale_set_served_then_refreshed(self, monkeypatch):
+        self.fake_detect(monkeypatch)
+        collection = FakeCollection(stored_set(10))
+        db = SimpleNamespace(competitor_sets=collection)
+        assert run(db) == ["old.com"]
+        assert self.detect_calls == [False]
+        assert collection.updates[-1][1]["$set"]["competitors"] == ["new.com"]
+
+    def test_missing_or_expired_detected_inline(self, monkeypatch):
+        self.fake_detect(monkeypatch)
+        assert run(SimpleNamespace(competitor_sets=FakeCollection())) == ["new.com"]
+        assert run(SimpleNamespace(competitor_sets=FakeCollection(stored_set(60)))) == ["new.com"]
+
+    def test_force_refresh(self, monkeypatch):
+        self.fake_detect(monkeypatch)
+        db = SimpleNamespace(competitor_sets=FakeCollection(stored_set(1)))
+        assert run(db, force_refresh=True) == ["new.com"]
@@ -0,0 +1,92 @@
+"""
+Query-plan checks for hot MongoDB queries
+Requires a reachable MongoDB at MONGO_URL; skipped otherwise.
+"""
+
+import asyncio
+import os
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from db_indexes import HOT_QUERIES, INDEXES, ensure_indexes, plan_stages
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+TEST_DB = "siterank_index_test"
+
+
+def fixture_docs(collection, count=3):
+    """A few documents with distinct values for every key of the collection's unique indexes"""
+    unique_keys = {
+        key for index in INDEXES[collection] if index.document.get('unique') for key in index.document['key']
+    }
+    docs = []
+    for i in range(count):
+        doc = {"id": f"doc-{i}", "url": f"u{i}", "analysis_id": f"a{i}", "user_id": f"u{i}", "email": f"e{i}@x.com"}
+        doc.update({key: f"{key}-{i}" for key in unique_keys if key not in doc})
+        docs.append(doc)
+    return docs
+
+
+async def _explain_hot_queries():
+    client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        return None
+
+    db = client[TEST_DB]
+    try:
+        await client.drop_database(TEST_DB)
+        await ensure_indexes(db)
+        # A few documents so the planner has real collections to choose against
+        for collection in INDEXES:
+            await db[collection].insert_many(fixture_docs(collection))
+
+        plans = []
+        for collection, query, sort in HOT_QUERIES:
+            cursor = db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.explain()
+            plans.append((collection, query, plan_stages(explain['queryPlanner']['winningPlan'])))
+
+        duplicate_rejected = False
+        try:
+            await db.users.insert_one({"id": "another", "email": "e0@x.com"})
+        except DuplicateKeyError:
+            duplicate_rejected = True
+
+        return plans, duplicate_rejected
+    finally:
+        await client.drop_database(TEST_DB)
+        client.close()
+
+
+class TestFixtures:
+    """Fixture documents must be insertable under every unique index"""
+
+    def test_unique_keys_are_distinct(self):
+        for collection, indexes in INDEXES.items():
+            docs = fixture_docs(collection)
+            for index in indexes:
+                if index.document.get('unique'):
+                    keys = list(index.document['key'])
+                    values = {tuple(doc.get(key) for key in keys) for doc in docs}
+                    assert len(values) == len(docs), f"{collection}.{index.document['name']} would reject the fixtures"
+
+
+class TestQueryPlans:
+    """Hot queries must be served by an index"""
+
+    def test_hot_queries_use_indexes(self):
+        result = asyncio.run(_explain_hot_queries())
+        if result is None:
+            pytest.skip("MongoDB not reachable")
+
+        plans, duplicate_rejected = result
+        for collection, query, stages in plans:
+            assert "COLLSCAN" not in stages, f"{collection} {query} falls back to COLLSCAN: {stages}"
+        assert duplicate_rejected, "users.email must be unique"
@@ -0,0 +1,65 @@
+"""
+Offline tests for concurrent fix generation with per-category fallbacks
+"""
+
+import asyncio
+import time
+
+import auto_fix_engine
+from auto_fix_engine import (
+    AllFixesGenerateRequest, ContentFixRequest, FixResponse, SEOFixRequest, SpeedFixRequest
+)
+
+
+def fake_generator(delay, fail=False):
+    async def generate(request):
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("model unavailable")
+        return FixResponse(success=True, url=request.url, fixes=[{"issue": "ai"}], summary="ai")
+    return generate
+
+
+def collect(request, timeout):
+    async def run():
+        return [item async for item in auto_fix_engine.generate_all_fixes(request, timeout=timeout)]
+    return asyncio.run(run())
+
+
+REQUEST = AllFixesGenerateRequest(
+    seo=SEOFixRequest(url="https://example.com", issues=["missing_title"]),
+    speed=SpeedFixRequest(url="https://example.com", issues=["no_compression"]),
+    content=ContentFixRequest(url="https://example.com", issues=["thin_content"]),
+)
+
+
+class TestFixAll:
+    """Fan-out, ordering and fallbacks"""
+
+    def test_runs_concurrently_in_completion_order(self, monkeypatch):
+        monkeypatch.setitem(auto_fix_engine.FIX_GENERATORS, "seo", (fake_generator(0.3), auto_fix_engine.generate_fallback_seo_fixes))
+        monkeypatch.setitem(auto_fix_engine.FIX_GENERATORS, "speed", (fake_generator(0.1), auto_fix_engine.generate_fallback_speed_fixes))
+        monkeypatch.setitem(auto_fix_engine.FIX_GENERATORS, "content", (fake_generator(0.2), auto_fix_engine.generate_fallback_content_fixes))
+
+        started = time.perf_counter()
+        results = collect(REQUEST, timeout=5)
+        elapsed = time.perf_counter() - started
+
+        assert [category for category, _, _ in results] == ["speed", "content", "seo"]
+        assert not any(fallback for _, _, fallback in results)
+        assert elapsed < 0.5  # slowest category, not the 0.6s sum
+
+    def test_timeout_and_failure_fall_back_per_category(self, monkeypatch):
+        monkeypatch.setitem(auto_fix_engine.FIX_GENERATORS, "seo", (fake_generator(5), auto_fix_engine.generate_fallback_seo_fixes))
+        monkeypatch.setitem(auto_fix_engine.FIX_GENERATORS, "speed", (fake_generator(0, fail=True), auto_fix_engine.generate_fallback_speed_fixes))
+        monkeypatch.setitem(auto_fix_engine.FIX_GENERATORS, "content", (fake_generator(0), auto_fix_engine.generate_fallback_content_fixes))
+
+        results = {category: (result, fallback) for category, result, fallback in collect(REQUEST, timeout=0.2)}
+        assert results["seo"][1] and results["speed"][1]
+        assert not results["content"][1]
+        assert results["seo"][0].fixes and results["seo"][0].fixes != [{"issue": "ai"}]
+
+    def test_only_requested_categories(self, monkeypatch):
+        monkeypatch.setitem(auto_fix_engine.FIX_GENERATORS, "seo", (fake_generator(0), auto_fix_engine.generate_fallback_seo_fixes))
+        request = AllFixesGenerateRequest(seo=REQUEST.seo)
+        assert [category for category, _, _ in collect(request, timeout=1)] == ["seo"]
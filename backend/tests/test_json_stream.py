@@ -0,0 +1,148 @@
+"""
+Offline tests for incremental fix parsing and streamed fix generation
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import auto_fix_engine
+from auto_fix_engine import SpeedFixRequest
+from json_stream import ArrayStreamParser
+
+FIXES = [
+    {"issue": "missing_title", "fixed_code": "<title>{Brace} \"quoted\"</title>", "instructions": "in <head>"},
+    {"issue": "missing_meta", "fixed_code": "<meta name=\"description\" content=\"[x]\">", "instructions": "in <head>"},
+    {"issue": "gzip", "fixed_code": "gzip on;\\n", "instructions": "nginx.conf"},
+]
+DOCUMENT = "```json\n" + json.dumps({"fixes": FIXES, "summary": "three fixes"}, indent=2) + "\n```"
+
+
+def feed_in_chunks(parser, text, size):
+    seen = []
+    for i in range(0, len(text), size):
+        seen.append(parser.feed(text[i:i + size]))
+    return seen
+
+
+class TestArrayStreamParser:
+    """Elements come out as soon as they close; a broken tail keeps them"""
+
+    def test_yields_each_element_once_closed(self):
+        parser = ArrayStreamParser("fixes")
+        batches = feed_in_chunks(parser, DOCUMENT, 1)
+        assert parser.items == FIXES
+        # Elements arrive one at a time, well before the stream ends
+        first = next(i for i, batch in enumerate(batches) if batch)
+        assert first < len(DOCUMENT) // 2
+        assert parser.document() == {"fixes": FIXES, "summary": "three fixes"}
+        assert parser.string_field("summary") == "three fixes"
+
+    def test_chunk_size_does_not_matter(self):
+        for size in (2, 7, 64, len(DOCUMENT)):
+            parser = ArrayStreamParser("fixes")
+            feed_in_chunks(parser, DOCUMENT, size)
+            assert parser.items == FIXES
+
+    def test_broken_tail_keeps_parsed_elements(self):
+        text = json.dumps({"summary": "partial", "fixes": FIXES})
+        truncated = text[:text.index('"gzip"') + 10]
+        parser = ArrayStreamParser("fixes")
+        parser.feed(truncated)
+        assert parser.items == FIXES[:2]
+        assert parser.document() is None
+        assert parser.string_field("summary") == "partial"
+
+    def test_malformed_element_is_skipped(self):
+        text = '{"fixes": [{"issue": "a"}, {"issue": "b",}, {"issue": "c"}], "summary": "s"}'
+        parser = ArrayStreamParser("fixes")
+        parser.feed(text)
+        assert parser.items == [{"issue": "a"}, {"issue": "c"}]
+
+    def test_ignores_other_arrays_and_trailing_text(self):
+        text = 'Here you go: {"notes": [{"issue": "no"}], "fixes": [{"issue": "yes"}]} and {"fixes": [{"issue": "later"}]}'
+        parser = ArrayStreamParser("fixes")
+        parser.feed(text)
+        assert parser.items == [{"issue": "yes"}]
+
+
+def fake_stream(text, fail_after=None):
+    async def stream(messages, call_site, **kwargs):
+        for i in range(0, len(text), 5):
+            if fail_after is not None and i >= fail_after:
+                raise ConnectionError("stream dropped")
+            yield text[i:i + 5]
+    return stream
+
+
+def fake_completion(text):
+    async def completion(messages, call_site, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+    return completion
+
+
+REQUEST = SpeedFixRequest(url="https://example.com", issues=["no_compression"])
+
+
+class TestStreamedFixGeneration:
+    """Generators keep parsed fixes; streamed events fall back only when nothing parsed"""
+
+    def setup_cache(self, monkeypatch):
+        stored = {}
+
+        async def get_cached(call_site, key):
+            return None
+
+        async def set_cached(call_site, key, value):
+            stored[call_site] = value
+
+        monkeypatch.setattr(auto_fix_engine, 'get_cached', get_cached)
+        monkeypatch.setattr(auto_fix_engine, 'set_cached', set_cached)
+        return stored
+
+    def test_complete_response_is_cached(self, monkeypatch):
+        stored = self.setup_cache(monkeypatch)
+        monkeypatch.setattr(auto_fix_engine, 'chat_completion', fake_completion(DOCUMENT))
+        result = asyncio.run(auto_fix_engine.generate_speed_fixes(REQUEST))
+        assert result.fixes == FIXES and result.summary == "three fixes"
+        assert stored["speed_fixes"]["fixes"] == FIXES
+
+    def test_truncated_response_keeps_parsed_fixes(self, monkeypatch):
+        stored = self.setup_cache(monkeypatch)
+        text = json.dumps({"fixes": FIXES, "summary": "three fixes"})
+        monkeypatch.setattr(auto_fix_engine, 'chat_completion', fake_completion(text[:text.index('"gzip"')]))
+        result = asyncio.run(auto_fix_engine.generate_speed_fixes(REQUEST))
+        assert result.fixes == FIXES[:2]
+        assert result.summary == auto_fix_engine.FIX_DEFAULT_SUMMARIES["speed"]
+        assert stored == {}
+
+    def test_unparseable_response_uses_fallback(self, monkeypatch):
+        self.setup_cache(monkeypatch)
+        monkeypatch.setattr(auto_fix_engine, 'chat_completion', fake_completion("Sorry, I can't help with that."))
+        result = asyncio.run(auto_fix_engine.generate_speed_fixes(REQUEST))
+        assert result == auto_fix_engine.generate_fallback_speed_fixes(REQUEST)
+
+    def test_events_stream_fixes_then_done(self, monkeypatch):
+        self.setup_cache(monkeypatch)
+        monkeypatch.setattr(auto_fix_engine, 'stream_chat_completion', fake_stream(DOCUMENT[:DOCUMENT.index('three fixes"') + 12]))
+
+        async def run():
+            return [event async for event in auto_fix_engine.stream_fix_events("speed", REQUEST)]
+
+        events = asyncio.run(run())
+        assert [e["fix"] for e in events[:-1]] == FIXES
+        assert events[-1] == {
+            "done": True, "summary": "three fixes", "complete": False, "fallback": False
+        }
+
+    def test_events_fall_back_when_nothing_parsed(self, monkeypatch):
+        self.setup_cache(monkeypatch)
+        monkeypatch.setattr(auto_fix_engine, 'stream_chat_completion', fake_stream("{", fail_after=0))
+
+        async def run():
+            return [event async for event in auto_fix_engine.stream_fix_events("speed", REQUEST)]
+
+        events = asyncio.run(run())
+        fallback = auto_fix_engine.generate_fallback_speed_fixes(REQUEST)
+        assert [e["fix"] for e in events[:-1]] == fallback.fixes
+        assert events[-1]["fallback"] is True
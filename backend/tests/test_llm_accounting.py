@@ -0,0 +1,186 @@
+"""
+Offline tests for LLM call accounting and attribution
+"""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_accounting
+import llm_client
+import llm_resilience
+from llm_accounting import count_tokens, flush_llm_usage, llm_context, load_tokenizer, record_cache_hit, track_llm_call
+from llm_resilience import CircuitOpen
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    llm_accounting._pending.clear()
+    llm_resilience.reset_providers()
+    yield
+    llm_accounting._pending.clear()
+    llm_resilience.reset_providers()
+
+
+def records():
+    return list(llm_accounting._pending)
+
+
+class TestTracking:
+    """Outcomes, tokens and tags of tracked calls"""
+
+    def test_reported_usage_wins_over_estimate(self):
+        with llm_context(analysis_id="a1", user_id="u1", flow="analysis"):
+            with track_llm_call("nvidia", "suggestions", "model-x", "prompt " * 50) as call:
+                call.set_usage(SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+                call.add_output("ignored")
+
+        [record] = records()
+        assert record["prompt_tokens"] == 120 and record["completion_tokens"] == 30
+        assert record["total_tokens"] == 150 and not record["estimated"]
+        assert (record["analysis_id"], record["user_id"], record["flow"]) == ("a1", "u1", "analysis")
+        assert record["outcome"] == "ok" and record["model"] == "model-x"
+
+    def test_estimates_when_provider_reports_nothing(self):
+        with track_llm_call("emergent", "competitors", "openai/gpt", [{"role": "user", "content": "word " * 40}]) as call:
+            call.add_output("example.com, example.org")
+
+        [record] = records()
+        assert record["estimated"]
+        assert record["prompt_tokens"] > 10 and record["completion_tokens"] > 0
+        assert record["user_id"] is None
+
+    def test_failures_are_recorded_and_reraised(self):
+        with pytest.raises(RuntimeError):
+            with track_llm_call("nvidia", "chatbot", "m", "hi"):
+                raise RuntimeError("boom")
+        with pytest.raises(CircuitOpen):
+            with track_llm_call("nvidia", "chatbot", "m", "hi"):
+                raise CircuitOpen("nvidia")
+
+        error, rejected = records()
+        assert error["outcome"] == "error" and error["prompt_tokens"] > 0
+        assert rejected["outcome"] == "circuit_open" and rejected["total_tokens"] == 0
+
+    def test_cache_hits_cost_nothing(self):
+        with llm_context(user_id="u1"):
+            record_cache_hit("seo_fixes")
+        [record] = records()
+        assert record["cache_hit"] and record["total_tokens"] == 0 and record["user_id"] == "u1"
+
+    def test_tags_follow_tasks_and_nest(self):
+        async def call():
+            with track_llm_call("nvidia", "chatbot", "m", "hi"):
+                pass
+
+        async def run():
+            with llm_context(user_id="u1"):
+                with llm_context(analysis_id="a1"):
+                    await asyncio.create_task(call())
+                await call()
+            await call()
+
+        asyncio.run(run())
+        assert [(r["user_id"], r["analysis_id"]) for r in records()] == [("u1", "a1"), ("u1", None), (None, None)]
+
+
+class TestTokenizer:
+    """The encoding loads once, off the event loop; counts are estimated until then"""
+
+    def fake_tiktoken(self, monkeypatch, delay):
+        loads = []
+
+        def get_encoding(name):
+            loads.append(name)
+            time.sleep(delay)
+            return SimpleNamespace(encode=lambda text, disallowed_special=(): text.split())
+
+        monkeypatch.setattr(llm_accounting, '_encoding', None)
+        monkeypatch.setitem(sys.modules, 'tiktoken', SimpleNamespace(get_encoding=get_encoding))
+        return loads
+
+    def test_counting_never_loads(self, monkeypatch):
+        loads = self.fake_tiktoken(monkeypatch, 0)
+        assert count_tokens("one two three four") == len("one two three four") // 4 + 1
+        assert loads == []
+
+    def test_slow_load_times_out_then_finishes(self, monkeypatch):
+        loads = self.fake_tiktoken(monkeypatch, 0.3)
+
+        async def run():
+            started = time.monotonic()
+            loaded = await load_tokenizer(timeout=0.05)
+            return loaded, time.monotonic() - started
+
+        loaded, waited = asyncio.run(run())
+        assert not loaded and waited < 0.25
+        deadline = time.monotonic() + 2
+        while llm_accounting._encoding is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert loads == [llm_accounting.LLM_TOKENIZER]
+        assert count_tokens("one two three four") == 4
+
+
+class TestSharedClient:
+    """chat_completion records provider usage"""
+
+    def test_chat_completion_is_accounted(self, monkeypatch):
+        async def create(**kwargs):
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="hello"))],
+                usage=SimpleNamespace(prompt_tokens=11, completion_tokens=2)
+            )
+
+        fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        monkeypatch.setattr(llm_client, 'get_llm_client', lambda: fake)
+
+        async def run():
+            try:
+                with llm_context(user_id="u1", flow="chat"):
+                    await llm_client.chat_completion([{"role": "user", "content": "hi"}], call_site="chatbot")
+            finally:
+                await llm_client.close_llm_client()
+
+        asyncio.run(run())
+        [record] = records()
+        assert (record["provider"], record["call_site"], record["total_tokens"]) == ("nvidia", "chatbot", 13)
+        assert record["user_id"] == "u1"
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+        self.writes = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.inserted.extend(docs)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.writes.extend(requests)
+
+
+class TestFlush:
+    """Queued records are stored and folded into per-user daily totals"""
+
+    def test_flush_writes_records_and_user_totals(self):
+        with llm_context(user_id="u1"):
+            for tokens in (10, 20):
+                with track_llm_call("nvidia", "chatbot", "m", "x") as call:
+                    call.set_usage(SimpleNamespace(prompt_tokens=tokens, completion_tokens=5))
+            record_cache_hit("chatbot")
+        with track_llm_call("nvidia", "chatbot", "m", "x") as call:
+            call.set_usage(SimpleNamespace(prompt_tokens=1, completion_tokens=1))
+
+        db = SimpleNamespace(llm_usage=FakeCollection(), llm_user_usage=FakeCollection())
+        assert asyncio.run(flush_llm_usage(db)) == 4
+        assert len(db.llm_usage.inserted) == 4
+        assert all("expires_at" in doc for doc in db.llm_usage.inserted)
+
+        [update] = db.llm_user_usage.writes
+        assert update._filter["user_id"] == "u1"
+        totals = update._doc["$inc"]
+        assert totals["calls"] == 3 and totals["total_tokens"] == 40 and totals["cache_hits"] == 1
+        assert records() == []
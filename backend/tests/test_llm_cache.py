@@ -0,0 +1,64 @@
+"""
+Offline tests for the LLM response cache
+"""
+
+import asyncio
+
+import fakeredis.aioredis
+
+import llm_cache
+
+
+class TestCacheKey:
+    """Content-addressed keys"""
+
+    def test_whitespace_is_normalized(self):
+        a = llm_cache.make_key("m", "system", "Fix  these\n issues")
+        b = llm_cache.make_key("m", "system ", "Fix these issues")
+        assert a == b
+
+    def test_model_and_prompts_change_key(self):
+        base = llm_cache.make_key("m", "system", "prompt")
+        assert llm_cache.make_key("other", "system", "prompt") != base
+        assert llm_cache.make_key("m", "other", "prompt") != base
+        assert llm_cache.make_key("m", "system", "prompt", "follow-up") != base
+
+    def test_ttl_override(self, monkeypatch):
+        monkeypatch.setenv("LLM_CACHE_TTL_SEO_FIXES", "60")
+        assert llm_cache.call_site_ttl("seo_fixes") == 60
+        assert llm_cache.call_site_ttl("competitors") == llm_cache.CALL_SITE_TTLS["competitors"]
+
+
+class TestBackends:
+    """Round trips and hit/miss accounting on both backends"""
+
+    def _round_trip(self, monkeypatch, backend):
+        monkeypatch.setattr(llm_cache, '_backend', backend)
+        monkeypatch.setattr(llm_cache, '_counts', llm_cache.defaultdict(lambda: {"hits": 0, "misses": 0}))
+
+        async def run():
+            key = llm_cache.make_key("m", "s", "u")
+            assert await llm_cache.get_cached("seo_fixes", key) is None
+            await llm_cache.set_cached("seo_fixes", key, {"fixes": [{"issue": "title"}], "summary": "ok"})
+            value = await llm_cache.get_cached("seo_fixes", key)
+            await llm_cache.close_llm_cache()
+            return value
+
+        assert asyncio.run(run()) == {"fixes": [{"issue": "title"}], "summary": "ok"}
+        assert llm_cache.cache_stats()["call_sites"]["seo_fixes"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    def test_disk_backend(self, tmp_path, monkeypatch):
+        self._round_trip(monkeypatch, llm_cache.DiskCacheBackend(str(tmp_path), size_limit_mb=1))
+
+    def test_redis_backend(self, monkeypatch):
+        backend = llm_cache.RedisCacheBackend.__new__(llm_cache.RedisCacheBackend)
+        backend.client = fakeredis.aioredis.FakeRedis()
+        self._round_trip(monkeypatch, backend)
+
+    def test_backend_errors_are_misses(self, monkeypatch):
+        class Broken:
+            async def get(self, key):
+                raise ConnectionError("down")
+
+        monkeypatch.setattr(llm_cache, '_backend', Broken())
+        assert asyncio.run(llm_cache.get_cached("competitors", "k")) is None
@@ -0,0 +1,166 @@
+"""
+Tests for the shared async LLM client against a local stub server
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+
+
+class StubCompletions(BaseHTTPRequestHandler):
+    """Answers /chat/completions with a canned reply after a short delay"""
+
+    delay = 0.2
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    chunks_sent = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if body.get('stream'):
+            return self.stream_reply(body)
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.in_flight -= 1
+
+        payload = json.dumps({
+            "id": "cmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body['model'],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": f"echo: {body['messages'][-1]['content']}"}
+            }]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def stream_reply(self, body):
+        """Ten one-word chunks as OpenAI-style server-sent events"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for i in range(10):
+                chunk = {
+                    "id": "cmpl-1", "object": "chat.completion.chunk", "created": 0, "model": body['model'],
+                    "choices": [{"index": 0, "delta": {"content": f"w{i} "}, "finish_reason": None}]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                type(self).chunks_sent += 1
+                time.sleep(0.05)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompletions)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubCompletions.max_in_flight = 0
+    StubCompletions.chunks_sent = 0
+    monkeypatch.setenv("NVIDIA_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setenv("NVIDIA_API_KEY", "test-key")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestSharedClient:
+    """Pooled client reuse and the concurrency cap"""
+
+    def test_completion_round_trip(self, stub_server):
+        async def run():
+            try:
+                completion = await llm_client.chat_completion([{"role": "user", "content": "hi"}])
+                assert llm_client.get_llm_client() is llm_client.get_llm_client()
+                return completion.choices[0].message.content
+            finally:
+                await llm_client.close_llm_client()
+
+        assert asyncio.run(run()) == "echo: hi"
+
+    def test_concurrency_is_capped(self, stub_server, monkeypatch):
+        monkeypatch.setattr(llm_client, 'LLM_MAX_CONCURRENCY', 2)
+
+        async def run():
+            try:
+                await asyncio.gather(*[
+                    llm_client.chat_completion([{"role": "user", "content": str(i)}]) for i in range(6)
+                ])
+            finally:
+                await llm_client.close_llm_client()
+
+        asyncio.run(run())
+        assert StubCompletions.max_in_flight == 2
+
+    def test_event_loop_stays_responsive(self, stub_server):
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            try:
+                await llm_client.chat_completion([{"role": "user", "content": "slow"}])
+            finally:
+                task.cancel()
+                await llm_client.close_llm_client()
+            return ticks
+
+        # The stub takes 200ms; a blocking call would starve the ticker entirely
+        assert asyncio.run(run()) >= 5
+
+
+class TestStreaming:
+    """Token streaming and early cancellation"""
+
+    def test_streams_all_tokens(self, stub_server):
+        async def run():
+            try:
+                return [t async for t in llm_client.stream_chat_completion([{"role": "user", "content": "hi"}], call_site="test")]
+            finally:
+                await llm_client.close_llm_client()
+
+        assert "".join(asyncio.run(run())) == "".join(f"w{i} " for i in range(10))
+
+    def test_closing_early_stops_upstream(self, stub_server):
+        async def run():
+            tokens = llm_client.stream_chat_completion([{"role": "user", "content": "hi"}], call_site="test")
+            try:
+                async for _ in tokens:
+                    break
+                await tokens.aclose()
+                await asyncio.sleep(0.8)
+            finally:
+                await llm_client.close_llm_client()
+
+        asyncio.run(run())
+        # Left open, the stub would have sent all ten chunks (0.5s) by now
+        assert StubCompletions.chunks_sent < 10
@@ -0,0 +1,95 @@
+"""
+Offline tests for the structured suggestions call and its two-call fallback
+"""
+
+import asyncio
+import json
+import sys
+from types import ModuleType
+
+import pytest
+
+import llm_cache
+import llm_engine
+
+SCORES = {"seo_score": 40, "speed_score": 60, "content_score": 50, "ux_score": 70, "overall_score": 55}
+COMPARISON = {"user_rank": 2, "total_sites": 3, "strengths": ["UX"], "weaknesses": [{"area": "SEO"}]}
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Installs a scripted emergentintegrations LlmChat; returns the prompts it received"""
+    replies = []
+    prompts = []
+
+    class UserMessage:
+        def __init__(self, text):
+            self.text = text
+
+    class LlmChat:
+        def __init__(self, **kwargs):
+            pass
+
+        def with_model(self, *args):
+            return self
+
+        async def send_message(self, message):
+            prompts.append(message.text)
+            return replies.pop(0)
+
+    chat_module = ModuleType("emergentintegrations.llm.chat")
+    chat_module.LlmChat = LlmChat
+    chat_module.UserMessage = UserMessage
+    for name in ("emergentintegrations", "emergentintegrations.llm"):
+        monkeypatch.setitem(sys.modules, name, ModuleType(name))
+    monkeypatch.setitem(sys.modules, "emergentintegrations.llm.chat", chat_module)
+    monkeypatch.setenv("EMERGENT_LLM_KEY", "test-key")
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_ENABLED', False)
+    return replies, prompts
+
+
+def suggest():
+    return asyncio.run(llm_engine.generate_ai_suggestions("https://example.com", SCORES, [], COMPARISON))
+
+
+class TestStructuredParsing:
+    """Local validation and repair"""
+
+    def test_repairs_fences_and_trailing_commas(self):
+        response = '```json\n{"summary": "Para one\nPara two", "action_items": ["Fix titles (High Impact)",],}\n```'
+        assert llm_engine.parse_structured_suggestions(response) == ("Para one\nPara two", ["Fix titles (High Impact)"])
+
+    def test_object_items_and_limit(self):
+        items = [{"action": f"Item {i}"} for i in range(10)]
+        summary, parsed = llm_engine.parse_structured_suggestions(json.dumps({"summary": "s", "action_items": items}))
+        assert parsed == [f"Item {i}" for i in range(7)]
+
+    def test_rejects_incomplete(self):
+        assert llm_engine.parse_structured_suggestions('{"summary": "s"}') is None
+        assert llm_engine.parse_structured_suggestions('{"summary": "", "action_items": ["a"]}') is None
+        assert llm_engine.parse_structured_suggestions("I can't do that") is None
+
+
+class TestSuggestionModes:
+    """One call when it works, two when it doesn't"""
+
+    def test_single_call(self, fake_llm, monkeypatch):
+        monkeypatch.setattr(llm_engine, 'LLM_SUGGESTIONS_MODE', 'single')
+        replies, prompts = fake_llm
+        replies.append(json.dumps({"summary": "Analysis", "action_items": ["Fix SEO (High Impact)"]}))
+        assert suggest() == ("Analysis", ["Fix SEO (High Impact)"])
+        assert len(prompts) == 1
+
+    def test_falls_back_to_two_calls(self, fake_llm, monkeypatch):
+        monkeypatch.setattr(llm_engine, 'LLM_SUGGESTIONS_MODE', 'single')
+        replies, prompts = fake_llm
+        replies.extend(["not json", "Prose analysis", '["Compress images (Medium Impact)"]'])
+        assert suggest() == ("Prose analysis", ["Compress images (Medium Impact)"])
+        assert len(prompts) == 3
+
+    def test_two_call_mode(self, fake_llm, monkeypatch):
+        monkeypatch.setattr(llm_engine, 'LLM_SUGGESTIONS_MODE', 'two-call')
+        replies, prompts = fake_llm
+        replies.extend(["Prose analysis", '["Add a blog (Low Impact)"]'])
+        assert suggest() == ("Prose analysis", ["Add a blog (Low Impact)"])
+        assert len(prompts) == 2
@@ -0,0 +1,342 @@
+"""
+Tests for the LLM circuit breaker and hedging, against in-process fakes
+and a local fake provider that injects latency and errors
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import auto_fix_engine
+import llm_accounting
+import llm_client
+import llm_resilience
+from auto_fix_engine import SpeedFixRequest
+from llm_accounting import call_llm_tracked
+from llm_resilience import CircuitOpen, call_llm, get_provider
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(llm_resilience, 'LLM_BREAKER_MIN_CALLS', 4)
+    monkeypatch.setattr(llm_resilience, 'LLM_BREAKER_COOLDOWN_SECONDS', 0.2)
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_MIN_SAMPLES', 5)
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_MIN_DELAY_SECONDS', 0.05)
+    llm_resilience.reset_providers()
+    yield
+    llm_resilience.reset_providers()
+
+
+class FakeProvider(BaseHTTPRequestHandler):
+    """OpenAI-style /chat/completions with configurable delay and failure"""
+
+    delay = 0.0
+    fail = False
+    hits = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        type(self).hits += 1
+        time.sleep(type(self).delay)
+        if type(self).fail:
+            payload = json.dumps({"error": {"message": "upstream overloaded"}}).encode()
+            self.send_response(500)
+        else:
+            payload = json.dumps({
+                "id": "cmpl-1", "object": "chat.completion", "created": 0, "model": body['model'],
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}]
+            }).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeProvider)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeProvider.delay, FakeProvider.fail, FakeProvider.hits = 0.0, False, 0
+    monkeypatch.setattr(llm_client, 'LLM_MAX_RETRIES', 0)
+    monkeypatch.setenv("NVIDIA_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setenv("NVIDIA_API_KEY", "test-key")
+    yield FakeProvider
+    server.shutdown()
+    server.server_close()
+
+
+async def failing():
+    raise RuntimeError("boom")
+
+
+async def answer(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+class TestBreaker:
+    """closed -> open -> half-open -> closed"""
+
+    def test_opens_on_error_rate_and_rejects_fast(self):
+        async def run():
+            for _ in range(4):
+                with pytest.raises(RuntimeError):
+                    await call_llm("fake", failing)
+            started = time.monotonic()
+            with pytest.raises(CircuitOpen):
+                await call_llm("fake", lambda: answer("never", delay=5))
+            return time.monotonic() - started
+
+        assert asyncio.run(run()) < 0.05
+        assert get_provider("fake").state == "open"
+
+    def test_healthy_calls_keep_it_closed(self):
+        async def run():
+            for i in range(10):
+                if i % 4 == 0:
+                    with pytest.raises(RuntimeError):
+                        await call_llm("fake", failing)
+                else:
+                    await call_llm("fake", lambda: answer("ok"))
+
+        asyncio.run(run())
+        assert get_provider("fake").state == "closed"
+
+    def test_half_open_probe_closes_or_reopens(self):
+        async def run():
+            for _ in range(4):
+                with pytest.raises(RuntimeError):
+                    await call_llm("fake", failing)
+            await asyncio.sleep(0.25)
+            # A failed probe reopens straight away
+            with pytest.raises(RuntimeError):
+                await call_llm("fake", failing)
+            assert get_provider("fake").state == "open"
+            await asyncio.sleep(0.25)
+            assert await call_llm("fake", lambda: answer("ok")) == "ok"
+
+        asyncio.run(run())
+        assert get_provider("fake").state == "closed"
+
+    def test_slow_calls_count_as_failures(self):
+        async def run():
+            for _ in range(4):
+                with pytest.raises(asyncio.TimeoutError):
+                    await call_llm("fake", lambda: answer("late", delay=1), timeout=0.05)
+
+        asyncio.run(run())
+        assert get_provider("fake").state == "open"
+
+
+class TestHedging:
+    """A second attempt after the p95 delay; first success wins"""
+
+    def test_hedge_wins_over_slow_first_attempt(self):
+        attempts = []
+
+        async def attempt():
+            attempts.append(time.monotonic())
+            # First attempt stalls, the hedge answers quickly
+            return await answer(len(attempts), delay=2 if len(attempts) == 1 else 0.01)
+
+        async def run():
+            for _ in range(5):
+                await call_llm("fake", lambda: answer("warm", delay=0.01))
+            started = time.monotonic()
+            result = await call_llm("fake", attempt)
+            return result, time.monotonic() - started
+
+        result, elapsed = asyncio.run(run())
+        assert result == 2
+        assert len(attempts) == 2
+        assert elapsed < 0.5
+
+    def test_no_hedge_without_enough_samples(self):
+        attempts = []
+
+        async def attempt():
+            attempts.append(1)
+            return await answer("ok", delay=0.1)
+
+        asyncio.run(call_llm("fake", attempt))
+        assert attempts == [1]
+
+    def test_hedge_disabled_for_stateful_calls(self):
+        attempts = []
+
+        async def attempt():
+            attempts.append(1)
+            return await answer("ok", delay=0.2)
+
+        async def run():
+            for _ in range(5):
+                await call_llm("fake", lambda: answer("warm", delay=0.01))
+            await call_llm("fake", attempt, hedge=False)
+
+        asyncio.run(run())
+        assert attempts == [1]
+
+    def test_latency_window_is_per_call_site(self):
+        attempts = []
+
+        async def long_output():
+            attempts.append(1)
+            return await answer("report", delay=0.2)
+
+        async def run():
+            for _ in range(5):
+                await call_llm("fake", lambda: answer("short", delay=0.01), call_site="chatbot")
+            # Fast chatbot calls set no hedge delay for a slow call site
+            await call_llm("fake", long_output, call_site="fixes")
+
+        asyncio.run(run())
+        assert attempts == [1]
+        assert get_provider("fake").hedge_delay("chatbot") is not None
+        assert get_provider("fake").hedge_delay("fixes") is None
+
+    def test_every_attempt_is_accounted(self):
+        llm_accounting._pending.clear()
+        attempts = []
+
+        async def attempt():
+            attempts.append(1)
+            return await answer("done", delay=2 if len(attempts) == 1 else 0.01)
+
+        async def run():
+            for _ in range(5):
+                await call_llm("fake", lambda: answer("warm", delay=0.01), call_site="competitors")
+            return await call_llm_tracked(
+                "fake", "competitors", "m", "which competitors?", attempt,
+                lambda call, text: call.add_output(text)
+            )
+
+        assert asyncio.run(run()) == "done"
+        outcomes = sorted(record["outcome"] for record in llm_accounting._pending)
+        llm_accounting._pending.clear()
+        assert outcomes == ["cancelled", "ok"]
+
+
+class TestConcurrencySlots:
+    """Waiting for a local slot is neither latency nor a provider failure"""
+
+    def test_queueing_does_not_count_toward_timeout(self):
+        async def run():
+            slots = asyncio.Semaphore(1)
+            await slots.acquire()
+            asyncio.get_running_loop().call_later(0.3, slots.release)
+            return await call_llm("fake", lambda: answer("ok", delay=0.01), timeout=0.2, slots=slots)
+
+        assert asyncio.run(run()) == "ok"
+        health = get_provider("fake")
+        assert health.state == "closed" and list(health.outcomes) == [True]
+        assert max(health.latencies["default"]) < 0.1
+
+
+class FailingStream:
+    """A completion stream that drops after its first chunk"""
+
+    def __aiter__(self):
+        return self.chunks()
+
+    async def chunks(self):
+        yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content="partial"))])
+        raise ConnectionError("stream dropped")
+
+    async def close(self):
+        pass
+
+
+class TestStreams:
+    """A stream is judged by the breaker from opening to its last chunk"""
+
+    def fake_client(self, monkeypatch):
+        async def create(**kwargs):
+            return FailingStream()
+
+        fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        monkeypatch.setattr(llm_client, 'get_llm_client', lambda: fake)
+
+    def test_mid_stream_failures_open_the_breaker(self, monkeypatch):
+        self.fake_client(monkeypatch)
+
+        async def run():
+            try:
+                for _ in range(4):
+                    with pytest.raises(ConnectionError):
+                        async for _ in llm_client.stream_chat_completion([{"role": "user", "content": "hi"}], call_site="chatbot"):
+                            pass
+                with pytest.raises(CircuitOpen):
+                    async for _ in llm_client.stream_chat_completion([{"role": "user", "content": "hi"}], call_site="chatbot"):
+                        pass
+            finally:
+                await llm_client.close_llm_client()
+
+        asyncio.run(run())
+        assert get_provider("nvidia").state == "open"
+
+    def test_consumer_stopping_early_is_not_judged(self, monkeypatch):
+        self.fake_client(monkeypatch)
+
+        async def run():
+            try:
+                tokens = llm_client.stream_chat_completion([{"role": "user", "content": "hi"}], call_site="chatbot")
+                async for _ in tokens:
+                    break
+                await tokens.aclose()
+            finally:
+                await llm_client.close_llm_client()
+
+        asyncio.run(run())
+        assert list(get_provider("nvidia").outcomes) == []
+
+
+class TestFakeProvider:
+    """The shared client and fix fallbacks against a degraded provider"""
+
+    def test_errors_trip_breaker_and_stop_upstream_calls(self, fake_provider):
+        fake_provider.fail = True
+
+        async def run():
+            try:
+                for _ in range(4):
+                    with pytest.raises(Exception):
+                        await llm_client.chat_completion([{"role": "user", "content": "hi"}])
+                hits = fake_provider.hits
+                with pytest.raises(CircuitOpen):
+                    await llm_client.chat_completion([{"role": "user", "content": "hi"}])
+                return hits
+            finally:
+                await llm_client.close_llm_client()
+
+        hits = asyncio.run(run())
+        assert hits == 4
+        assert fake_provider.hits == 4
+
+    def test_open_circuit_routes_fixes_to_fallback_fast(self, fake_provider):
+        fake_provider.fail = True
+        request = SpeedFixRequest(url="https://example.com", issues=["no_compression"])
+
+        async def run():
+            try:
+                for _ in range(4):
+                    await auto_fix_engine.generate_speed_fixes(request)
+                fake_provider.delay = 5
+                started = time.monotonic()
+                fixes = await auto_fix_engine.generate_speed_fixes(request)
+                return fixes, time.monotonic() - started
+            finally:
+                await llm_client.close_llm_client()
+
+        fixes, elapsed = asyncio.run(run())
+        assert fixes == auto_fix_engine.generate_fallback_speed_fixes(request)
+        assert elapsed < 0.1
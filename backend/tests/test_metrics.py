@@ -0,0 +1,145 @@
+"""
+Offline tests for the Prometheus metrics: route latency, scrape stages,
+Mongo command timing, analysis gauges and fallback counters
+"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+from fastapi import BackgroundTasks, FastAPI, Response
+from prometheus_client import REGISTRY
+
+import metrics
+from llm_engine import generate_fallback_suggestions
+from metrics import MetricsMiddleware, MongoCommandTimer, analyses_queued, analysis_running, render_metrics
+from scraper import scrape_website
+
+PAGE = b"<html><head><title>Acme</title></head><body><h1>Acme</h1><p>Widgets and parts.</p></body></html>"
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str, background_tasks: BackgroundTasks):
+        background_tasks.add_task(asyncio.sleep, 0.3)
+        return {"id": item_id}
+
+    @app.get("/metrics")
+    async def scrape():
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def get(app, *paths):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+    return asyncio.run(run())
+
+
+class TestRequests:
+    """Latency by route template, excluding background tasks"""
+
+    def test_route_template_and_status(self):
+        labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+        count = sample("http_request_duration_seconds_count", **labels)
+        total = sample("http_request_duration_seconds_sum", **labels)
+
+        get(make_app(), "/items/1", "/items/2")
+
+        assert sample("http_request_duration_seconds_count", **labels) == count + 2
+        # Each request scheduled a 0.3s background task after its response
+        assert sample("http_request_duration_seconds_sum", **labels) - total < 0.3
+
+    def test_unmatched_paths_share_one_label(self):
+        labels = {"method": "GET", "route": metrics.UNMATCHED_ROUTE, "status": "404"}
+        count = sample("http_request_duration_seconds_count", **labels)
+        get(make_app(), "/wp-login.php", "/.env")
+        assert sample("http_request_duration_seconds_count", **labels) == count + 2
+
+    def test_exposition_format(self):
+        response, = get(make_app(), "/metrics")
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "http_request_duration_seconds_bucket" in response.text
+
+
+class StubPage(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestScrape:
+    def test_stages_and_bytes(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubPage)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        before = {stage: sample("scrape_stage_duration_seconds_count", stage=stage)
+                  for stage in ("fetch", "parse", "extract")}
+        html_bytes = sample("scrape_html_bytes_total")
+        try:
+            success, _ = scrape_website(f"http://127.0.0.1:{server.server_port}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert success
+        for stage, count in before.items():
+            assert sample("scrape_stage_duration_seconds_count", stage=stage) == count + 1
+        assert sample("scrape_html_bytes_total") == html_bytes + len(PAGE)
+        assert sample("scrapes_total", outcome="success") >= 1
+
+
+class TestMongo:
+    def test_commands_timed_by_collection(self):
+        timer = MongoCommandTimer()
+        count = sample("mongo_command_duration_seconds_count", command="find", collection="analyses")
+        failures = sample("mongo_command_failures_total", command="getMore", collection="analyses")
+
+        timer.started(SimpleNamespace(command_name="find", command={"find": "analyses"}, request_id=1, operation_id=1))
+        timer.succeeded(SimpleNamespace(command_name="find", duration_micros=1500, request_id=1, operation_id=1))
+        timer.started(SimpleNamespace(command_name="getMore", command={"getMore": 42, "collection": "analyses"},
+                                      request_id=2, operation_id=1))
+        timer.failed(SimpleNamespace(command_name="getMore", duration_micros=900, request_id=2, operation_id=1))
+
+        assert sample("mongo_command_duration_seconds_count", command="find", collection="analyses") == count + 1
+        assert sample("mongo_command_failures_total", command="getMore", collection="analyses") == failures + 1
+        assert timer._collections == {}
+
+
+class TestAnalyses:
+    def test_queued_then_in_progress(self):
+        queued = sample("analyses_queued")
+        running = sample("analyses_in_progress")
+        analyses_queued(2)
+        with analysis_running():
+            assert sample("analyses_queued") == queued + 1
+            assert sample("analyses_in_progress") == running + 1
+        assert sample("analyses_in_progress") == running
+        with analysis_running():
+            pass
+        assert sample("analyses_queued") == queued
+
+
+class TestFallbacks:
+    def test_rule_based_suggestions_are_counted(self):
+        count = sample("fallback_activations_total", path="suggestions")
+        generate_fallback_suggestions({"seo_score": 40}, {})
+        assert sample("fallback_activations_total", path="suggestions") == count + 1
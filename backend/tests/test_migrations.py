@@ -0,0 +1,38 @@
+"""
+Offline tests for startup migrations: each runs once, failures retry next boot
+"""
+
+import asyncio
+
+import migrations
+from benchmarks.memory_db import MemoryDatabase
+
+
+class TestStartupMigrations:
+    """Completion is recorded so later boots skip the full-collection backfills"""
+
+    def test_runs_once_and_retries_failures(self, monkeypatch):
+        calls = []
+
+        async def summaries(db):
+            calls.append("analysis-summaries")
+            return 3
+
+        async def expiry(db):
+            calls.append("expiry")
+            if calls.count("expiry") == 1:
+                raise RuntimeError("primary stepped down")
+            return 0
+
+        monkeypatch.setitem(migrations.MIGRATIONS, "analysis-summaries", summaries)
+        monkeypatch.setitem(migrations.MIGRATIONS, "expiry", expiry)
+
+        async def run():
+            db = MemoryDatabase()
+            for _ in range(3):
+                await migrations.run_startup_migrations(db)
+            return await db.migrations.find({}, {"_id": 0, "completed_at": 0}).sort("name", 1).to_list(None)
+
+        recorded = asyncio.run(run())
+        assert calls == ["analysis-summaries", "expiry", "expiry"]
+        assert recorded == [{"name": "analysis-summaries", "result": 3}, {"name": "expiry", "result": 0}]
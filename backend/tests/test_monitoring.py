@@ -0,0 +1,130 @@
+"""
+Offline tests for monitoring schedule computation, the scheduler loop and
+competitor snapshots
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import batch_analysis
+import monitoring
+from artifact_store import unpack
+from benchmarks.memory_db import MemoryDatabase
+from monitoring import (
+    SnapshotScraper, compute_next_run, is_valid_cron, monitoring_loop, parse_offpeak_window, shift_to_offpeak
+)
+
+
+class TestScheduleComputation:
+    """Cron, off-peak window and jitter handling"""
+
+    def test_cron_validation(self):
+        assert is_valid_cron("0 3 * * 1")
+        assert not is_valid_cron("not a cron")
+        assert not is_valid_cron("0 3 * * 1 2026")
+
+    def test_daytime_run_moves_to_offpeak(self):
+        window = parse_offpeak_window("1-6")
+        monday_9am = datetime(2026, 1, 5, 9, 0, tzinfo=timezone.utc)
+        assert shift_to_offpeak(monday_9am, window) == datetime(2026, 1, 6, 1, 0, tzinfo=timezone.utc)
+
+    def test_wrapping_window(self):
+        window = parse_offpeak_window("22-5")
+        late = datetime(2026, 1, 5, 23, 30, tzinfo=timezone.utc)
+        afternoon = datetime(2026, 1, 5, 15, 0, tzinfo=timezone.utc)
+        assert shift_to_offpeak(late, window) == late
+        assert shift_to_offpeak(afternoon, window) == datetime(2026, 1, 5, 22, 0, tzinfo=timezone.utc)
+
+    def test_next_run_jitter_stays_bounded(self):
+        after = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        base = compute_next_run("0 2 * * 1", after, jitter_seconds=0)
+        assert base == datetime(2026, 1, 5, 2, 0, tzinfo=timezone.utc)
+        for _ in range(20):
+            jittered = compute_next_run("0 2 * * 1", after, jitter_seconds=600)
+            assert 0 <= (jittered - base).total_seconds() <= 600
+
+    def test_jitter_never_leaves_offpeak_window(self):
+        window = parse_offpeak_window("1-6")
+        after = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for _ in range(50):
+            # 05:55 is inside the window; 15 minutes of jitter would end past 06:00
+            run = compute_next_run("55 5 * * *", after, jitter_seconds=900, offpeak=window)
+            assert datetime(2026, 1, 1, 5, 55, tzinfo=timezone.utc) <= run < datetime(2026, 1, 1, 6, 0, tzinfo=timezone.utc)
+
+
+class TestSchedulerLoop:
+    """Schedules are claimed only when there is capacity to run them"""
+
+    def test_claims_no_more_than_free_slots(self, monkeypatch):
+        monkeypatch.setattr(monitoring, "MONITOR_MAX_CONCURRENCY", 2)
+        monkeypatch.setattr(monitoring, "MONITOR_JITTER_SECONDS", 0)
+        db = MemoryDatabase()
+        due = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+
+        async def run():
+            await db.monitoring_schedules.insert_many([
+                {"id": f"s{i}", "active": True, "cron": "0 3 * * *", "next_run_at": due} for i in range(5)
+            ])
+            release = asyncio.Event()
+            started = []
+
+            async def rerun(schedule):
+                started.append(schedule["id"])
+                await release.wait()
+
+            loop = asyncio.create_task(monitoring_loop(db, rerun))
+            await asyncio.sleep(0.05)
+            claimed_while_busy = await db.monitoring_schedules.count_documents({"next_run_at": {"$gt": due}})
+            runs_while_busy = len(started)
+            release.set()
+            await asyncio.sleep(0.05)
+            loop.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await loop
+            return claimed_while_busy, runs_while_busy, started
+
+        claimed_while_busy, runs_while_busy, started = asyncio.run(run())
+        assert claimed_while_busy == 2 and runs_while_busy == 2
+        assert sorted(started) == [f"s{i}" for i in range(5)]
+
+
+class TestSnapshots:
+    """Every scraper run writes snapshots; only re-audits read them"""
+
+    def test_batch_scrapes_write_without_reading(self, monkeypatch):
+        fetched = []
+
+        def scrape(url):
+            fetched.append(url)
+            return True, {"title": f"fresh {url}"}
+
+        monkeypatch.setattr(batch_analysis, "scrape_website", scrape)
+        db = MemoryDatabase()
+
+        async def run():
+            await db.competitor_snapshots.insert_one({
+                "url": "https://rival.com", "data": {"title": "old"}, "scraped_at": datetime.now(timezone.utc).isoformat()
+            })
+            await SnapshotScraper(db, reuse=False).scrape("https://rival.com")
+            return await db.competitor_snapshots.find_one({"url": "https://rival.com"})
+
+        snapshot = asyncio.run(run())
+        assert fetched == ["https://rival.com"]
+        assert unpack(snapshot["data"]) == {"title": "fresh https://rival.com"}
+
+    def test_reaudit_reuses_recent_snapshot(self, monkeypatch):
+        fetched = []
+        monkeypatch.setattr(batch_analysis, "scrape_website", lambda url: fetched.append(url) or (True, {"title": "live"}))
+        db = MemoryDatabase()
+
+        async def run():
+            await SnapshotScraper(db, reuse=False).scrape("https://rival.com")
+            scraper = SnapshotScraper(db, live_urls=["https://mysite.com"])
+            await scraper.scrape("https://rival.com")
+            await scraper.scrape("https://mysite.com")
+            return scraper.snapshot_hits
+
+        assert asyncio.run(run()) == 1
+        assert fetched == ["https://rival.com", "https://mysite.com"]
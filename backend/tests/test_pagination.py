@@ -0,0 +1,34 @@
+"""
+Offline tests for keyset pagination cursors
+"""
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter, next_cursor
+
+
+class TestCursor:
+    """Cursor encoding and the filters built from it"""
+
+    def test_round_trip(self):
+        doc = {"created_at": "2026-02-01T10:00:00+00:00", "id": "abc-123"}
+        assert decode_cursor(encode_cursor(doc)) == (doc['created_at'], doc['id'])
+
+    def test_invalid_cursor_rejected(self):
+        with pytest.raises(InvalidCursor):
+            decode_cursor("not-a-cursor")
+
+    def test_filter_continues_after_position(self):
+        cursor = encode_cursor({"created_at": "2026-02-01T10:00:00+00:00", "id": "b"})
+        query = keyset_filter({"user_id": "u1"}, cursor)
+        assert query["user_id"] == "u1"
+        assert query["$or"] == [
+            {"created_at": {"$lt": "2026-02-01T10:00:00+00:00"}},
+            {"created_at": "2026-02-01T10:00:00+00:00", "id": {"$lt": "b"}},
+        ]
+        assert keyset_filter({"user_id": "u1"}, None) == {"user_id": "u1"}
+
+    def test_next_cursor_only_on_full_page(self):
+        page = [{"created_at": f"2026-02-0{i}", "id": str(i)} for i in range(1, 4)]
+        assert next_cursor(page, 5) is None
+        assert decode_cursor(next_cursor(page, 3)) == ("2026-02-03", "3")
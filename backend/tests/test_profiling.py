@@ -0,0 +1,157 @@
+"""
+Offline tests for the slow path profiler: sampling, thresholds, worker
+threads, storage and the admin guard
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+import auth
+import profiling
+from benchmarks.memory_db import MemoryDatabase
+from profiling import (
+    ProfilingMiddleware, collapsed_text, flush_profiles, get_profile, note_page, profile_session,
+    profiled_thread, recent_profiles
+)
+from timing import collect_timings, stage
+
+
+@pytest.fixture(autouse=True)
+def sampled(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_INTERVAL_MS", 1.0)
+    profiling._pending.clear()
+    yield
+    profiling._pending.clear()
+
+
+def busy_extract(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(200))
+
+
+def kept():
+    return list(profiling._pending)
+
+
+class TestSessions:
+    """Only sessions past their threshold are kept, with their stacks and pages"""
+
+    def test_slow_session_keeps_stacks(self):
+        with collect_timings():
+            with profile_session("analysis", "run_analysis", 50, analysis_id="a1", url="https://slow.example"):
+                note_page("https://slow.example", 2_000_000)
+                with stage("extract"):
+                    busy_extract(0.2)
+
+        [doc] = kept()
+        assert doc["kind"] == "analysis"
+        assert doc["analysis_id"] == "a1"
+        assert doc["pages"] == [{"url": "https://slow.example", "bytes": 2_000_000}]
+        assert doc["page_bytes"] == 2_000_000
+        assert doc["duration_ms"] >= 200
+        assert doc["timings"]["extract"] >= 200
+        assert doc["samples"] > 0
+        assert any("busy_extract" in entry["stack"] for entry in doc["stacks"])
+
+    def test_fast_session_is_dropped(self):
+        with profile_session("analysis", "run_analysis", 10_000):
+            note_page("https://fast.example", 100)
+        assert kept() == []
+
+    def test_disabled_or_unsampled(self, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.0)
+        with profile_session("analysis", "run_analysis", 0) as profile:
+            assert profile is None
+            note_page("https://example.com", 100)
+        assert kept() == []
+
+    def test_worker_threads_are_sampled(self):
+        def scrape():
+            with profiled_thread():
+                busy_extract(0.15)
+
+        async def run():
+            with profile_session("analysis", "run_analysis", 50):
+                await asyncio.to_thread(scrape)
+
+        asyncio.run(run())
+        [doc] = kept()
+        assert any("busy_extract" in entry["stack"] for entry in doc["stacks"])
+
+    def test_job_started_by_a_request_reports_to_itself(self, monkeypatch):
+        with profile_session("request", "/api/analyze", 0):
+            monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.0)
+            with profile_session("analysis", "run_analysis", 0):
+                note_page("https://job.example", 100)
+        [request] = kept()
+        assert request["pages"] == []
+
+
+class TestMiddleware:
+    def test_slow_request_is_named_by_route(self, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE_REQUEST_THRESHOLD_MS", 50)
+        app = FastAPI()
+
+        @app.get("/audit/{site}")
+        async def audit(site: str):
+            busy_extract(0.1)
+            return {"site": site}
+
+        @app.get("/health")
+        async def health():
+            return {"ok": True}
+
+        app.add_middleware(ProfilingMiddleware)
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await client.get("/audit/acme")
+                await client.get("/health")
+
+        asyncio.run(run())
+        [doc] = kept()
+        assert doc["kind"] == "request"
+        assert doc["name"] == "/audit/{site}"
+        assert doc["path"] == "/audit/acme"
+        assert doc["method"] == "GET"
+
+
+class TestStorage:
+    def test_flush_and_list(self):
+        db = MemoryDatabase()
+        for name in ("first", "second"):
+            with profile_session("analysis", name, 0):
+                busy_extract(0.02)
+        with profile_session("request", "/api/analyze", 0):
+            busy_extract(0.02)
+
+        async def run():
+            assert await flush_profiles(db) == 3
+            assert await flush_profiles(db) == 0
+            listed = await recent_profiles(db, 10, "analysis")
+            full = await get_profile(db, listed[0]["id"])
+            return listed, full
+
+        listed, full = asyncio.run(run())
+        assert [doc["name"] for doc in listed] == ["second", "first"]
+        assert "stacks" not in listed[0]
+        lines = collapsed_text(full).splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+class TestAdminGuard:
+    def test_only_listed_emails(self, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_EMAILS", {"ops@example.com"})
+        admin = {"id": "u1", "email": "Ops@example.com"}
+        assert asyncio.run(auth.get_admin_user(admin)) is admin
+        with pytest.raises(HTTPException) as denied:
+            asyncio.run(auth.get_admin_user({"id": "u2", "email": "user@example.com"}))
+        assert denied.value.status_code == 403
@@ -0,0 +1,223 @@
+"""
+Offline tests for the record/replay harness: traffic recorded from local
+stub servers must replay identically once the servers are gone
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import llm_cache
+import llm_client
+import llm_engine
+import llm_resilience
+from llm_resilience import EMERGENT
+from replay import RECORD, CassetteMiss, HttpRecorder, Latency, llm_signature, replaying
+from scraper import scrape_website
+
+PAGE = (
+    "<html><head><title>Acme Widgets</title><meta name=\"description\" content=\"Widgets for every job\"></head>"
+    "<body><h1>Acme</h1><p>" + "Industrial widgets and parts. " * 40 + "</p><img src=\"a.png\"></body></html>"
+)
+
+
+class StubSite(BaseHTTPRequestHandler):
+    """A site page plus an OpenAI-style /v1/chat/completions"""
+
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        payload = PAGE.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Cache-Control", "max-age=60")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        type(self).hits += 1
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        reply = f"echo: {body['messages'][-1]['content']}"
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for word in reply.split(" "):
+                chunk = {
+                    "id": "c1", "object": "chat.completion.chunk", "created": 0, "model": body['model'],
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(0.02)
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        payload = json.dumps({
+            "id": "c1", "object": "chat.completion", "created": 0, "model": body['model'],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": reply}}],
+            "usage": {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_site(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSite)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubSite.hits = 0
+    monkeypatch.setattr(llm_client, 'LLM_MAX_RETRIES', 0)
+    monkeypatch.setenv("NVIDIA_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setenv("NVIDIA_API_KEY", "test-key")
+    llm_resilience.reset_providers()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+    llm_resilience.reset_providers()
+
+
+def without_timing(data):
+    return {k: v for k, v in data.items() if k != 'speed'}
+
+
+class TestHttp:
+    """Scrapes replay from the cassette, not the network"""
+
+    def test_recorded_scrape_replays_offline(self, stub_site, tmp_path):
+        cassette = str(tmp_path / "site.json")
+        with replaying(cassette, mode=RECORD):
+            recorded_ok, recorded = scrape_website(stub_site)
+        hits = StubSite.hits
+
+        with replaying(cassette, latency="none"):
+            replayed_ok, replayed = scrape_website(stub_site)
+
+        assert recorded_ok and replayed_ok
+        assert StubSite.hits == hits
+        assert without_timing(replayed) == without_timing(recorded)
+        assert replayed['speed']['page_size_kb'] == recorded['speed']['page_size_kb']
+        assert not isinstance(requests.get, HttpRecorder)
+
+    def test_unrecorded_url_fails_like_an_offline_host(self, stub_site, tmp_path):
+        cassette = str(tmp_path / "site.json")
+        with replaying(cassette, mode=RECORD):
+            scrape_website(stub_site)
+
+        with replaying(cassette, latency="none"):
+            with pytest.raises(CassetteMiss):
+                requests.get("https://elsewhere.example")
+            success, data = scrape_website("https://elsewhere.example")
+        assert not success
+        assert "connect" in data['error'].lower()
+
+    def test_recorded_latency_is_replayed(self, stub_site, tmp_path):
+        cassette = str(tmp_path / "site.json")
+        with replaying(cassette, mode=RECORD):
+            scrape_website(stub_site)
+        with open(cassette) as f:
+            data = json.load(f)
+        data['entries'][0]['elapsed'] = 0.3
+        with open(cassette, 'w') as f:
+            json.dump(data, f)
+
+        with replaying(cassette):
+            started = time.monotonic()
+            requests.get(stub_site)
+            assert time.monotonic() - started >= 0.3
+        with replaying(cassette, latency="scale:0.1"):
+            started = time.monotonic()
+            requests.get(stub_site)
+            assert time.monotonic() - started < 0.2
+
+
+class TestNvidia:
+    """Completions and streams through the shared client"""
+
+    def test_completion_and_stream_replay_offline(self, stub_site, tmp_path):
+        cassette = str(tmp_path / "llm.json")
+        messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "hello there"}]
+
+        async def run():
+            try:
+                completion = await llm_client.chat_completion(messages, call_site="chatbot")
+                chunks = [c async for c in llm_client.stream_chat_completion(messages, call_site="seo_fixes")]
+                return completion.choices[0].message.content, "".join(chunks)
+            finally:
+                await llm_client.close_llm_client()
+
+        with replaying(cassette, mode=RECORD):
+            recorded = asyncio.run(run())
+        hits = StubSite.hits
+
+        with replaying(cassette, latency="none"):
+            replayed = asyncio.run(run())
+
+        assert replayed == recorded == ("echo: hello there", "echo: hello there ")
+        assert StubSite.hits == hits
+
+    def test_signature_match_covers_changed_prompts(self, stub_site, tmp_path):
+        cassette = str(tmp_path / "llm.json")
+
+        async def ask(text):
+            try:
+                completion = await llm_client.chat_completion(
+                    [{"role": "system", "content": "Be brief."}, {"role": "user", "content": text}]
+                )
+                return completion.choices[0].message.content
+            finally:
+                await llm_client.close_llm_client()
+
+        with replaying(cassette, mode=RECORD):
+            asyncio.run(ask("load time 1.84s"))
+        with replaying(cassette, latency="none"):
+            assert asyncio.run(ask("load time 1.91s")) == "echo: load time 1.84s"
+
+
+class TestEmergent:
+    """LlmChat replies replay without emergentintegrations installed"""
+
+    def test_suggestions_replay_by_signature(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(llm_cache, 'LLM_CACHE_ENABLED', False)
+        monkeypatch.setattr(llm_engine, 'LLM_SUGGESTIONS_MODE', 'single')
+        monkeypatch.setenv("EMERGENT_LLM_KEY", "replay")
+        model = "/".join(llm_engine.SUGGESTIONS_MODEL)
+        cassette = tmp_path / "emergent.json"
+        cassette.write_text(json.dumps({"version": 1, "entries": [{
+            "kind": "llm", "provider": EMERGENT, "model": model, "key": None,
+            "signature": llm_signature(EMERGENT, model, llm_engine.SUGGESTIONS_SYSTEM_MESSAGE),
+            "response": json.dumps({"summary": "Recorded analysis", "action_items": ["Fix titles (High Impact)"]}),
+            "elapsed": 0.2
+        }]}))
+
+        scores = {"seo_score": 40, "speed_score": 50, "content_score": 60, "ux_score": 70, "overall_score": 55}
+        with replaying(str(cassette), latency="fixed:0.05"):
+            started = time.monotonic()
+            result = asyncio.run(llm_engine.generate_ai_suggestions("https://acme.example", scores, [], {}))
+            elapsed = time.monotonic() - started
+
+        assert result == ("Recorded analysis", ["Fix titles (High Impact)"])
+        assert 0.05 <= elapsed < 0.2
+
+
+class TestLatency:
+    def test_specs(self):
+        assert Latency("recorded").seconds(1.5) == 1.5
+        assert Latency("none").seconds(1.5) == 0
+        assert Latency("fixed:0.2").seconds(1.5) == 0.2
+        assert Latency("scale:2").seconds(1.5) == 3.0
+        with pytest.raises(ValueError):
+            Latency("jitter")
@@ -0,0 +1,40 @@
+"""
+Offline tests for retention expiry and the JSONL archive export
+"""
+
+import gzip
+from datetime import datetime, timedelta, timezone
+
+from bson import json_util
+
+import retention
+
+
+class TestExpiry:
+    """expires_at values driving the TTL index"""
+
+    def test_pending_and_failed_windows(self, monkeypatch):
+        now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        monkeypatch.setattr(retention, 'ABANDONED_RETENTION_HOURS', 24)
+        monkeypatch.setattr(retention, 'FAILED_RETENTION_DAYS', 7)
+        assert retention.pending_expiry(now) == now + timedelta(hours=24)
+        assert retention.failed_expiry(now) == now + timedelta(days=7)
+
+    def test_union_targets_archive(self):
+        stage = retention.union_archive("analyses", {"user_id": "u1"})
+        assert stage == {"$unionWith": {"coll": "analyses_archive", "pipeline": [{"$match": {"user_id": "u1"}}]}}
+
+
+class TestExport:
+    """Gzipped JSONL copies of archived documents"""
+
+    def test_appends_round_trip(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(retention, 'ARCHIVE_EXPORT_DIR', str(tmp_path))
+        retention._export_jsonl("analyses", [{"id": "a1", "blob": b"\x00\x01"}])
+        retention._export_jsonl("analyses", [{"id": "a2"}])
+
+        [path] = tmp_path.glob("analyses-*.jsonl.gz")
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            docs = [json_util.loads(line) for line in f]
+        assert [d['id'] for d in docs] == ["a1", "a2"]
+        assert docs[0]['blob'] == b"\x00\x01"
@@ -0,0 +1,142 @@
+"""
+Offline tests for per-request stage timing and the Server-Timing header
+"""
+
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import requests
+from fastapi import FastAPI
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from llm_accounting import track_llm_call
+from scraper import scrape_website
+from timing import MongoStageTimer, ServerTimingMiddleware, collect_timings, current_timings, stage
+
+
+def parse_header(value):
+    entries = {}
+    for part in value.split(", "):
+        name, duration = part.split(";dur=")
+        entries[name] = float(duration)
+    return entries
+
+
+class TestStages:
+    """Stages add up per collector, across threads, and are free without one"""
+
+    def test_stages_accumulate(self):
+        with collect_timings() as timings:
+            for _ in range(2):
+                with stage("fetch"):
+                    time.sleep(0.02)
+            with stage("parse"):
+                pass
+        result = timings.as_dict()
+        assert list(result) == ["fetch", "parse", "total"]
+        assert result["fetch"] >= 40
+        assert result["total"] >= result["fetch"]
+
+    def test_threads_report_to_the_caller(self):
+        @stage("extract")
+        def extract():
+            time.sleep(0.02)
+
+        async def run():
+            with collect_timings() as timings:
+                await asyncio.gather(asyncio.to_thread(extract), asyncio.to_thread(extract))
+                return timings.as_dict()
+
+        assert asyncio.run(run())["extract"] >= 40
+
+    def test_no_collector(self):
+        with stage("fetch"):
+            pass
+        assert current_timings() is None
+
+    def test_llm_and_db(self):
+        with collect_timings() as timings:
+            with track_llm_call("nvidia", "chatbot", "test-model", "hello") as call:
+                call.add_output("hi")
+                time.sleep(0.01)
+            MongoStageTimer().succeeded(SimpleNamespace(duration_micros=2500))
+        result = timings.as_dict()
+        assert result["llm"] >= 10
+        assert result["db"] == 2.5
+
+
+class TestServerTiming:
+    def test_header(self):
+        app = FastAPI()
+
+        @app.get("/audit")
+        async def audit():
+            with stage("fetch"):
+                await asyncio.sleep(0.02)
+            with stage("score"):
+                pass
+            return {"ok": True}
+
+        app.add_middleware(ServerTimingMiddleware)
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/audit")
+
+        response = asyncio.run(run())
+        entries = parse_header(response.headers["server-timing"])
+        assert list(entries) == ["fetch", "score", "total"]
+        assert entries["fetch"] >= 20
+        assert entries["total"] >= entries["fetch"]
+
+
+class StubPage(BaseHTTPRequestHandler):
+    def do_GET(self):
+        page = b"<html><head><title>Acme</title></head><body><h1>Acme</h1></body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestConnectStage:
+    """The scraper's own connections are timed; urllib3 is left alone for everyone else"""
+
+    def test_scraper_connections_only(self, monkeypatch):
+        lookups = []
+        real_getaddrinfo = socket.getaddrinfo
+
+        def counting_getaddrinfo(host, *args, **kwargs):
+            lookups.append(host)
+            return real_getaddrinfo(host, *args, **kwargs)
+
+        monkeypatch.setattr(socket, "getaddrinfo", counting_getaddrinfo)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubPage)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://localhost:{server.server_port}"
+        try:
+            with collect_timings() as scraped:
+                success, _ = scrape_website(url)
+            with collect_timings() as plain:
+                requests.get(url)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert success
+        assert lookups.count("localhost") == 2
+        assert "connect" in scraped.as_dict()
+        assert "connect" not in plain.as_dict()
+        assert HTTPConnectionPool.ConnectionCls is HTTPConnection
+        assert HTTPSConnectionPool.ConnectionCls is HTTPSConnection
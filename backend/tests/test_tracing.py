@@ -0,0 +1,116 @@
+"""
+Offline tests for tracing: log correlation, and with opentelemetry-sdk
+installed, traceparent propagation and the span tree of a scrape
+"""
+
+import asyncio
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from opentelemetry import trace
+
+import tracing
+from scraper import scrape_website
+from tracing import TraceIdFilter, TracingMiddleware, job_span
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+TRACEPARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+PAGE = b"<html><head><title>Acme</title></head><body><h1>Acme</h1><p>Widgets.</p></body></html>"
+
+
+def current_trace_id():
+    record = logging.LogRecord("test", logging.INFO, __file__, 0, "", (), None)
+    TraceIdFilter().filter(record)
+    return record.trace_id
+
+
+class TestLogCorrelation:
+    """Log records carry the trace id of the span they were logged in"""
+
+    def test_trace_id_of_current_span(self):
+        parent = trace.NonRecordingSpan(trace.SpanContext(
+            int(TRACE_ID, 16), 0x00f067aa0ba902b7, is_remote=True, trace_flags=trace.TraceFlags(1)
+        ))
+        with trace.use_span(parent):
+            assert current_trace_id() == TRACE_ID
+        assert current_trace_id() == "-"
+
+
+class StubPage(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def exporter():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    memory = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+    trace.set_tracer_provider(provider)
+    return memory
+
+
+class TestSpans:
+    """The spans an exporter receives"""
+
+    def test_scrape_stages_nest_under_the_job(self, exporter):
+        exporter.clear()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubPage)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with tracing.span("request"):
+                with job_span("analysis", **{"analysis.id": "a1"}):
+                    scrape_website(f"http://127.0.0.1:{server.server_port}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        spans = {s.name: s for s in exporter.get_finished_spans()}
+        job, request = spans["analysis"], spans["request"]
+        assert job.context.trace_id != request.context.trace_id
+        assert [link.context.span_id for link in job.links] == [request.context.span_id]
+        assert spans["scrape"].parent.span_id == job.context.span_id
+        for name in ("scrape.fetch", "scrape.parse", "scrape.extract.seo", "scrape.extract.ux"):
+            assert spans[name].parent.span_id == spans["scrape"].context.span_id
+        assert spans["scrape.fetch"].attributes["http.response.body.size"] == len(PAGE)
+
+    def test_traceparent_continues_into_the_handler(self, exporter):
+        exporter.clear()
+        app = FastAPI()
+
+        @app.get("/check")
+        async def check():
+            return {"trace_id": current_trace_id()}
+
+        app.add_middleware(TracingMiddleware)
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return [
+                    await client.get("/check", headers={"traceparent": TRACEPARENT}),
+                    await client.get("/check")
+                ]
+
+        with_parent, without = asyncio.run(run())
+        assert with_parent.json() == {"trace_id": TRACE_ID}
+        assert without.json()["trace_id"] not in ("-", TRACE_ID)
+        server_spans = [s for s in exporter.get_finished_spans() if s.name == "GET /check"]
+        assert len(server_spans) == 2
+        assert server_spans[0].attributes["http.response.status_code"] == 200
@@ -0,0 +1,118 @@
+"""
+Offline tests for the materialized dashboard counters: create, complete,
+delete, rebuild, and runs removed by the retention TTL
+"""
+
+import asyncio
+
+from benchmarks.memory_db import MemoryDatabase
+from user_stats import (
+    get_user_stats, init_user_stats, record_analyses_created, record_analysis_completed,
+    record_analysis_deleted, rebuild_user_stats
+)
+
+
+def analysis(analysis_id, status="pending", score=None, user_id="u1"):
+    doc = {"id": analysis_id, "user_id": user_id, "status": status}
+    if score is not None:
+        doc["user_site_scores"] = {"overall_score": score}
+    return doc
+
+
+async def create(db, *ids):
+    await db.analyses.insert_many([analysis(analysis_id) for analysis_id in ids])
+    await record_analyses_created(db, "u1", len(ids))
+
+
+async def complete(db, analysis_id, score):
+    await db.analyses.update_one(
+        {"id": analysis_id},
+        {"$set": {"status": "completed", "user_site_scores": {"overall_score": score}}}
+    )
+    await record_analysis_completed(db, "u1", score)
+
+
+async def counters(db):
+    stats = await get_user_stats(db, "u1")
+    return {k: v for k, v in stats.items() if k not in ("user_id", "updated_at")}
+
+
+class TestCounters:
+    """Incremental updates on the write paths"""
+
+    def test_create_and_complete(self):
+        async def run():
+            db = MemoryDatabase()
+            await init_user_stats(db, "u1")
+            await create(db, "a1", "a2")
+            await complete(db, "a1", 60)
+            await complete(db, "a2", 80)
+            return await counters(db)
+
+        assert asyncio.run(run()) == {
+            "total_analyses": 2, "completed_analyses": 2, "score_sum": 140, "best_score": 80
+        }
+
+    def test_delete_recomputes_scores(self):
+        async def run():
+            db = MemoryDatabase()
+            await init_user_stats(db, "u1")
+            await create(db, "a1", "a2")
+            await complete(db, "a1", 60)
+            await complete(db, "a2", 80)
+            await db.analyses.delete_one({"id": "a2"})
+            await record_analysis_deleted(db, "u1")
+            return await counters(db)
+
+        assert asyncio.run(run()) == {
+            "total_analyses": 1, "completed_analyses": 1, "score_sum": 60, "best_score": 60
+        }
+
+
+class TestExpiredRuns:
+    """Runs removed by the TTL stay in the total on every path"""
+
+    def test_delete_after_expiry_keeps_expired_runs(self):
+        async def run():
+            db = MemoryDatabase()
+            await init_user_stats(db, "u1")
+            await create(db, "a1", "failed", "abandoned")
+            await complete(db, "a1", 70)
+            # What the TTL index does: the documents go, the counters aren't told
+            await db.analyses.delete_many({"id": {"$in": ["failed", "abandoned"]}})
+            before = await counters(db)
+            await create(db, "a2")
+            await db.analyses.delete_one({"id": "a2"})
+            await record_analysis_deleted(db, "u1")
+            return before, await counters(db)
+
+        before, after = asyncio.run(run())
+        assert before["total_analyses"] == 3
+        assert after == before
+
+    def test_rebuild_counts_what_is_stored(self):
+        async def run():
+            db = MemoryDatabase()
+            await db.analyses.insert_many([
+                analysis("a1", "completed", 50),
+                analysis("a2", "failed"),
+                analysis("other", "completed", 99, user_id="u2"),
+            ])
+            await db.analyses_archive.insert_one(analysis("old", "completed", 90))
+            return await rebuild_user_stats(db, "u1"), await counters(db)
+
+        rebuilt, stored = asyncio.run(run())
+        assert rebuilt == {"total_analyses": 3, "completed_analyses": 2, "score_sum": 140, "best_score": 90}
+        assert stored == rebuilt
+
+    def test_missing_counters_are_backfilled(self):
+        async def run():
+            db = MemoryDatabase()
+            await db.analyses.insert_one(analysis("a1", "completed", 40))
+            # Without a counter document the write paths leave nothing half-counted
+            await record_analyses_created(db, "u1")
+            return await counters(db)
+
+        assert asyncio.run(run()) == {
+            "total_analyses": 1, "completed_analyses": 1, "score_sum": 40, "best_score": 40
+        }
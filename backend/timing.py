@@ -0,0 +1,131 @@
+"""
+SITERANK AI - Stage Timing
+Splits a request's or job's wall time into connect, fetch, parse, extract,
+score, llm and db. Requests get it back as a Server-Timing header; analyses
+and optimizations store it in their timings field.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+
+# Header and stored order; stages can overlap (connect is part of fetch, parallel scrapes, db reads inside an LLM cache lookup)
+STAGES = ("connect", "fetch", "parse", "extract", "score", "llm", "db")
+
+
+class StageTimings:
+    """Milliseconds per stage for one request or job; scrape threads add to it too"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._ms: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._ms[stage] = self._ms.get(stage, 0.0) + seconds * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stages that ran, plus total wall time so far"""
+        with self._lock:
+            timings = {stage: round(self._ms[stage], 1) for stage in STAGES if stage in self._ms}
+        timings['total'] = round((time.perf_counter() - self.started) * 1000, 1)
+        return timings
+
+    def header(self) -> str:
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.as_dict().items())
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar('stage_timings', default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[StageTimings]:
+    """Stages timed inside the block (and in tasks and threads started from it) add up here"""
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def collecting() -> bool:
+    return _current.get() is not None
+
+
+def current_timings() -> Optional[Dict[str, float]]:
+    timings = _current.get()
+    return timings.as_dict() if timings is not None else None
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the block (or decorated function) as one stage of the current request or job"""
+    if _current.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+# ==================== HTTP ====================
+
+class ServerTimingMiddleware:
+    """Collects stage timings per request and returns them in a Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with collect_timings() as timings:
+            async def timed_send(message):
+                if message['type'] == 'http.response.start':
+                    message['headers'] = list(message.get('headers', []))
+                    headers = MutableHeaders(raw=message['headers'])
+                    headers.append('Server-Timing', timings.header())
+                await send(message)
+
+            await self.app(scope, receive, timed_send)
+
+
+# ==================== Mongo ====================
+
+class MongoStageTimer(monitoring.CommandListener):
+    """
+    Adds each Mongo command's round trip to the db stage. Motor runs commands
+    with a copy of the caller's context, so the caller's timings are current here.
+    """
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        record_stage("db", event.duration_micros / 1e6)
+
+    def failed(self, event) -> None:
+        record_stage("db", event.duration_micros / 1e6)
@@ -0,0 +1,250 @@
+"""
+SITERANK AI - Tracing
+OpenTelemetry spans for requests, background jobs, scrapes, scoring, LLM
+calls and Mongo commands. Only the API is required; without an exporter
+configured every span is a no-op. TRACING_EXPORTER=otlp|file|console needs
+opentelemetry-sdk (and opentelemetry-exporter-otlp-proto-http for otlp).
+"""
+
+import functools
+import inspect
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from opentelemetry import context, propagate, trace
+from opentelemetry.trace import Link, Span, SpanKind, Status, StatusCode
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# '' (off), otlp (OTEL_EXPORTER_OTLP_ENDPOINT, default http://localhost:4318), file or console
+TRACING_EXPORTER = os.environ.get('TRACING_EXPORTER', '').lower()
+TRACING_FILE = os.environ.get('TRACING_FILE', 'traces.jsonl')
+# Fraction of new traces kept; requests carrying a sampled traceparent are always kept
+TRACING_SAMPLE_RATIO = float(os.environ.get('TRACING_SAMPLE_RATIO', '1.0'))
+SERVICE_NAME = os.environ.get('OTEL_SERVICE_NAME', 'siterank-backend')
+
+# A proxy until configure_tracing installs a provider, so modules can import it early
+tracer = trace.get_tracer("siterank")
+
+
+# ==================== Setup ====================
+
+def _exporter():
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if TRACING_EXPORTER == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if TRACING_EXPORTER == 'file':
+        # One JSON span per line
+        out = open(TRACING_FILE, 'a', encoding='utf-8')
+        return ConsoleSpanExporter(out=out, formatter=lambda finished: finished.to_json(indent=None) + "\n")
+    if TRACING_EXPORTER == 'console':
+        return ConsoleSpanExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER {TRACING_EXPORTER!r}")
+
+
+def configure_tracing() -> bool:
+    """Install the SDK provider and exporter named by TRACING_EXPORTER; False leaves tracing off"""
+    if not TRACING_EXPORTER:
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+        exporter = _exporter()
+    except (ImportError, ValueError) as e:
+        logger.warning(f"Tracing disabled: {str(e)}")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO))
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    logger.info(f"Tracing to {TRACING_EXPORTER} (sample ratio {TRACING_SAMPLE_RATIO})")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still waiting in the batch processor"""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, 'shutdown'):
+        provider.shutdown()
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds trace_id (or '-') to log records so log lines join their trace"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span_context = trace.get_current_span().get_span_context()
+        record.trace_id = format(span_context.trace_id, '032x') if span_context.is_valid else '-'
+        return True
+
+
+def install_log_correlation(fmt: str) -> None:
+    """Switch the root handlers to fmt, which may use %(trace_id)s"""
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(TraceIdFilter())
+        handler.setFormatter(logging.Formatter(fmt))
+
+
+# ==================== Spans ====================
+
+def _attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """A child of the current span; exceptions are recorded on it"""
+    with tracer.start_as_current_span(name, attributes=_attributes(attributes)) as current:
+        yield current
+
+
+@contextmanager
+def job_span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Root span of a background job. A job can outlive the request that started
+    it by minutes, so it gets its own trace with a link back to that request.
+    """
+    origin = trace.get_current_span().get_span_context()
+    links = [Link(origin)] if origin.is_valid else []
+    with tracer.start_as_current_span(
+        name, context=context.Context(), links=links, attributes=_attributes(attributes)
+    ) as current:
+        yield current
+
+
+def traced(name: str):
+    """Decorator running a sync or async function inside span(name)"""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ==================== HTTP ====================
+
+class TracingMiddleware:
+    """
+    A server span per HTTP request, continuing any incoming traceparent. The
+    span ends with the last body chunk; BackgroundTasks still see it as the
+    current span, so the jobs they start link back to the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        method = scope['method']
+        current = tracer.start_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope['path']}
+        )
+        token = context.attach(trace.set_span_in_context(current))
+
+        def finish(status_code: int):
+            if not current.is_recording():
+                return
+            route = getattr(scope.get('route'), 'path', None)
+            if route:
+                current.update_name(f"{method} {route}")
+                current.set_attribute("http.route", route)
+            current.set_attribute("http.response.status_code", status_code)
+            if status_code >= 500:
+                current.set_status(Status(StatusCode.ERROR))
+            current.end()
+
+        status = {"code": 500}
+
+        async def traced_send(message):
+            if message['type'] == 'http.response.start':
+                status["code"] = message['status']
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                finish(status["code"])
+
+        try:
+            await self.app(scope, receive, traced_send)
+        except Exception as e:
+            current.record_exception(e)
+            raise
+        finally:
+            finish(status["code"])
+            context.detach(token)
+
+
+# ==================== Mongo ====================
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """
+    A client span per Mongo command. Motor runs commands on its executor with
+    a copy of the caller's context, so the spans nest under the caller's span.
+    """
+
+    def __init__(self):
+        self._spans: Dict[Tuple[int, int], Span] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> Tuple[int, int]:
+        return event.request_id, event.operation_id
+
+    def started(self, event) -> None:
+        if not trace.get_current_span().get_span_context().is_valid:
+            # Pool maintenance and other commands outside any request or job
+            return
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get('collection')
+        current = tracer.start_span(
+            f"mongo.{event.command_name}",
+            kind=SpanKind.CLIENT,
+            attributes=_attributes({
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.mongodb.collection": target if isinstance(target, str) else None
+            })
+        )
+        with self._lock:
+            self._spans[self._key(event)] = current
+
+    def _finish(self, event) -> Optional[Span]:
+        with self._lock:
+            return self._spans.pop(self._key(event), None)
+
+    def succeeded(self, event) -> None:
+        current = self._finish(event)
+        if current is not None:
+            current.end()
+
+    def failed(self, event) -> None:
+        current = self._finish(event)
+        if current is not None:
+            current.set_status(Status(StatusCode.ERROR, str(event.failure.get('errmsg', ''))[:200]))
+            current.end()
@@ -0,0 +1,120 @@
+"""
+SITERANK AI - Per-User Dashboard Counters
+Materialized analysis counts and score sums, kept current on write.
+
+total_analyses counts every run a user started. Failed and abandoned runs
+still count after retention's TTL index removes them: expiry drops the
+document, not the history, so only an explicit delete takes a run off the
+total. The score counters cover completed runs, which never expire, so they
+can always be recomputed from the stored analyses.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from retention import union_archive
+
+logger = logging.getLogger(__name__)
+
+SCORE_FIELDS = ("completed_analyses", "score_sum", "best_score")
+
+EMPTY_STATS = {
+    "total_analyses": 0,
+    "completed_analyses": 0,
+    "score_sum": 0,
+    "best_score": 0,
+}
+
+
+async def init_user_stats(db, user_id: str) -> None:
+    """Create zeroed counters for a brand-new user"""
+    await db.user_stats.update_one(
+        {"user_id": user_id},
+        {"$setOnInsert": {**EMPTY_STATS, "updated_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+
+
+async def record_analyses_created(db, user_id: str, count: int = 1) -> None:
+    """
+    Count newly created analyses.
+    Counters are only incremented once they exist; users without a counter
+    document are backfilled from the analyses collection on first read.
+    """
+    await db.user_stats.update_one(
+        {"user_id": user_id},
+        {"$inc": {"total_analyses": count}}
+    )
+
+
+async def record_analysis_completed(db, user_id: str, overall_score: int) -> None:
+    """Fold a completed analysis score into the user's running totals"""
+    await db.user_stats.update_one(
+        {"user_id": user_id},
+        {
+            "$inc": {"completed_analyses": 1, "score_sum": overall_score},
+            "$max": {"best_score": overall_score}
+        }
+    )
+
+
+async def record_analysis_deleted(db, user_id: str) -> None:
+    """
+    Take a deleted analysis off the total. Sums and best score can't be
+    decremented, so those are recomputed; the total isn't, since expired runs
+    it still counts are no longer there to recompute it from.
+    """
+    stats = await compute_user_stats(db, user_id)
+    await db.user_stats.update_one(
+        {"user_id": user_id},
+        {
+            "$inc": {"total_analyses": -1},
+            "$set": {
+                **{field: stats[field] for field in SCORE_FIELDS},
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }
+        }
+    )
+
+
+async def compute_user_stats(db, user_id: str) -> Dict[str, Any]:
+    """
+    Compute counters server-side over the user's analyses, archived ones included.
+    Runs that have already expired can't be seen, so the total is a lower bound.
+    """
+    is_completed = {"$eq": ["$status", "completed"]}
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        union_archive("analyses", {"user_id": user_id}),
+        {"$group": {
+            "_id": None,
+            "total_analyses": {"$sum": 1},
+            "completed_analyses": {"$sum": {"$cond": [is_completed, 1, 0]}},
+            "score_sum": {"$sum": {"$cond": [is_completed, {"$ifNull": ["$user_site_scores.overall_score", 0]}, 0]}},
+            "best_score": {"$max": {"$cond": [is_completed, {"$ifNull": ["$user_site_scores.overall_score", 0]}, 0]}},
+        }},
+        {"$project": {"_id": 0}}
+    ]
+    rows = await db.analyses.aggregate(pipeline).to_list(length=1)
+    return rows[0] if rows else dict(EMPTY_STATS)
+
+
+async def rebuild_user_stats(db, user_id: str) -> Dict[str, Any]:
+    """Recompute and store a user's counters; used to backfill users without any"""
+    stats = await compute_user_stats(db, user_id)
+    await db.user_stats.update_one(
+        {"user_id": user_id},
+        {"$set": {**stats, "updated_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+    return stats
+
+
+async def get_user_stats(db, user_id: str) -> Dict[str, Any]:
+    """Read a user's counters, backfilling them if they don't exist yet"""
+    stats = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0})
+    if stats is None:
+        logger.info(f"Backfilling dashboard counters for user {user_id}")
+        stats = await rebuild_user_stats(db, user_id)
+    return stats
@@ -16,6 +16,8 @@ export default function ChatBot() {
   const [input, setInput] = useState('');
   const [isTyping, setIsTyping] = useState(false);
   const messagesEndRef = useRef(null);
+  // History lives server-side; each turn only sends the new message
+  const sessionIdRef = useRef(null);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -25,56 +27,113 @@ export default function ChatBot() {
     scrollToBottom();
   }, [messages]);
 
-  const handleSend = async () => {
-    if (!input.trim() || isTyping) return;
+  const createSession = async () => {
+    const response = await fetch(`${API_URL}/api/chatbot/sessions`, { method: 'POST' });
+    if (!response.ok) {
+      throw new Error('Failed to start chat session');
+    }
+    const data = await response.json();
+    sessionIdRef.current = data.session_id;
+  };
 
-    const userMessage = input.trim();
-    setInput('');
-    
+  const postMessage = (content) => fetch(
+    `${API_URL}/api/chatbot/sessions/${sessionIdRef.current}/messages`,
+    {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ content, stream: true }),
+    }
+  );
+
+  // Streams the session reply into a new bot message as tokens arrive
+  const streamReply = async (content) => {
+    if (!sessionIdRef.current) {
+      await createSession();
+    }
+    let response = await postMessage(content);
+    if (response.status === 404) {
+      // Session expired server-side; start a fresh one
+      await createSession();
+      response = await postMessage(content);
+    }
+
+    if (!response.ok || !response.body) {
+      throw new Error('Failed to get response');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const replyId = Date.now();
+    let buffer = '';
+    let started = false;
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Server-Sent Events are separated by a blank line
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const raw of events) {
+        const event = raw.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}');
+        if (event === 'error') {
+          throw new Error(data.detail || 'Failed to get response');
+        }
+        if (event === 'token') {
+          if (!started) {
+            started = true;
+            setMessages(prev => [...prev, { type: 'bot', id: replyId, text: data.content }]);
+          } else {
+            setMessages(prev => prev.map(m => (
+              m.id === replyId ? { ...m, text: m.text + data.content } : m
+            )));
+          }
+        }
+      }
+    }
+
+    if (!started) {
+      throw new Error('Empty response');
+    }
+  };
+
+  const askBot = async (question, errorText) => {
     // Add user message
-    setMessages(prev => [...prev, { type: 'user', text: userMessage }]);
+    setMessages(prev => [...prev, { type: 'user', text: question }]);
     
-    // Show typing indicator
+    // Typing indicator shows until the first token arrives; input stays locked until the reply ends
     setIsTyping(true);
     
     try {
-      // Build conversation history for API
-      const conversationHistory = messages
-        .filter(m => m.text)
-        .map(m => ({
-          role: m.type === 'user' ? 'user' : 'assistant',
-          content: m.text
-        }));
-      
-      // Add current user message
-      conversationHistory.push({ role: 'user', content: userMessage });
-      
-      const response = await fetch(`${API_URL}/api/chatbot`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ messages: conversationHistory }),
-      });
-      
-      if (!response.ok) {
-        throw new Error('Failed to get response');
-      }
-      
-      const data = await response.json();
-      setMessages(prev => [...prev, { type: 'bot', text: data.response }]);
+      await streamReply(question);
       
     } catch (error) {
       console.error('Chatbot error:', error);
       setMessages(prev => [...prev, { 
         type: 'bot', 
-        text: "I'm having trouble connecting right now. Please try again in a moment, or visit our **Support** page for help." 
+        text: errorText 
       }]);
     } finally {
       setIsTyping(false);
     }
   };
 
+  const handleSend = async () => {
+    if (!input.trim() || isTyping) return;
+
+    const userMessage = input.trim();
+    setInput('');
+    
+    await askBot(
+      userMessage,
+      "I'm having trouble connecting right now. Please try again in a moment, or visit our **Support** page for help."
+    );
+  };
+
   const handleKeyPress = (e) => {
     if (e.key === 'Enter' && !e.shiftKey) {
       e.preventDefault();
@@ -92,44 +151,7 @@ export default function ChatBot() {
     if (isTyping) return;
     setInput('');
     
-    // Add user message
-    setMessages(prev => [...prev, { type: 'user', text: question }]);
-    setIsTyping(true);
-    
-    try {
-      const conversationHistory = messages
-        .filter(m => m.text)
-        .map(m => ({
-          role: m.type === 'user' ? 'user' : 'assistant',
-          content: m.text
-        }));
-      
-      conversationHistory.push({ role: 'user', content: question });
-      
-      const response = await fetch(`${API_URL}/api/chatbot`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ messages: conversationHistory }),
-      });
-      
-      if (!response.ok) {
-        throw new Error('Failed to get response');
-      }
-      
-      const data = await response.json();
-      setMessages(prev => [...prev, { type: 'bot', text: data.response }]);
-      
-    } catch (error) {
-      console.error('Chatbot error:', error);
-      setMessages(prev => [...prev, { 
-        type: 'bot', 
-        text: "I'm having trouble connecting right now. Please try again." 
-      }]);
-    } finally {
-      setIsTyping(false);
-    }
+    await askBot(question, "I'm having trouble connecting right now. Please try again.");
   };
 
   return (
@@ -202,7 +224,7 @@ export default function ChatBot() {
               </div>
             ))}
             
-            {isTyping && (
+            {isTyping && messages[messages.length - 1]?.type !== 'bot' && (
               <div className="flex justify-start">
                 <div className="flex items-center gap-2">
                   <div className="w-7 h-7 rounded-full bg-gray-800 flex items-center justify-center">
@@ -0,0 +1,41 @@
+// Reads an NDJSON fix stream from /api/fix/{category}?stream=true.
+// onFix is called with each fix as soon as the server has parsed it;
+// resolves with the final done event ({ summary, complete, fallback }).
+export async function streamFixes(url, body, onFix) {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error('Failed to generate fixes');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let done = null;
+
+  while (true) {
+    const { done: finished, value } = await reader.read();
+    if (finished) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.fix) {
+        onFix(event.fix);
+      } else if (event.done) {
+        done = event;
+      }
+    }
+  }
+
+  if (!done) {
+    throw new Error('Fix stream ended early');
+  }
+  return done;
+}
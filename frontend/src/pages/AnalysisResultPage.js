@@ -28,11 +28,22 @@ export default function AnalysisResultPage() {
   const [loading, setLoading] = useState(true);
   const [downloading, setDownloading] = useState(false);
   const [reanalyzing, setReanalyzing] = useState(false);
+  const [details, setDetails] = useState(null);
+  const [detailsRequested, setDetailsRequested] = useState(false);
 
   useEffect(() => {
+    setDetails(null);
+    setDetailsRequested(false);
     fetchAnalysis();
   }, [id]);
 
+  useEffect(() => {
+    // Details are only loaded once, when their tab is first opened on a finished analysis
+    if (detailsRequested && analysis?.status === 'completed' && !details) {
+      fetchDetails();
+    }
+  }, [detailsRequested, analysis?.status]);
+
   useEffect(() => {
     // Poll for updates if processing
     let interval;
@@ -64,6 +75,18 @@ export default function AnalysisResultPage() {
     }
   };
 
+  const fetchDetails = async () => {
+    try {
+      const response = await axios.get(
+        `${API_URL}/api/analyses/${id}/details`,
+        { headers: getAuthHeader() }
+      );
+      setDetails(response.data);
+    } catch (error) {
+      toast.error('Failed to load analysis details');
+    }
+  };
+
   const handleReanalyze = async () => {
     setReanalyzing(true);
     try {
@@ -328,6 +351,7 @@ export default function AnalysisResultPage() {
 
   // Prepare chart data
   const scores = analysis.user_site_scores;
+  const siteDetails = details?.user_site || {};
   const comparisonData = [
     { name: 'Your Site', ...scores, fill: 'hsl(var(--primary))' },
     ...analysis.competitors.map((comp, i) => ({
@@ -444,7 +468,11 @@ export default function AnalysisResultPage() {
         </Card>
 
         {/* Tabs */}
-        <Tabs defaultValue="comparison" className="space-y-6">
+        <Tabs
+          defaultValue="comparison"
+          className="space-y-6"
+          onValueChange={(tab) => tab === 'details' && setDetailsRequested(true)}
+        >
           <TabsList className="grid w-full grid-cols-3 lg:w-auto lg:inline-grid">
             <TabsTrigger value="comparison" data-testid="tab-comparison">Comparison</TabsTrigger>
             <TabsTrigger value="suggestions" data-testid="tab-suggestions">AI Suggestions</TabsTrigger>
@@ -617,6 +645,11 @@ export default function AnalysisResultPage() {
 
           {/* Details Tab */}
           <TabsContent value="details" className="space-y-6">
+            {!details && analysis.status === 'completed' && (
+              <div className="flex justify-center py-8">
+                <Loader2 className="w-6 h-6 animate-spin text-primary" />
+              </div>
+            )}
             <div className="grid md:grid-cols-2 gap-6">
               {/* SEO Details */}
               <Card className="bg-card border-border">
@@ -627,13 +660,13 @@ export default function AnalysisResultPage() {
                   </CardTitle>
                 </CardHeader>
                 <CardContent className="space-y-3 text-sm">
-                  <DetailRow label="Title" value={scores.seo_details?.title || 'N/A'} />
-                  <DetailRow label="Title Length" value={`${scores.seo_details?.title_length || 0} chars`} />
-                  <DetailRow label="Meta Description" value={`${scores.seo_details?.meta_description_length || 0} chars`} />
-                  <DetailRow label="H1 Tags" value={scores.seo_details?.h1_count || 0} />
-                  <DetailRow label="H2 Tags" value={scores.seo_details?.h2_count || 0} />
-                  <DetailRow label="Image Alt Ratio" value={`${scores.seo_details?.image_alt_ratio || 0}%`} />
-                  <DetailRow label="Structured Data" value={scores.seo_details?.structured_data ? 'Yes' : 'No'} />
+                  <DetailRow label="Title" value={siteDetails.seo_details?.title || 'N/A'} />
+                  <DetailRow label="Title Length" value={`${siteDetails.seo_details?.title_length || 0} chars`} />
+                  <DetailRow label="Meta Description" value={`${siteDetails.seo_details?.meta_description_length || 0} chars`} />
+                  <DetailRow label="H1 Tags" value={siteDetails.seo_details?.h1_count || 0} />
+                  <DetailRow label="H2 Tags" value={siteDetails.seo_details?.h2_count || 0} />
+                  <DetailRow label="Image Alt Ratio" value={`${siteDetails.seo_details?.image_alt_ratio || 0}%`} />
+                  <DetailRow label="Structured Data" value={siteDetails.seo_details?.structured_data ? 'Yes' : 'No'} />
                 </CardContent>
               </Card>
 
@@ -646,13 +679,13 @@ export default function AnalysisResultPage() {
                   </CardTitle>
                 </CardHeader>
                 <CardContent className="space-y-3 text-sm">
-                  <DetailRow label="Load Time" value={`${scores.speed_details?.load_time || 0}s`} />
-                  <DetailRow label="Page Size" value={`${scores.speed_details?.page_size_kb || 0} KB`} />
-                  <DetailRow label="CSS Files" value={scores.speed_details?.css_files || 0} />
-                  <DetailRow label="JS Files" value={scores.speed_details?.js_files || 0} />
-                  <DetailRow label="Images" value={scores.speed_details?.image_count || 0} />
-                  <DetailRow label="Compression" value={scores.speed_details?.has_compression ? 'Yes' : 'No'} />
-                  <DetailRow label="Caching" value={scores.speed_details?.has_caching ? 'Yes' : 'No'} />
+                  <DetailRow label="Load Time" value={`${siteDetails.speed_details?.load_time || 0}s`} />
+                  <DetailRow label="Page Size" value={`${siteDetails.speed_details?.page_size_kb || 0} KB`} />
+                  <DetailRow label="CSS Files" value={siteDetails.speed_details?.css_files || 0} />
+                  <DetailRow label="JS Files" value={siteDetails.speed_details?.js_files || 0} />
+                  <DetailRow label="Images" value={siteDetails.speed_details?.image_count || 0} />
+                  <DetailRow label="Compression" value={siteDetails.speed_details?.has_compression ? 'Yes' : 'No'} />
+                  <DetailRow label="Caching" value={siteDetails.speed_details?.has_caching ? 'Yes' : 'No'} />
                 </CardContent>
               </Card>
 
@@ -665,12 +698,12 @@ export default function AnalysisResultPage() {
                   </CardTitle>
                 </CardHeader>
                 <CardContent className="space-y-3 text-sm">
-                  <DetailRow label="Word Count" value={scores.content_details?.word_count || 0} />
-                  <DetailRow label="Unique Words" value={scores.content_details?.unique_words || 0} />
-                  <DetailRow label="Paragraphs" value={scores.content_details?.paragraph_count || 0} />
-                  <DetailRow label="Avg Paragraph Length" value={`${scores.content_details?.avg_paragraph_length || 0} words`} />
-                  <DetailRow label="Has Blog" value={scores.content_details?.has_blog ? 'Yes' : 'No'} />
-                  <DetailRow label="Has FAQ" value={scores.content_details?.has_faq ? 'Yes' : 'No'} />
+                  <DetailRow label="Word Count" value={siteDetails.content_details?.word_count || 0} />
+                  <DetailRow label="Unique Words" value={siteDetails.content_details?.unique_words || 0} />
+                  <DetailRow label="Paragraphs" value={siteDetails.content_details?.paragraph_count || 0} />
+                  <DetailRow label="Avg Paragraph Length" value={`${siteDetails.content_details?.avg_paragraph_length || 0} words`} />
+                  <DetailRow label="Has Blog" value={siteDetails.content_details?.has_blog ? 'Yes' : 'No'} />
+                  <DetailRow label="Has FAQ" value={siteDetails.content_details?.has_faq ? 'Yes' : 'No'} />
                 </CardContent>
               </Card>
 
@@ -683,13 +716,13 @@ export default function AnalysisResultPage() {
                   </CardTitle>
                 </CardHeader>
                 <CardContent className="space-y-3 text-sm">
-                  <DetailRow label="Mobile Viewport" value={scores.ux_details?.has_viewport_meta ? 'Yes' : 'No'} />
-                  <DetailRow label="Favicon" value={scores.ux_details?.has_favicon ? 'Yes' : 'No'} />
-                  <DetailRow label="Navigation" value={scores.ux_details?.navigation_elements || 0} />
-                  <DetailRow label="Forms" value={scores.ux_details?.form_count || 0} />
-                  <DetailRow label="Has Search" value={scores.ux_details?.has_search ? 'Yes' : 'No'} />
-                  <DetailRow label="Social Links" value={scores.ux_details?.has_social_links ? 'Yes' : 'No'} />
-                  <DetailRow label="Contact Info" value={scores.ux_details?.has_contact_info ? 'Yes' : 'No'} />
+                  <DetailRow label="Mobile Viewport" value={siteDetails.ux_details?.has_viewport_meta ? 'Yes' : 'No'} />
+                  <DetailRow label="Favicon" value={siteDetails.ux_details?.has_favicon ? 'Yes' : 'No'} />
+                  <DetailRow label="Navigation" value={siteDetails.ux_details?.navigation_elements || 0} />
+                  <DetailRow label="Forms" value={siteDetails.ux_details?.form_count || 0} />
+                  <DetailRow label="Has Search" value={siteDetails.ux_details?.has_search ? 'Yes' : 'No'} />
+                  <DetailRow label="Social Links" value={siteDetails.ux_details?.has_social_links ? 'Yes' : 'No'} />
+                  <DetailRow label="Contact Info" value={siteDetails.ux_details?.has_contact_info ? 'Yes' : 'No'} />
                 </CardContent>
               </Card>
             </div>
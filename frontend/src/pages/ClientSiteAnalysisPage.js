@@ -63,28 +63,29 @@ export default function ClientSiteAnalysisPage() {
     
     setGeneratingFixes(true);
     try {
-      const [seoFixes, speedFixes, contentFixes] = await Promise.all([
-        axios.post(`${API_URL}/api/fix/seo`, {
+      // One request; the backend generates all three categories concurrently
+      const response = await axios.post(`${API_URL}/api/fix/all`, {
+        seo: {
           url,
           issues: analysis.seo.issues?.map(i => i.issue || i.name) || [],
           page_title: analysis.seo.meta?.title || ''
-        }),
-        axios.post(`${API_URL}/api/fix/speed`, {
+        },
+        speed: {
           url,
           issues: analysis.speed.issues?.map(i => i.issue || i.name) || [],
           server_type: 'nginx'
-        }),
-        axios.post(`${API_URL}/api/fix/content`, {
+        },
+        content: {
           url,
           issues: analysis.content.issues?.map(i => i.issue || i.name) || [],
           current_content: analysis.content.content_preview || ''
-        })
-      ]);
+        }
+      });
       
       setFixes({
-        seo: seoFixes.data.fixes || [],
-        speed: speedFixes.data.fixes || [],
-        content: contentFixes.data.fixes || []
+        seo: response.data.seo?.fixes || [],
+        speed: response.data.speed?.fixes || [],
+        content: response.data.content?.fixes || []
       });
       
       toast.success('All fix recommendations generated!');
@@ -9,6 +9,7 @@ import {
 } from 'lucide-react';
 import axios from 'axios';
 import { toast } from 'sonner';
+import { streamFixes } from '../lib/streamFixes';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL;
 
@@ -61,19 +62,22 @@ export default function ContentScorePage() {
     setFixingAll(true);
     try {
       const issueNames = analysis.issues.map(i => i.issue || i.name || i.type);
-      const response = await axios.post(`${API_URL}/api/fix/content`, {
+      // Fixes appear one by one as the server parses them from the model's output
+      setFixes(null);
+      setExpandedFixes({});
+      let count = 0;
+      await streamFixes(`${API_URL}/api/fix/content?stream=true`, {
         url: url,
         issues: issueNames,
         current_content: analysis.content_preview || '',
         target_keyword: targetKeyword || '',
         page_title: analysis.title || ''
+      }, (fix) => {
+        const index = count++;
+        setFixes(prev => [...(prev || []), fix]);
+        setExpandedFixes(prev => ({ ...prev, [index]: true }));
       });
-      
-      setFixes(response.data.fixes);
-      const expanded = {};
-      response.data.fixes.forEach((_, i) => expanded[i] = true);
-      setExpandedFixes(expanded);
-      toast.success(`Generated ${response.data.fixes.length} content improvements!`);
+      toast.success(`Generated ${count} content improvements!`);
     } catch (error) {
       toast.error('Failed to generate fixes');
     } finally {
@@ -42,62 +42,62 @@ export default function DownloadFixesPage() {
     };
 
     try {
-      // Step 1: SEO Analysis & Fix
+      // Step 1: Analyze all three areas
       setProgress({ step: 'Analyzing SEO...', percent: 10 });
       const seoAnalysis = await axios.post(
         `${API_URL}/api/seo/analyze`,
         { url },
         { headers: getAuthHeader() }
       );
-      
-      if (seoAnalysis.data.issues?.length > 0) {
-        setProgress({ step: 'Generating SEO fixes...', percent: 25 });
-        const seoFixes = await axios.post(`${API_URL}/api/fix/seo`, {
-          url,
-          issues: seoAnalysis.data.issues.map(i => i.issue || i.name || i.type),
-          page_title: seoAnalysis.data.meta?.title || '',
-          page_description: seoAnalysis.data.meta?.description || '',
-          target_keyword: targetKeyword
-        });
-        allFixes.seo = seoFixes.data.fixes || [];
-      }
 
-      // Step 2: Speed Analysis & Fix
-      setProgress({ step: 'Analyzing Speed...', percent: 40 });
+      setProgress({ step: 'Analyzing Speed...', percent: 30 });
       const speedAnalysis = await axios.post(
         `${API_URL}/api/speed/analyze`,
         { url },
         { headers: getAuthHeader() }
       );
-      
-      if (speedAnalysis.data.issues?.length > 0) {
-        setProgress({ step: 'Generating Speed fixes...', percent: 55 });
-        const speedFixes = await axios.post(`${API_URL}/api/fix/speed`, {
-          url,
-          issues: speedAnalysis.data.issues.map(i => i.issue || i.name || i.type),
-          server_type: serverType
-        });
-        allFixes.speed = speedFixes.data.fixes || [];
-      }
 
-      // Step 3: Content Analysis & Fix
-      setProgress({ step: 'Analyzing Content...', percent: 70 });
+      setProgress({ step: 'Analyzing Content...', percent: 50 });
       const contentAnalysis = await axios.post(
         `${API_URL}/api/content/analyze`,
         { url },
         { headers: getAuthHeader() }
       );
-      
+
+      // Step 2: Generate fixes for every area with issues in one concurrent request
+      const fixRequest = {};
+      if (seoAnalysis.data.issues?.length > 0) {
+        fixRequest.seo = {
+          url,
+          issues: seoAnalysis.data.issues.map(i => i.issue || i.name || i.type),
+          page_title: seoAnalysis.data.meta?.title || '',
+          page_description: seoAnalysis.data.meta?.description || '',
+          target_keyword: targetKeyword
+        };
+      }
+      if (speedAnalysis.data.issues?.length > 0) {
+        fixRequest.speed = {
+          url,
+          issues: speedAnalysis.data.issues.map(i => i.issue || i.name || i.type),
+          server_type: serverType
+        };
+      }
       if (contentAnalysis.data.issues?.length > 0) {
-        setProgress({ step: 'Generating Content fixes...', percent: 85 });
-        const contentFixes = await axios.post(`${API_URL}/api/fix/content`, {
+        fixRequest.content = {
           url,
           issues: contentAnalysis.data.issues.map(i => i.issue || i.name || i.type),
           current_content: contentAnalysis.data.content_preview || '',
           target_keyword: targetKeyword,
           page_title: contentAnalysis.data.title || ''
-        });
-        allFixes.content = contentFixes.data.fixes || [];
+        };
+      }
+
+      if (Object.keys(fixRequest).length > 0) {
+        setProgress({ step: 'Generating fixes...', percent: 70 });
+        const fixes = await axios.post(`${API_URL}/api/fix/all`, fixRequest);
+        allFixes.seo = fixes.data.seo?.fixes || [];
+        allFixes.speed = fixes.data.speed?.fixes || [];
+        allFixes.content = fixes.data.content?.fixes || [];
       }
 
       setProgress({ step: 'Complete!', percent: 100 });